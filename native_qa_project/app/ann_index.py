@@ -0,0 +1,261 @@
+# Import standard libraries for timing searches and reading CLI arguments.
+import argparse
+import time
+
+# FAISS builds the approximate indexes; NumPy holds the vectors.
+import faiss
+import numpy as np
+
+# Index types understood by `build_faiss_index`:
+# - flat:     exact search (the default, one distance per stored chunk).
+# - ivf_flat: vectors grouped into `nlist` clusters, only `nprobe` clusters are searched.
+# - hnsw:     graph-based search, tuned with `ef_search`.
+# - ivf_pq:   IVF with product-quantized vectors (a few dozen bytes per chunk).
+# - ivf_sq8:  IVF with 8-bit scalar-quantized vectors (1 byte per dimension).
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq", "ivf_sq8")
+
+# Default search/build settings, overridable per index.
+DEFAULT_OPTIONS = {
+    "nlist": None,        # IVF clusters (None = about 4 * sqrt(number of vectors)).
+    "nprobe": 8,          # IVF clusters visited per query.
+    "hnsw_m": 32,         # HNSW neighbours per node.
+    "ef_search": 64,      # HNSW candidate list size per query.
+    "pq_m": None,         # PQ sub-vectors (None = one per 16 dimensions).
+    "train_size": 50_000, # Max vectors sampled for training.
+}
+
+# Below this many vectors an approximate index is not worth it, or cannot be
+# trained: PQ learns 2^8 centroids per sub-vector and FAISS wants about 39
+# training points per centroid. Smaller collections use an exact flat index.
+MIN_ANN_VECTORS = {
+    "ivf_flat": 256,
+    "hnsw": 256,
+    "ivf_sq8": 256,
+    "ivf_pq": 39 * 2 ** 8,
+}
+
+
+def _pq_subquantizers(dim):
+    """
+    Picks the number of PQ sub-vectors: the divisor of `dim` closest to dim / 16.
+    """
+    target = max(1, dim // 16)
+    divisors = [m for m in range(1, dim + 1) if dim % m == 0]
+    return min(divisors, key=lambda m: abs(m - target))
+
+
+def factory_string(index_type, dim, n, options=None):
+    """
+    Returns the faiss.index_factory description for an index type.
+
+    :param index_type: One of INDEX_TYPES.
+    :param dim: Vector dimension.
+    :param n: Number of vectors the index will be trained on.
+    :param options: Overrides for DEFAULT_OPTIONS.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    # Keep about 39 training points per cluster, as FAISS recommends.
+    nlist = options["nlist"] or int(4 * np.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{options['hnsw_m']}"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{options['pq_m'] or _pq_subquantizers(dim)}"
+    return f"IVF{nlist},SQ8"
+
+
+def effective_index_type(index_type, n, options=None):
+    """
+    The index type `build_faiss_index` actually builds for `n` vectors:
+    'flat' when there are too few vectors to train `index_type`.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if index_type != "flat" and min(n, options["train_size"]) < MIN_ANN_VECTORS[index_type]:
+        return "flat"
+    return index_type
+
+
+def set_search_params(index, options=None):
+    """
+    Applies the query-time settings (nprobe for IVF, efSearch for HNSW).
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    if faiss.try_extract_index_ivf(index) is not None:
+        faiss.extract_index_ivf(index).nprobe = options["nprobe"]
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw"):
+        hnsw_index.hnsw.efSearch = options["ef_search"]
+
+
+def build_faiss_index(vectors, index_type="flat", options=None):
+    """
+    Builds a FAISS index of the given type from L2-normalized vectors.
+    Trainable indexes are trained on a random sample of at most `train_size` vectors.
+    Small collections fall back to an exact flat index.
+
+    :param vectors: float32 array of shape (n, dim).
+    :param index_type: One of INDEX_TYPES.
+    :param options: Overrides for DEFAULT_OPTIONS.
+    :return: A faiss.Index containing all vectors, in the same order.
+    """
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = effective_index_type(index_type, n, options)
+
+    index = faiss.index_factory(dim, factory_string(index_type, dim, n, options), faiss.METRIC_L2)
+
+    if not index.is_trained:
+        rng = np.random.default_rng(0)
+        sample_size = min(n, options["train_size"])
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+        index.train(sample)
+
+    index.add(vectors)
+    set_search_params(index, options)
+    return index
+
+
+def index_vectors(index):
+    """
+    Returns all vectors stored in an index as an array, in index order.
+    Exact for flat, HNSW-flat and IVF-flat indexes; PQ and SQ8 indexes return
+    their (approximate) decoded vectors.
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # IVF lists are stored by cluster; the direct map finds vectors by position.
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def is_flat(index):
+    """
+    True for the exact IndexFlat* family.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+
+def stores_exact_vectors(index):
+    """
+    True if `index_vectors` returns the vectors exactly as added (flat, HNSW
+    and IVF-flat), False for the quantized PQ and SQ8 indexes.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    return ivf is None or isinstance(faiss.downcast_index(ivf), faiss.IndexIVFFlat)
+
+
+def compare_index_types(vectors, queries, k=3, configs=None):
+    """
+    Builds each index configuration on the same vectors and measures it
+    against the exact flat index.
+
+    :param vectors: float32 array (n, dim) of normalized chunk vectors.
+    :param queries: float32 array (q, dim) of normalized query vectors.
+    :param k: Number of neighbours compared.
+    :param configs: List of (index_type, options) pairs.
+    :return: List of dicts with recall@k, latency (ms/query), build time and size.
+             "factory" describes the index actually built, and "fallback" is True
+             when there were too few vectors to train the requested type (flat index built).
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    configs = configs or [(t, {}) for t in INDEX_TYPES]
+
+    exact = build_faiss_index(vectors, "flat")
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for index_type, options in configs:
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type, options)
+        build_s = time.perf_counter() - start
+
+        # Time queries one by one, as the app searches them.
+        latencies = []
+        found = np.zeros_like(truth)
+        for i in range(len(queries)):
+            start = time.perf_counter()
+            _, ids = index.search(queries[i:i + 1], k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found[i] = ids[0]
+
+        hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+        built_type = effective_index_type(index_type, len(vectors), options)
+        rows.append({
+            "index_type": index_type,
+            "options": options,
+            "factory": factory_string(built_type, vectors.shape[1], len(vectors), options),
+            "fallback": built_type != index_type,
+            "recall_at_k": hits / truth.size if truth.size else 0.0,
+            "latency_ms_mean": float(np.mean(latencies)) if latencies else 0.0,
+            "latency_ms_p95": float(np.percentile(latencies, 95)) if latencies else 0.0,
+            "build_s": build_s,
+            "size_mb": faiss.serialize_index(index).nbytes / 1e6,
+        })
+    return rows
+
+
+def main():
+    """
+    Prints a recall-vs-latency report for every index type on a document folder.
+    Queries are the pipeline test questions plus noisy copies of random chunks.
+    """
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on a document folder.")
+    parser.add_argument("folder", nargs="?", default="./data")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--sample-queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="*", default=[4, 16])
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[32, 128])
+    args = parser.parse_args()
+
+    # Imported here so the report can be used without the QA modules.
+    from embedder import EmbeddingIndexer
+    from test_pipeline import test_cases
+
+    indexer = EmbeddingIndexer()
+    indexer.load_or_build(args.folder)
+    if indexer.own_chunk_count == 0:
+        print("❌ No documents loaded.")
+        return
+    vectors = index_vectors(indexer.index.index)
+
+    questions = [t["question"] for t in test_cases]
+    queries = [indexer.embeddings.embed_query(q) for q in questions]
+    queries = np.array(queries, dtype=np.float32)
+
+    rng = np.random.default_rng(0)
+    sampled = vectors[rng.choice(len(vectors), min(args.sample_queries, len(vectors)), replace=False)]
+    sampled = sampled + rng.normal(scale=0.05, size=sampled.shape).astype(np.float32)
+    queries = np.vstack([queries, sampled]).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    configs = [("flat", {})]
+    for index_type in ("ivf_flat", "ivf_pq", "ivf_sq8"):
+        configs += [(index_type, {"nprobe": p}) for p in args.nprobe]
+    configs += [("hnsw", {"ef_search": ef}) for ef in args.ef_search]
+
+    print(f"📊 {len(vectors)} chunks, {len(queries)} queries, k={args.k}")
+    print(f"{'index':<22}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'build s':>10}{'size MB':>10}")
+    for row in compare_index_types(vectors, queries, args.k, configs):
+        # Too few chunks to train this type: the row measures a flat index.
+        label = f"{row['index_type']}→Flat" if row["fallback"] else row["factory"]
+        print(
+            f"{label + ' ' + str(row['options'] or ''):<22}"
+            f"{row['recall_at_k']:>10.3f}{row['latency_ms_mean']:>10.3f}"
+            f"{row['latency_ms_p95']:>10.3f}{row['build_s']:>10.2f}{row['size_mb']:>10.2f}"
+        )
+
+
+# Run the report only if this script is called directly.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# Import standard libraries for hashing questions and the SQLite backing store.
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# NumPy compares query embeddings for near-duplicate questions.
+import numpy as np
+
+# LangChain Document objects are rebuilt for cached sources.
+from langchain_core.documents import Document
+
+# SQLite file holding cached answers between runs.
+ANSWER_CACHE_PATH = ".answer_cache.sqlite3"
+
+# Minimum cosine similarity between two questions' embeddings for the cached
+# answer of one to be served for the other. e5 cosines sit in a narrow, high
+# range, so the default is strict. Set QA_ANSWER_SIMILARITY to tune it;
+# 1.0 only reuses identical ones.
+SIMILARITY_THRESHOLD = float(os.environ.get("QA_ANSWER_SIMILARITY", "0.98"))
+
+# Similar embeddings are not enough: the questions must also share this share
+# of their content words (Jaccard overlap), so "Charbel's email?" and
+# "Charbel's phone number?" never get the same answer.
+MIN_TERM_OVERLAP = 0.6
+
+# Words ignored by the overlap check.
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "can", "could",
+    "of", "to", "in", "on", "at", "for", "by", "with", "about", "and", "or",
+    "i", "me", "my", "you", "your", "it", "its", "this", "that", "please", "tell", "what", "what's",
+}
+
+
+def normalize_question(question):
+    """
+    Lowercases a question and drops punctuation and extra spaces, so
+    "What is Charbel's email?" and "what is charbel's email" match.
+    """
+    question = re.sub(r"[^\w\s@.']", " ", question.lower())
+    return " ".join(question.split()).strip(" .")
+
+
+def question_terms(question):
+    """
+    Content words of a normalized question (stop words and possessive 's dropped).
+    """
+    words = (word.strip(".'") for word in normalize_question(question).split())
+    return {re.sub(r"'s$", "", word) for word in words if word and word not in STOP_WORDS}
+
+
+def term_overlap(first, second):
+    """
+    Jaccard overlap of the content words of two questions (1.0 if neither has any).
+    """
+    first, second = question_terms(first), question_terms(second)
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class AnswerCache:
+    """
+    Cache of final answers placed in front of retrieval and the LLM.
+
+    - Exact hits: same normalized question and same index version.
+    - Near-duplicate hits: query embeddings with cosine similarity above
+      `similarity_threshold` and questions sharing most of their content
+      words (same index version only).
+    - Entries expire after `ttl` seconds; at most `max_entries` are kept,
+      evicting the least recently used.
+    - Entries are stored in SQLite so they survive restarts.
+    - Each index (`index_id`, e.g. its folder) has a version that changes on
+      every rebuild. Answers are keyed by index and version: an answer is only
+      served for the version it was computed on, and answers of older versions
+      simply age out (so processes on different versions share the cache).
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, max_entries=1000, ttl=24 * 3600, similarity_threshold=None):
+        if similarity_threshold is None:
+            similarity_threshold = SIMILARITY_THRESHOLD
+        if not 0.0 < similarity_threshold <= 1.0:
+            raise ValueError(f"similarity_threshold must be in (0, 1], got {similarity_threshold}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                index_id TEXT,
+                index_version TEXT,
+                question TEXT,
+                embedding BLOB,
+                answer TEXT,
+                docs TEXT,
+                created REAL,
+                last_used REAL
+            )"""
+        )
+        self.db.commit()
+
+        # key -> entry, ordered from least to most recently used.
+        self.entries = OrderedDict()
+        rows = self.db.execute(
+            "SELECT key, index_id, index_version, question, embedding, answer, docs, created "
+            "FROM answers ORDER BY last_used"
+        )
+        for key, index_id, version, question, embedding, answer, docs, created in rows:
+            self.entries[key] = {
+                "index_id": index_id,
+                "index_version": version,
+                "question": question,
+                "embedding": np.frombuffer(embedding, dtype=np.float32) if embedding else None,
+                "answer": answer,
+                "docs": json.loads(docs),
+                "created": created,
+            }
+
+        # (index_id, index_version, dim) -> (keys, matrix of their embeddings)
+        # for near-duplicate search, rebuilt when entries of that group change.
+        self._matrices = {}
+
+        # Simple counters to see how well the cache works.
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def _key(question, index_id, index_version):
+        text = f"{index_id}\n{index_version}\n{normalize_question(question)}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _group(entry):
+        """
+        Near-duplicate search group of an entry (None without an embedding).
+        """
+        if entry["embedding"] is None:
+            return None
+        return entry["index_id"], entry["index_version"], len(entry["embedding"])
+
+    def _delete(self, keys):
+        for key in keys:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self._matrices.pop(self._group(entry), None)
+        self.db.executemany("DELETE FROM answers WHERE key = ?", [(key,) for key in keys])
+        self.db.commit()
+
+    def _matrix(self, group):
+        """
+        Returns (keys, embedding matrix) of the entries in a group, stacking
+        only the embeddings of that index version and size.
+        """
+        if group not in self._matrices:
+            keys = [key for key, entry in self.entries.items() if self._group(entry) == group]
+            matrix = np.stack([self.entries[key]["embedding"] for key in keys]) if keys else None
+            self._matrices[group] = (keys, matrix)
+        return self._matrices[group]
+
+    def _hit(self, key):
+        """
+        Returns a fresh entry and marks it as recently used (None if expired).
+        """
+        entry = self.entries[key]
+        now = time.time()
+        if now - entry["created"] > self.ttl:
+            self._delete([key])
+            return None
+        self.entries.move_to_end(key)
+        self.db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+        self.db.commit()
+        return {
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "docs": [Document(page_content=d["page_content"], metadata=d["metadata"]) for d in entry["docs"]],
+        }
+
+    def get(self, question, index_id, index_version):
+        """
+        Exact lookup by normalized question and index version.
+
+        :return: Dict with 'question', 'answer' and 'docs' (list of Documents), or None.
+        """
+        with self.lock:
+            key = self._key(question, index_id, index_version)
+            if key in self.entries:
+                hit = self._hit(key)
+                if hit:
+                    self.exact_hits += 1
+                    return hit
+            return None
+
+    def get_similar(self, query_vector, index_id, index_version, question=None):
+        """
+        Near-duplicate lookup: the cached question whose normalized embedding
+        is most similar to `query_vector`, if above the similarity threshold.
+
+        :param question: The question asked; cached questions must share at
+                         least MIN_TERM_OVERLAP of its content words (None skips the check).
+        :return: Same dict as `get`, or None.
+        """
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        with self.lock:
+            # Only answers from this version of this index can match.
+            keys, matrix = self._matrix((index_id, index_version, len(query_vector)))
+            if matrix is None:
+                self.misses += 1
+                return None
+
+            scores = matrix @ query_vector
+            # Most similar first, among the questions above the threshold.
+            for best in np.argsort(-scores):
+                if scores[best] < self.similarity_threshold:
+                    break
+                entry = self.entries[keys[best]]
+                if question is not None and term_overlap(question, entry["question"]) < MIN_TERM_OVERLAP:
+                    continue
+                hit = self._hit(keys[best])
+                if hit:
+                    self.similar_hits += 1
+                    return hit
+                break
+            self.misses += 1
+            return None
+
+    def lookup(self, question, indexer):
+        """
+        Tries an exact hit first; only then embeds the question (with the
+        indexer's model) for a near-duplicate hit.
+
+        :param indexer: The EmbeddingIndexer the answer would be based on.
+        :return: (hit or None, query vector or None). The vector can be reused for search.
+        """
+        hit = self.get(question, indexer.index_id, indexer.index_version)
+        if hit:
+            return hit, None
+        vector = indexer.embed_query(question)
+        return self.get_similar(vector, indexer.index_id, indexer.index_version, question), vector
+
+    def put(self, question, indexer, answer, docs, query_vector=None):
+        """
+        Stores an answer and the chunks it was based on.
+
+        :param indexer: The EmbeddingIndexer the chunks were retrieved from.
+        """
+        index_id, index_version = indexer.index_id, indexer.index_version
+        key = self._key(question, index_id, index_version)
+        embedding = None if query_vector is None else np.asarray(query_vector, dtype=np.float32)
+        docs = [{"page_content": d.page_content, "metadata": d.metadata} for d in docs]
+        now = time.time()
+
+        with self.lock:
+            if key in self.entries:
+                # The replaced answer may sit in another group's matrix.
+                self._matrices.pop(self._group(self.entries[key]), None)
+            self.entries[key] = {
+                "index_id": index_id,
+                "index_version": index_version,
+                "question": question,
+                "embedding": embedding,
+                "answer": answer,
+                "docs": docs,
+                "created": now,
+            }
+            self.entries.move_to_end(key)
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, index_id, index_version, question,
+                    None if embedding is None else embedding.tobytes(),
+                    answer, json.dumps(docs, ensure_ascii=False), now, now,
+                ),
+            )
+            self.db.commit()
+            self._matrices.pop(self._group(self.entries[key]), None)
+
+            # Evict the least recently used answers.
+            overflow = len(self.entries) - self.max_entries
+            if overflow > 0:
+                self._delete(list(self.entries)[:overflow])
@@ -0,0 +1,203 @@
+# Import standard libraries for reading questions, running LLM calls
+# concurrently and timing each step.
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+# Import the core pipeline modules: embedder (which uses the loader), answer cache and QA logic.
+from answer_cache import AnswerCache
+from embedder import EmbeddingIndexer
+from qa import answer_question_async, build_context, configure_backend, join_context, retrieval_k
+
+
+def read_questions(path):
+    """
+    Reads questions from a JSONL or CSV file.
+
+    - JSONL: one object per line with a "question" field (and optional "id"),
+      or one plain JSON string per line.
+    - CSV: a header row with a "question" column (and optional "id" column).
+
+    :param path: Path to the questions file.
+    :return: List of {"id": ..., "question": ...} dicts.
+    """
+    questions = []
+    if os.path.splitext(path)[-1].lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                questions.append({"id": row.get("id") or len(questions), "question": row["question"]})
+        return questions
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            questions.append({"id": item.get("id", len(questions)), "question": item["question"]})
+    return questions
+
+
+def source_info(doc):
+    """
+    Returns the metadata shown for a retrieved chunk.
+    """
+    return {
+        "file_name": doc.metadata.get("file_name", "Unknown File"),
+        "page": doc.metadata.get("page", "N/A"),
+        "source": doc.metadata.get("source", "Unknown Path"),
+    }
+
+
+def _record(item, docs):
+    return {
+        "id": item["id"],
+        "question": item["question"],
+        "sources": [source_info(doc) for doc in docs],
+    }
+
+
+async def _cached(item, hit, retrieval_ms):
+    """
+    Builds the output record for a question answered from the cache.
+    """
+    record = _record(item, hit["docs"])
+    record["answer"] = hit["answer"]
+    record["cached"] = True
+    record["timings"] = {"retrieval_ms": retrieval_ms, "llm_ms": 0.0}
+    return record
+
+
+async def _answer(item, docs, retrieval_ms, indexer=None, cache=None, vector=None, k=None):
+    """
+    Runs the LLM for one question and builds its output record.
+    Successful answers are added to the cache, if one is given.
+    """
+    # Keep only the chunks sent to the model (merged, within the token budget).
+    docs = build_context(item["question"], docs, k)
+    record = _record(item, docs)
+    start = time.perf_counter()
+    try:
+        record["answer"] = await answer_question_async(item["question"], join_context(docs))
+        if cache is not None:
+            cache.put(item["question"], indexer, record["answer"], docs, vector)
+    except Exception as e:
+        record["answer"] = None
+        record["error"] = str(e)
+    record["cached"] = False
+    record["timings"] = {
+        "retrieval_ms": retrieval_ms,
+        "llm_ms": (time.perf_counter() - start) * 1000,
+    }
+    return record
+
+
+async def run_batch_async(indexer, questions, output_path, k=3, batch_size=64, cache=None):
+    """
+    Answers many questions against one index and streams the results to a JSONL file.
+
+    Steps for each batch of `batch_size` questions:
+    1️⃣ Answer exact repeats from the answer cache (if given).
+    2️⃣ Embed the other questions in one call, answer near-duplicates from
+       the cache and search the rest in one FAISS call.
+    3️⃣ Send the LLM requests for the batch; the shared Ollama backend keeps
+       at most `max_in_flight` of them running (see qa.configure_backend).
+    4️⃣ Write each answer (with sources and timings) as soon as it is ready.
+
+    :return: Number of questions answered without error.
+    """
+    answered = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for b in range(0, len(questions), batch_size):
+            batch = questions[b:b + batch_size]
+            start = time.perf_counter()
+
+            hits = [None] * len(batch)
+            if cache is not None:
+                hits = [cache.get(item["question"], indexer.index_id, indexer.index_version) for item in batch]
+
+            misses = [i for i, hit in enumerate(hits) if hit is None]
+            vectors = indexer.embed_queries([batch[i]["question"] for i in misses]) if misses else []
+            to_search, rows = [], []
+            for row, (i, vector) in enumerate(zip(misses, vectors)):
+                if cache is not None:
+                    hits[i] = cache.get_similar(vector, indexer.index_id, indexer.index_version, batch[i]["question"])
+                if hits[i] is None:
+                    to_search.append(i)
+                    rows.append(row)
+
+            search_vectors = vectors[rows] if rows else []
+            search_queries = [batch[i]["question"] for i in to_search]
+            results = indexer.search_vectors(search_vectors, retrieval_k(k), search_queries) if rows else []
+            # Share the batched retrieval time evenly between its questions.
+            retrieval_ms = (time.perf_counter() - start) * 1000 / len(batch)
+
+            tasks = [_cached(batch[i], hit, retrieval_ms) for i, hit in enumerate(hits) if hit]
+            tasks += [
+                _answer(batch[i], docs, retrieval_ms, indexer, cache, vector, k)
+                for i, docs, vector in zip(to_search, results, search_vectors)
+            ]
+            for task in asyncio.as_completed(tasks):
+                record = await task
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                answered += "error" not in record
+
+            print(f"✅ {min(b + batch_size, len(questions))}/{len(questions)} questions done")
+    return answered
+
+
+def run_batch(indexer, questions, output_path, k=3, batch_size=64, cache=None):
+    """
+    Blocking version of `run_batch_async`.
+    """
+    return asyncio.run(run_batch_async(indexer, questions, output_path, k, batch_size, cache))
+
+
+def main(argv=None):
+    """
+    Command-line batch mode:
+    python app/batch_qa.py questions.jsonl answers.jsonl --folder ./data
+    """
+    parser = argparse.ArgumentParser(description="Answer a file of questions against a document folder.")
+    parser.add_argument("questions", help="JSONL or CSV file with a 'question' field/column.")
+    parser.add_argument("output", help="JSONL file the answers are written to.")
+    parser.add_argument("--folder", default="./data", help="Document folder to index.")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per question.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions retrieved per batch.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max LLM calls in flight.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse files.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use or fill the answer cache.")
+    parser.add_argument("--similarity-threshold", type=float, default=None,
+                        help="Cosine similarity for reusing the answer of a near-duplicate question "
+                             "(default: QA_ANSWER_SIMILARITY or 0.98).")
+    args = parser.parse_args(argv)
+
+    # Allow up to `concurrency` requests to the Ollama server at once.
+    configure_backend(max_in_flight=args.concurrency)
+
+    questions = read_questions(args.questions)
+    print(f"📥 {len(questions)} questions loaded from {args.questions}")
+
+    indexer = EmbeddingIndexer(search_mode="hybrid")
+    # Load the embedding model in the background while the saved index is read.
+    indexer.engine.warm_up()
+    indexer.load_or_build(args.folder, workers=args.workers)
+    if indexer.chunk_count == 0:
+        print("❌ No documents loaded.")
+        return
+
+    start = time.perf_counter()
+    cache = None if args.no_cache else AnswerCache(similarity_threshold=args.similarity_threshold)
+    answered = run_batch(indexer, questions, args.output, args.k, args.batch_size, cache)
+    elapsed = time.perf_counter() - start
+    print(f"📊 {answered}/{len(questions)} answered in {elapsed:.1f}s → {args.output}")
+
+
+# Run the batch job only if this script is called directly.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# Import standard libraries for timing, temporary folders and the JSON report.
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Pipeline pieces measured one stage at a time.
+import loader
+from loader import list_files, make_splitter, read_file
+from pdf_extract import PageCache
+from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+from embedding_cache import CachedEmbeddings, get_cache
+from embedder import EmbeddingIndexer
+import metrics
+
+# Hand-written pipeline test cases (used for real document folders).
+from test_pipeline import test_cases
+
+# Syllables used to make up names and filler words for the synthetic corpus.
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "vu", "no", "si", "pe", "da", "zo", "ri", "be", "mu", "sa", "ti"]
+CITIES = ["Beirut", "Paris", "Athens", "Rabat", "Lyon", "Byblos", "Nice", "Tyre"]
+
+# Modules behind the entry points (CLI, batch QA, and the registry/QA modules
+# the Streamlit app imports), and dependencies they must not import at startup.
+IMPORT_MODULES = ["interface", "batch_qa", "registry", "qa"]
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "pdfplumber"]
+
+# Default import-time budget per module, in seconds.
+IMPORT_BUDGET_S = 2.0
+
+# Run in a fresh interpreter: times one import and lists the heavy modules it pulled in.
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def percentiles(values_ms):
+    """
+    Summary of a list of latencies in milliseconds.
+    """
+    if not values_ms:
+        return {"count": 0}
+    values = np.asarray(values_ms, dtype=np.float64)
+    return {
+        "count": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def make_synthetic_corpus(folder_path, n_files=50, paragraphs=20, seed=0):
+    """
+    Writes `n_files` text files of made-up filler paragraphs, each hiding one
+    fact (a project, its lead and its code), and returns test cases asking
+    for those facts in the same format as `test_pipeline.test_cases`.
+
+    The same seed always gives the same files and questions.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder_path, exist_ok=True)
+
+    def word(n_syllables):
+        return "".join(rng.choice(SYLLABLES) for _ in range(n_syllables))
+
+    vocabulary = [word(rng.randint(2, 4)) for _ in range(2000)]
+    cases = []
+    for i in range(n_files):
+        file_name = f"synthetic_{i:05d}.txt"
+        project = word(3).capitalize()
+        lead = f"{word(2).capitalize()} {word(3).capitalize()}"
+        code = f"PX-{rng.randint(1000, 9999)}-{i}"
+        fact = (
+            f"The {project} project is led by {lead} from {rng.choice(CITIES)}, "
+            f"and its project code is {code}."
+        )
+
+        lines = []
+        for _ in range(paragraphs):
+            sentences = [
+                " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 16))).capitalize() + "."
+                for _ in range(rng.randint(2, 4))
+            ]
+            lines.append(" ".join(sentences))
+        lines.insert(rng.randint(0, len(lines)), fact)
+
+        with open(os.path.join(folder_path, file_name), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(lines))
+
+        cases.append({
+            "question": f"What is the project code of the {project} project?",
+            "expected_keywords": [code],
+            "expected_file": file_name,
+            "expected_page": "N/A",
+        })
+    return cases
+
+
+def git_commit():
+    """
+    Current git commit of the repository (None outside a git checkout).
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def measure_import_times(modules=IMPORT_MODULES, budget=IMPORT_BUDGET_S, repeat=3):
+    """
+    Measures how long importing each entry-point module takes, each in a fresh
+    Python process (best of `repeat`, so disk caches are warm), and checks it
+    against the startup budget. A module also fails if it imports one of
+    HEAVY_MODULES, which must only load on first use.
+
+    :return: {"budget_s", "passed", "modules": {module: {"seconds", "heavy", "passed"}}}
+    """
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+                capture_output=True, text=True, check=True, cwd=app_dir,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        best = min(runs, key=lambda run: run["seconds"])
+        results[module] = {
+            "seconds": best["seconds"],
+            "heavy": best["heavy"],
+            "passed": best["seconds"] <= budget and not best["heavy"],
+        }
+    return {
+        "budget_s": budget,
+        "passed": all(result["passed"] for result in results.values()),
+        "modules": results,
+    }
+
+
+def print_import_times(imports):
+    """
+    Prints the import-time check of a benchmark report.
+    """
+    for module, result in imports["modules"].items():
+        status = "✅" if result["passed"] else "❌"
+        heavy = f" (imports {', '.join(result['heavy'])})" if result["heavy"] else ""
+        print(f"{status} import {module}: {result['seconds']:.2f}s / {imports['budget_s']:.2f}s{heavy}")
+
+
+def measure_ingest(paths, indexer, cache_dir, page_cache_dir):
+    """
+    Times each ingest stage separately: load (parse + clean), chunk, embed and index build.
+    PDFs are parsed with an empty page cache in `page_cache_dir` (not the app's
+    `.page_cache`), so every run times the extraction itself.
+    The index is built after the embed stage filled a fresh embedding cache,
+    so the build time covers FAISS only (plus cache reads).
+    """
+    stages = {}
+
+    previous_page_cache = loader.page_cache
+    loader.page_cache = PageCache(page_cache_dir)
+    start = time.perf_counter()
+    raw_docs = []
+    n_bytes = 0
+    try:
+        for path in paths:
+            raw_docs.extend(read_file(path))
+            n_bytes += os.path.getsize(path)
+    finally:
+        loader.page_cache = previous_page_cache
+    seconds = time.perf_counter() - start
+    stages["load"] = {
+        "seconds": seconds,
+        "files": len(paths),
+        "mb": n_bytes / 1e6,
+        "files_per_s": len(paths) / seconds if seconds else 0.0,
+        "mb_per_s": n_bytes / 1e6 / seconds if seconds else 0.0,
+    }
+
+    start = time.perf_counter()
+    chunks = make_splitter(indexer.chunking).split_documents(raw_docs)
+    seconds = time.perf_counter() - start
+    stages["chunk"] = {
+        "seconds": seconds,
+        "chunks": len(chunks),
+        "chunks_per_s": len(chunks) / seconds if seconds else 0.0,
+    }
+
+    start = time.perf_counter()
+    cached = CachedEmbeddings(indexer.engine, get_cache(indexer.model_name, cache_dir))
+    cached.embed_documents([doc.page_content for doc in chunks])
+    cached.cache.flush()
+    seconds = time.perf_counter() - start
+    stages["embed"] = {
+        "seconds": seconds,
+        "chunks_per_s": len(chunks) / seconds if seconds else 0.0,
+    }
+
+    start = time.perf_counter()
+    indexer.build_index(chunks)
+    if indexer.search_mode != "dense":
+        for sub_index in [indexer, *indexer.routes.values()]:
+            if sub_index.index is not None:
+                sub_index.lexical_index()
+    seconds = time.perf_counter() - start
+    stages["index_build"] = {
+        "seconds": seconds,
+        "index_type": indexer.index_type,
+        "chunks_per_s": len(chunks) / seconds if seconds else 0.0,
+    }
+    return stages
+
+
+def is_hit(doc, case, check_page=False):
+    """
+    True if a retrieved chunk comes from the case's expected file (and page).
+    """
+    if doc.metadata.get("file_name") != case["expected_file"]:
+        return False
+    return not check_page or doc.metadata.get("page") == case["expected_page"]
+
+
+def measure_search(indexer, cases, k=3, repeat=3, warmup=3):
+    """
+    Query latency percentiles of `EmbeddingIndexer.search` and retrieval recall@k:
+    - file recall@k: the expected file is among the top-k chunks.
+    - page recall@k: same for the expected page (PDF cases only).
+    - context keyword recall: expected keywords found in the retrieved text.
+    """
+    for case in cases[:warmup]:
+        indexer.search(case["question"], k=k)
+
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        results = []
+        for case in cases:
+            start = time.perf_counter()
+            docs = indexer.search(case["question"], k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(docs)
+
+    file_hits = page_hits = page_cases = keywords = keywords_found = 0
+    for case, docs in zip(cases, results):
+        file_hits += any(is_hit(doc, case) for doc in docs)
+        if case["expected_page"] != "N/A":
+            page_cases += 1
+            page_hits += any(is_hit(doc, case, check_page=True) for doc in docs)
+        text = " ".join(doc.page_content for doc in docs).lower()
+        keywords += len(case["expected_keywords"])
+        keywords_found += sum(kw.lower() in text for kw in case["expected_keywords"])
+
+    return {
+        "latency": percentiles(latencies),
+        "recall": {
+            "k": k,
+            "cases": len(cases),
+            "file_recall_at_k": file_hits / len(cases) if cases else 0.0,
+            "page_recall_at_k": page_hits / page_cases if page_cases else None,
+            "context_keyword_recall": keywords_found / keywords if keywords else 0.0,
+        },
+    }
+
+
+def measure_end_to_end(indexer, cases, k=3):
+    """
+    Full question → search → LLM answer latency, plus the test_pipeline pass rate
+    (expected file retrieved and at least one expected keyword in the answer).
+    """
+    # Imported here so the retrieval benchmarks run without the LLM client.
+    from qa import answer_question
+
+    latencies = []
+    passed = keywords = keywords_found = 0
+    for case in cases:
+        start = time.perf_counter()
+        docs = indexer.search(case["question"], k=k)
+        answer = answer_question(case["question"], docs).lower()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        found = sum(kw.lower() in answer for kw in case["expected_keywords"])
+        keywords += len(case["expected_keywords"])
+        keywords_found += found
+        passed += found >= 1 and any(is_hit(doc, case) for doc in docs)
+
+    return {
+        "latency": percentiles(latencies),
+        "pass_rate": passed / len(cases) if cases else 0.0,
+        "answer_keyword_recall": keywords_found / keywords if keywords else 0.0,
+    }
+
+
+def run_benchmark(folder_path=None, synthetic_files=0, paragraphs=20, seed=0, k=3, repeat=3,
+                  llm="fake", llm_delay=0.0, model_name=DEFAULT_MODEL, index_type="flat",
+                  search_mode="hybrid", engine_options=None, collect_metrics=False, profile_dir=None,
+                  chunking="fixed", language_models=None):
+    """
+    Runs every benchmark and returns the results as a JSON-ready dict.
+
+    :param folder_path: Document folder measured with the hand-written test cases.
+    :param synthetic_files: If > 0, a synthetic corpus of this many files is generated
+                            (in a temporary folder) and used instead, with generated cases.
+    :param llm: 'fake' (offline, deterministic), 'ollama' (real server) or 'none' (skip).
+    :param llm_delay: Simulated generation time of the fake LLM, in seconds.
+    :param collect_metrics: Add the per-stage timers and counters (see metrics.py) to the report.
+    :param profile_dir: Folder for cProfile dumps of the profiled stages (implies collect_metrics).
+    :param chunking: 'fixed' or 'language' (see loader.CHUNKING_MODES).
+    :param language_models: Languages routed to other embedding models, e.g. {"ar": "intfloat/multilingual-e5-base"}.
+    """
+    if collect_metrics or profile_dir:
+        metrics.reset()
+        metrics.enable(profile_dir=profile_dir)
+
+    with tempfile.TemporaryDirectory(prefix="qa-bench-") as work_dir:
+        if synthetic_files:
+            folder_path = os.path.join(work_dir, "corpus")
+            cases = make_synthetic_corpus(folder_path, synthetic_files, paragraphs, seed)
+        else:
+            cases = test_cases
+        paths = list_files(folder_path)
+
+        engine = EmbeddingEngine(model_name, **(engine_options or {}))
+        cache_dir = os.path.join(work_dir, "embedding_cache")
+        indexer = EmbeddingIndexer(
+            engine=engine, cache_dir=cache_dir, index_type=index_type, search_mode=search_mode,
+            chunking=chunking, language_models=language_models, **(engine_options or {}),
+        )
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "config": {
+                "corpus": "synthetic" if synthetic_files else os.path.abspath(folder_path),
+                "synthetic_files": synthetic_files,
+                "seed": seed,
+                "k": k,
+                "repeat": repeat,
+                "model_name": engine.cache_key,
+                "index_type": index_type,
+                "search_mode": search_mode,
+                "chunking": chunking,
+                "language_models": language_models or {},
+                "llm": llm,
+                "engine_options": engine_options or {},
+            },
+        }
+
+        report["ingest"] = measure_ingest(paths, indexer, cache_dir, os.path.join(work_dir, "page_cache"))
+        report["search"] = measure_search(indexer, cases, k, repeat)
+
+        if llm != "none":
+            import qa
+            from ollama_stub import FakeBackend
+
+            previous = qa.use_backend(FakeBackend(delay=llm_delay)) if llm == "fake" else None
+            try:
+                report["end_to_end"] = measure_end_to_end(indexer, cases, k)
+            finally:
+                if previous is not None:
+                    qa.use_backend(previous).close()
+
+    if metrics.is_enabled():
+        report["metrics"] = metrics.snapshot()
+        report["profiles"] = metrics.dump_profiles()
+    return report
+
+
+def print_report(report):
+    """
+    Prints the main numbers of a benchmark report.
+    """
+    ingest = report["ingest"]
+    print(f"📂 Load:   {ingest['load']['files']} files in {ingest['load']['seconds']:.2f}s "
+          f"({ingest['load']['files_per_s']:.1f} files/s, {ingest['load']['mb_per_s']:.2f} MB/s)")
+    print(f"✂️ Chunk:  {ingest['chunk']['chunks']} chunks in {ingest['chunk']['seconds']:.2f}s "
+          f"({ingest['chunk']['chunks_per_s']:.0f} chunks/s)")
+    print(f"🧠 Embed:  {ingest['embed']['seconds']:.2f}s ({ingest['embed']['chunks_per_s']:.1f} chunks/s)")
+    print(f"🗂️ Index:  {ingest['index_build']['seconds']:.2f}s ({ingest['index_build']['index_type']})")
+
+    latency, recall = report["search"]["latency"], report["search"]["recall"]
+    print(f"🔍 Search: p50 {latency['p50_ms']:.1f} ms | p95 {latency['p95_ms']:.1f} ms | "
+          f"p99 {latency['p99_ms']:.1f} ms ({latency['count']} queries)")
+    print(f"🎯 Recall@{recall['k']}: file {recall['file_recall_at_k']:.2%}"
+          + (f" | page {recall['page_recall_at_k']:.2%}" if recall["page_recall_at_k"] is not None else "")
+          + f" | context keywords {recall['context_keyword_recall']:.2%}")
+
+    if "end_to_end" in report:
+        e2e = report["end_to_end"]
+        print(f"💬 End-to-end: p50 {e2e['latency']['p50_ms']:.1f} ms | p95 {e2e['latency']['p95_ms']:.1f} ms | "
+              f"pass rate {e2e['pass_rate']:.2%} | answer keywords {e2e['answer_keyword_recall']:.2%}")
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g.:
+    python app/benchmark.py --folder ./data --output bench.json
+    python app/benchmark.py --synthetic-files 500 --llm none --output bench.json
+    python app/benchmark.py --imports-only --import-budget 1.5
+    """
+    parser = argparse.ArgumentParser(description="Benchmark ingest, retrieval and end-to-end QA.")
+    parser.add_argument("--folder", default="./data", help="Document folder (uses the test_pipeline cases).")
+    parser.add_argument("--synthetic-files", type=int, default=0, help="Generate a synthetic corpus of N files instead.")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Paragraphs per synthetic file.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3, help="Times each query is timed.")
+    parser.add_argument("--llm", choices=["fake", "ollama", "none"], default="fake")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="Simulated seconds per fake answer.")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--search-mode", default="hybrid")
+    parser.add_argument("--chunking", choices=["fixed", "language"], default="fixed")
+    parser.add_argument("--language-model", action="append", default=[], metavar="LANG=MODEL",
+                        help="Route a language to another embedding model (repeatable).")
+    parser.add_argument("--batch-size", type=int, default=32, help="Embedding batch size.")
+    parser.add_argument("--threads", type=int, default=None, help="PyTorch (or onnxruntime) CPU threads.")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch",
+                        help="Embedding backend ('onnx' = int8 ONNX model under onnxruntime).")
+    parser.add_argument("--metrics", action="store_true", help="Include detailed timers/counters.")
+    parser.add_argument("--profile-dir", default=None, help="Write cProfile dumps of each stage here.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_S,
+                        help="Max seconds to import each entry-point module (0 = skip the check).")
+    parser.add_argument("--imports-only", action="store_true", help="Only run the import-time check.")
+    args = parser.parse_args(argv)
+
+    # Startup check first, in fresh processes, before this one loads the model.
+    imports = measure_import_times(budget=args.import_budget) if args.import_budget > 0 else None
+    if imports:
+        print_import_times(imports)
+    if args.imports_only:
+        if imports:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"imports": imports}, f, indent=2)
+            print(f"✅ Results written to {args.output}")
+        return 0 if imports is None or imports["passed"] else 1
+
+    report = run_benchmark(
+        folder_path=args.folder,
+        synthetic_files=args.synthetic_files,
+        paragraphs=args.paragraphs,
+        seed=args.seed,
+        k=args.k,
+        repeat=args.repeat,
+        llm=args.llm,
+        llm_delay=args.llm_delay,
+        index_type=args.index_type,
+        search_mode=args.search_mode,
+        engine_options={"batch_size": args.batch_size, "num_threads": args.threads, "backend": args.backend},
+        collect_metrics=args.metrics,
+        profile_dir=args.profile_dir,
+        chunking=args.chunking,
+        language_models=dict(item.split("=", 1) for item in args.language_model),
+    )
+    if imports:
+        report["imports"] = imports
+    print_report(report)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    # Non-zero exit code when an entry point got slower to import than the budget.
+    return 0 if imports is None or imports["passed"] else 1
+
+
+# Run the benchmark only if this script is called directly.
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+# Import standard libraries for compact columns and the memory-mapped text file.
+import json
+import mmap
+import os
+from array import array
+
+import numpy as np
+
+# LangChain interfaces, so the FAISS vector store can use this as its docstore.
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+# File names inside an index folder.
+TEXT_FILE = "chunks.bin"
+COLUMNS_FILE = "chunks.npz"
+
+
+class ChunkStore(Docstore, AddableMixin):
+    """
+    Compact replacement for LangChain's InMemoryDocstore.
+
+    Instead of one Document object (and metadata dict) per chunk it keeps:
+    - Interned metadata: each distinct metadata dict (usually one per file
+      and page) is stored once; every chunk only keeps its int32 index.
+      The per-chunk `start_index` is kept in its own int64 column.
+    - Chunk text as UTF-8 in one file on disk, read through a memory map,
+      with an offset/length table (int64/int32 per chunk).
+    - Text of chunks added since the last save in a bytearray, until `save`
+      appends it to the file.
+
+    Documents are only created when a chunk is looked up (e.g. the top-k hits
+    of a search), and loading a saved store does not read any chunk text.
+    """
+
+    def __init__(self):
+        self.ids = []                # row -> doc id (None once deleted)
+        self.rows = {}               # doc id -> row
+        self.meta_idx = array("i")   # row -> index into self.metadata
+        self.offsets = array("q")    # row -> byte offset of the text
+        self.lengths = array("i")    # row -> byte length of the text
+        self.starts = array("q")     # row -> start_index metadata (-1 if missing)
+        self.metadata = []           # interned metadata dicts
+        self._meta_keys = {}         # JSON of a metadata dict -> index
+
+        # Saved text (memory-mapped) and text added since the last save.
+        self._text_path = None
+        self._file = None
+        self._map = None
+        self._saved_size = 0
+        self._tail = bytearray()
+
+        # Bytes of deleted chunks still in the text file (dropped when compacting).
+        self.garbage_bytes = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _intern(self, metadata):
+        key = json.dumps(metadata, sort_keys=True, default=str)
+        idx = self._meta_keys.get(key)
+        if idx is None:
+            idx = self._meta_keys[key] = len(self.metadata)
+            self.metadata.append(dict(metadata))
+        return idx
+
+    def add(self, texts):
+        """
+        Adds documents (dict of doc id -> Document), as LangChain's FAISS does.
+        """
+        overlapping = set(texts).intersection(self.rows)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for doc_id, doc in texts.items():
+            data = doc.page_content.encode("utf-8")
+            self.rows[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            metadata = dict(doc.metadata)
+            self.starts.append(metadata.pop("start_index", -1))
+            self.meta_idx.append(self._intern(metadata))
+            self.offsets.append(self._saved_size + len(self._tail))
+            self.lengths.append(len(data))
+            self._tail += data
+
+    def delete(self, ids):
+        """
+        Removes chunks by doc id (their text is dropped on the next compaction).
+        """
+        for doc_id in ids:
+            row = self.rows.pop(doc_id, None)
+            if row is not None:
+                self.ids[row] = None
+                self.garbage_bytes += self.lengths[row]
+
+    def _read(self, offset, length):
+        if offset >= self._saved_size:
+            start = offset - self._saved_size
+            return bytes(self._tail[start:start + length])
+        return self._map[offset:offset + length]
+
+    def text(self, doc_id):
+        """
+        Returns the text of one chunk without building a Document.
+        """
+        row = self.rows[doc_id]
+        return self._read(self.offsets[row], self.lengths[row]).decode("utf-8")
+
+    def search(self, search):
+        """
+        Returns the Document for a doc id (built on demand), or an error string
+        if the id is unknown, like InMemoryDocstore.
+        """
+        row = self.rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        metadata = dict(self.metadata[self.meta_idx[row]])
+        if self.starts[row] >= 0:
+            metadata["start_index"] = self.starts[row]
+        return Document(
+            page_content=self._read(self.offsets[row], self.lengths[row]).decode("utf-8"),
+            metadata=metadata,
+        )
+
+    def _open(self, text_path, size):
+        """
+        Memory-maps the saved text file (nothing is mapped for an empty file).
+        """
+        self.close()
+        self._text_path = text_path
+        self._saved_size = size
+        if size:
+            self._file = open(text_path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """
+        Releases the memory map. Text added since the last save is kept.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    def save(self, index_dir, order):
+        """
+        Writes the store to `index_dir`.
+
+        - New text is appended to the text file when it was last saved there
+          (and nobody else wrote it since); otherwise, or when more than half of
+          the file belongs to deleted chunks, a compacted file replaces it.
+        - The columns are written for the live chunks only, in `order`
+          (the doc ids in FAISS position order).
+
+        :param index_dir: Folder of the saved index.
+        :param order: List of doc ids, one per FAISS vector.
+        """
+        text_path = os.path.join(index_dir, TEXT_FILE)
+        on_disk = os.path.getsize(text_path) if os.path.exists(text_path) else -1
+        can_append = (
+            text_path == self._text_path
+            and on_disk == self._saved_size
+            and self.garbage_bytes * 2 <= self._saved_size + len(self._tail)
+        )
+
+        if can_append:
+            with open(text_path, "ab") as f:
+                f.write(self._tail)
+            size = self._saved_size + len(self._tail)
+        else:
+            # Rewrite only live chunks; offsets change, so update them too.
+            tmp_path = text_path + ".tmp"
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for row, doc_id in enumerate(self.ids):
+                    if doc_id is None:
+                        continue
+                    data = self._read(self.offsets[row], self.lengths[row])
+                    f.write(data)
+                    self.offsets[row] = size
+                    size += len(data)
+            os.replace(tmp_path, text_path)
+            self.garbage_bytes = 0
+
+        self._tail = bytearray()
+        self._open(text_path, size)
+
+        rows = np.fromiter((self.rows[doc_id] for doc_id in order), dtype=np.int64, count=len(order))
+        tmp_path = os.path.join(index_dir, COLUMNS_FILE + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.array(order, dtype=str),
+            meta_idx=np.frombuffer(self.meta_idx, dtype=np.int32)[rows],
+            offsets=np.frombuffer(self.offsets, dtype=np.int64)[rows],
+            lengths=np.frombuffer(self.lengths, dtype=np.int32)[rows],
+            starts=np.frombuffer(self.starts, dtype=np.int64)[rows],
+            metadata=np.array(json.dumps(self.metadata)),
+            text_size=np.array(size),
+            garbage_bytes=np.array(self.garbage_bytes),
+        )
+        os.replace(tmp_path, os.path.join(index_dir, COLUMNS_FILE))
+
+    @classmethod
+    def load(cls, index_dir):
+        """
+        Opens a store written by `save`. Only the columns are read; chunk text
+        stays on disk until it is looked up.
+
+        :return: The store; its `ids` are in FAISS position order.
+        """
+        store = cls()
+        with np.load(os.path.join(index_dir, COLUMNS_FILE)) as data:
+            store.ids = data["ids"].tolist()
+            store.meta_idx = array("i", data["meta_idx"].astype(np.int32).tobytes())
+            store.offsets = array("q", data["offsets"].astype(np.int64).tobytes())
+            store.lengths = array("i", data["lengths"].astype(np.int32).tobytes())
+            store.starts = array("q", data["starts"].astype(np.int64).tobytes())
+            store.metadata = json.loads(str(data["metadata"]))
+            text_size = int(data["text_size"])
+            store.garbage_bytes = int(data["garbage_bytes"])
+
+        store.rows = {doc_id: row for row, doc_id in enumerate(store.ids)}
+        store._meta_keys = {
+            json.dumps(meta, sort_keys=True, default=str): i for i, meta in enumerate(store.metadata)
+        }
+        store._open(os.path.join(index_dir, TEXT_FILE), text_size)
+        return store
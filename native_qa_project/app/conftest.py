@@ -0,0 +1,108 @@
+# Shared pytest fixtures: run the app modules without downloading the
+# embedding model or starting Ollama.
+import hashlib
+import os
+import re
+
+import numpy as np
+import pytest
+
+import qa
+from embedding_engine import EmbeddingEngine
+from ollama_stub import FakeBackend
+
+# test_pipeline.py is the end-to-end script (needs the real model and Ollama),
+# run it directly with `python app/test_pipeline.py`.
+collect_ignore = ["test_pipeline.py"]
+
+# Size of the test vectors.
+HASH_DIM = 64
+
+
+class HashEncoder:
+    """
+    Stand-in for the SentenceTransformer model: a bag-of-words vector where
+    every word adds 1 to a dimension picked by its hash. Texts sharing words
+    get similar vectors, so searches return meaningful chunks.
+    """
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True,
+               show_progress_bar=False):
+        self.calls += 1
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[i, int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dim] += 1.0
+            vectors[i, -1] += 0.01  # Empty texts still get a non-zero vector.
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+class HashEngine(EmbeddingEngine):
+    """
+    EmbeddingEngine running HashEncoder instead of a Hugging Face model.
+    Defined at module level so shard processes can create it too.
+    """
+
+    def __init__(self, model_name="test/hash", **options):
+        super().__init__(model_name, **options)
+        self._model = HashEncoder()
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """
+    Runs every test in its own folder, so the index, embedding and page
+    caches (relative folders) start empty and are cleaned up.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    return HashEngine()
+
+
+@pytest.fixture
+def fake_llm():
+    """
+    Answers LLM calls with ollama_stub.FakeBackend (no Ollama server needed).
+    """
+    backend = FakeBackend()
+    previous = qa.use_backend(backend)
+    yield backend
+    qa.use_backend(previous)
+    backend.close()
+
+
+def write_files(folder, files):
+    """
+    Writes {relative path: text} under `folder`.
+    """
+    for name, text in files.items():
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def topic_files(n_files, sentences=6):
+    """
+    Text files about distinct topics ('topic7 ...'), easy to retrieve by name.
+    """
+    return {
+        f"doc{i:03d}.txt": " ".join(
+            f"Document topic{i} sentence {j} talks about subject{i} and item{i * 31 + j}."
+            for j in range(sentences)
+        )
+        for i in range(n_files)
+    }
@@ -0,0 +1,176 @@
+# LangChain Document objects for the assembled context blocks.
+from langchain_core.documents import Document
+
+# Rough size of a token for budgeting (phi3/llama tokenizers average ~4 characters
+# per token on English text); the budget only needs to be approximately right.
+CHARS_PER_TOKEN = 4
+
+# Shortest text overlap treated as the splitter's chunk overlap when
+# chunks have no `start_index` (indexes built before it was recorded).
+MIN_OVERLAP_CHARS = 10
+
+
+def estimate_tokens(text):
+    """
+    Approximate number of LLM tokens in a text.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _text_overlap(left, right, max_chars=200):
+    """
+    Length of the longest suffix of `left` that is also a prefix of `right`.
+    """
+    for size in range(min(len(left), len(right), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _try_merge(block, doc):
+    """
+    Merges `doc` into `block` if it continues it (same file and page, and
+    overlapping or directly following it). Returns True if merged.
+    """
+    if (block["source"], block["page"]) != (doc.metadata.get("source"), doc.metadata.get("page")):
+        return False
+
+    text = doc.page_content
+    start = doc.metadata.get("start_index")
+    if block["start"] is not None and start is not None:
+        end = block["start"] + len(block["text"])
+        if start < block["start"] or start > end + 1:
+            return False
+        # Keep only the part of the new chunk after the end of the block.
+        block["text"] += (" " if start > end else "") + text[max(end - start, 0):]
+        return True
+
+    overlap = _text_overlap(block["text"], text)
+    if overlap:
+        block["text"] += text[overlap:]
+        return True
+    return False
+
+
+class ContextBuilder:
+    """
+    Turns retrieved chunks into the context sent to the LLM:
+    1. Optionally re-ranks them with a cross-encoder (best first).
+    2. Drops duplicate chunks and merges chunks that overlap or follow each
+       other in the same file and page (the splitter overlaps chunks by
+       30 characters, which would otherwise be sent twice).
+    3. Keeps the best k blocks that fit in `max_tokens`, cutting the last one
+       at a word boundary if needed.
+    """
+
+    def __init__(self, max_tokens=700, reranker=None, candidates=10, min_block_tokens=40):
+        """
+        :param max_tokens: Token budget for the whole context.
+        :param reranker: Optional CrossEncoderReranker.
+        :param candidates: Chunks to retrieve when re-ranking (see `fetch_k`).
+        :param min_block_tokens: A cut block must keep at least this many tokens (else it is dropped).
+        """
+        self.max_tokens = max_tokens
+        self.reranker = reranker
+        self.candidates = candidates
+        self.min_block_tokens = min_block_tokens
+
+    def fetch_k(self, k=3):
+        """
+        Number of chunks to retrieve for a final top-k: more when a reranker
+        will pick the best ones.
+        """
+        return max(k, self.candidates) if self.reranker else k
+
+    def build(self, question, docs, k=None):
+        """
+        :param question: The user question (used by the reranker).
+        :param docs: Retrieved chunks, best first (`fetch_k(k)` of them).
+        :param k: Blocks to keep after re-ranking and merging (None keeps all).
+        :return: List of Documents (merged blocks), best first, within the token budget.
+        """
+        docs = list(docs)
+        if self.reranker and len(docs) > 1:
+            docs = self.reranker.rerank(question, docs)
+
+        # Visit chunks by file, page and position, so a chunk that continues
+        # another comes right after it; a merged block keeps its best chunk's rank.
+        seen = set()
+        blocks = []
+        by_position = sorted(
+            range(len(docs)),
+            key=lambda i: (
+                str(docs[i].metadata.get("source")), str(docs[i].metadata.get("page")),
+                docs[i].metadata.get("start_index", -1), i,
+            ),
+        )
+        for i in by_position:
+            doc = docs[i]
+            if doc.page_content in seen:
+                continue
+            seen.add(doc.page_content)
+            if blocks and _try_merge(blocks[-1], doc):
+                blocks[-1]["rank"] = min(blocks[-1]["rank"], i)
+                blocks[-1]["chunks"] += 1
+                continue
+            blocks.append({
+                "source": doc.metadata.get("source"),
+                "page": doc.metadata.get("page"),
+                "start": doc.metadata.get("start_index"),
+                "text": doc.page_content,
+                "metadata": doc.metadata,
+                "chunks": 1,
+                "rank": i,
+            })
+        blocks.sort(key=lambda block: block["rank"])
+        if k is not None:
+            blocks = blocks[:k]
+
+        # Fill the budget with the best blocks.
+        context = []
+        remaining = self.max_tokens
+        for block in blocks:
+            text = block["text"]
+            tokens = estimate_tokens(text)
+            if tokens > remaining:
+                if remaining < self.min_block_tokens:
+                    break
+                text = text[:remaining * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+                tokens = estimate_tokens(text)
+            metadata = {key: value for key, value in block["metadata"].items() if key != "start_index"}
+            metadata["merged_chunks"] = block["chunks"]
+            context.append(Document(page_content=text, metadata=metadata))
+            remaining -= tokens
+            if remaining <= 0:
+                break
+        return context
+
+
+class CrossEncoderReranker:
+    """
+    Re-ranks chunks for a question with a small local cross-encoder
+    (scores the question and chunk together, more accurate than embeddings).
+    The model is loaded on first use.
+    """
+
+    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2", device="cpu", batch_size=16):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+
+    def rerank(self, question, docs):
+        """
+        :return: The docs sorted by cross-encoder score, best first.
+        """
+        if self._model is None:
+            # Imported here so the app starts without loading the model.
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, device=self.device)
+        scores = self._model.predict(
+            [(question, doc.page_content) for doc in docs],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        order = sorted(range(len(docs)), key=lambda i: -float(scores[i]))
+        return [docs[i] for i in order]
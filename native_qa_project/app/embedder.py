@@ -1,46 +1,748 @@
-# Import FAISS for efficient vector storage and similarity search,
-# and HuggingFaceEmbeddings for generating embeddings from text.
+# Import standard libraries for hashing files and storing the index manifest.
+import hashlib
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+
+# Import FAISS for efficient vector storage and similarity search.
+import faiss
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+
+# Approximate index types (IVF, HNSW, PQ) that can replace the exact index.
+from ann_index import build_faiss_index, index_vectors, is_flat, set_search_params, stores_exact_vectors
+
+# Batched embedding engine for generating embeddings from text.
+from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+
+# Import the single-file loader so only new or changed files are re-parsed.
+from loader import CHUNKING_MODES, hash_file, iter_file_chunks, list_files
+
+# Language of the query, to prefer the sub-index of that language.
+from language import detect_language
+
+# Cache of chunk embeddings shared by every index build.
+from embedding_cache import CACHE_DIR, CachedEmbeddings, get_cache
+
+# BM25 inverted index for exact-token (lexical) search.
+from lexical import BM25Index
+
+# Compact docstore: interned metadata, chunk text memory-mapped from disk.
+from chunk_store import ChunkStore
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+# Folder where saved indexes are kept (one subfolder per document folder).
+INDEX_ROOT = ".index_cache"
+
+# Name of the JSON file describing which files are in a saved index.
+MANIFEST_FILE = "manifest.json"
+
+# Name of the saved FAISS index (the chunks are saved by ChunkStore).
+FAISS_FILE = "index.faiss"
+
+# Name of the saved BM25 index (next to the FAISS files).
+LEXICAL_FILE = "lexical.npz"
+
+# Search modes: dense (FAISS only), lexical (BM25 only) or hybrid (both, fused).
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+
+# Merging results of per-language sub-indexes (reciprocal rank fusion):
+# a hit at rank r scores weight / (RRF_K + r). Sub-indexes not serving the
+# query's language get CROSS_LANGUAGE_WEIGHT, so their hits come after the
+# query language's hits unless those run out.
+RRF_K = 60
+CROSS_LANGUAGE_WEIGHT = 0.5
+
+# Bump this when the manifest layout changes so old indexes are rebuilt.
+MANIFEST_VERSION = 5
+
+
+def fuse_scores(dense, lexical, alpha=0.5):
+    """
+    Combines dense and BM25 candidates: each score list is min-max
+    normalized to [0, 1], then mixed with weight `alpha` for dense.
+    A chunk missing from one list gets 0 for that part.
+
+    :param dense: List of (doc id, cosine similarity).
+    :param lexical: List of (doc id, BM25 score).
+    :return: Doc ids, best first.
+    """
+    def normalize(hits):
+        if not hits:
+            return {}
+        scores = [score for _, score in hits]
+        low, high = min(scores), max(scores)
+        span = (high - low) or 1.0
+        return {doc_id: (score - low) / span if high > low else 1.0 for doc_id, score in hits}
+
+    dense_scores, lexical_scores = normalize(dense), normalize(lexical)
+    alpha = alpha if dense else 0.0
+    combined = {
+        doc_id: alpha * dense_scores.get(doc_id, 0.0) + (1 - alpha) * lexical_scores.get(doc_id, 0.0)
+        for doc_id in {**dense_scores, **lexical_scores}
+    }
+    return sorted(combined, key=combined.get, reverse=True)
+
+
+def default_index_dir(folder_path, index_type="flat"):
+    """
+    Returns the default folder where the index for `folder_path` is saved.
+    The absolute folder path is hashed so different folders never share an index,
+    and approximate index types get their own folder next to the exact one.
+    """
+    abs_path = os.path.abspath(folder_path)
+    key = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:12]
+    name = os.path.basename(abs_path.rstrip(os.sep)) or "root"
+    if index_type != "flat":
+        key += f"-{index_type}"
+    return os.path.join(INDEX_ROOT, f"{name}-{key}")
 
 
 class EmbeddingIndexer:
     """
     This class handles:
-    1. Creating embeddings for documents using a Hugging Face model.
-    2. Building a FAISS vector index for efficient similarity search.
-    3. Searching for top-k most similar document chunks for a given query.
+    1. Creating embeddings for documents using a Hugging Face model (see EmbeddingEngine).
+    2. Building a FAISS vector index (exact or approximate) for efficient similarity search.
+    3. Searching for top-k most similar document chunks for a given query
+       (dense, BM25 lexical, or a hybrid of both).
+    4. Saving/loading the index to disk and re-indexing only changed files.
+    5. Optionally routing languages to other embedding models (e.g. a
+       multilingual e5 for Arabic): their chunks go to a sub-index per model,
+       and search results of all sub-indexes are merged at query time.
     """
 
-    def __init__(self):
+    def __init__(self, model_name=DEFAULT_MODEL, cache_dir=CACHE_DIR,
+                 index_type="flat", index_options=None, engine=None,
+                 search_mode="dense", hybrid_alpha=0.5, chunking="fixed",
+                 language_models=None, engines=None, **engine_options):
+        """
+        :param model_name: Hugging Face model used for embeddings.
+        :param cache_dir: Folder of the embedding cache (None disables the cache).
+        :param index_type: FAISS index type, one of ann_index.INDEX_TYPES
+                           ('flat' is exact; 'ivf_flat', 'hnsw', 'ivf_pq', 'ivf_sq8' are approximate).
+        :param index_options: Build/search settings such as nlist, nprobe, ef_search, pq_m
+                              (see ann_index.DEFAULT_OPTIONS).
+        :param engine: An already loaded EmbeddingEngine to share (model_name and
+                       engine_options are then ignored).
+        :param search_mode: 'dense', 'lexical' (BM25) or 'hybrid' (see SEARCH_MODES).
+        :param hybrid_alpha: Weight of the dense score in hybrid mode (1 - alpha for BM25).
+        :param chunking: 'fixed' or 'language' (see loader.CHUNKING_MODES).
+        :param language_models: Languages embedded with another model, e.g.
+                                {"ar": "intfloat/multilingual-e5-base"}; other languages use `model_name`.
+        :param engines: Dict of model name -> EmbeddingEngine shared between indexers,
+                        so each routed model is loaded once (filled as needed).
+        :param engine_options: Throughput settings passed to EmbeddingEngine
+                               (batch_size, num_threads, max_seq_length, use_prefixes, verbose).
+        """
         # Initialize the embedding model from Hugging Face.
-        # Here, we use the 'intfloat/e5-base-v2' model for dense vector embeddings.
-        self.embeddings = HuggingFaceEmbeddings(model_name="intfloat/e5-base-v2")
+        # By default, we use the 'intfloat/e5-base-v2' model for dense vector embeddings.
+        self.engine = engine or EmbeddingEngine(model_name, **engine_options)
+        self.embeddings = self.engine
+
+        # The key covers the model and its input settings, so changing
+        # either one never mixes incompatible vectors.
+        self.model_name = self.engine.cache_key
+
+        # Reuse vectors of chunks embedded before (pass cache_dir=None to disable).
+        if cache_dir:
+            self.embeddings = CachedEmbeddings(
+                self.engine, get_cache(self.model_name, cache_dir)
+            )
 
         # This will store the FAISS index once built.
         self.index = None
+        self.index_type = index_type
+        self.index_options = index_options or {}
+
+        # Per-file state of the index: content hash, mtime, size and chunk ids.
+        self.files = {}
+
+        # BM25 index over the same chunks, built on first lexical/hybrid search.
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{search_mode}', expected one of {SEARCH_MODES}")
+        self.search_mode = search_mode
+        self.hybrid_alpha = hybrid_alpha
+        self.lexical = None
+
+        if chunking not in CHUNKING_MODES:
+            raise ValueError(f"Unknown chunking '{chunking}', expected one of {CHUNKING_MODES}")
+        self.chunking = chunking
+
+        # One sub-index per routed model (languages of the main model stay in this index).
+        self.language_models = dict(language_models or {})
+        self.engines = engines if engines is not None else {}
+        self.routes = {}
+        for route_model in sorted(set(self.language_models.values()) - {self.engine.model_name}):
+            route_engine = self.engines.get(route_model)
+            if route_engine is None:
+                route_engine = self.engines.setdefault(
+                    route_model, EmbeddingEngine(route_model, **engine_options)
+                )
+            self.routes[route_model] = EmbeddingIndexer(
+                engine=route_engine, cache_dir=cache_dir, index_type=index_type,
+                index_options=index_options, search_mode=search_mode,
+                hybrid_alpha=hybrid_alpha, chunking=chunking,
+            )
+
+        # Identify the index and its content; the version changes every time
+        # the indexed content changes (used to invalidate cached answers).
+        self.index_id = "in-memory"
+        self.index_version = None
+
+    @property
+    def own_chunk_count(self):
+        """
+        Number of chunks in this index (not counting language sub-indexes).
+        """
+        return self.index.index.ntotal if self.index is not None else 0
+
+    @property
+    def chunk_count(self):
+        """
+        Number of chunks currently stored in the index and its sub-indexes.
+        """
+        return self.own_chunk_count + sum(route.chunk_count for route in self.routes.values())
 
-    def build_index(self, documents):
+    def _route(self, language):
+        """
+        The indexer holding chunks of `language` (this one, or a sub-index).
+        """
+        return self.routes.get(self.language_models.get(language), self)
+
+    def _indexers(self):
+        return [self, *self.routes.values()]
+
+    def _clear(self):
+        """
+        Empties this index and its sub-indexes (in memory only).
         """
-        Given a list of chunked documents:
-        - Convert them to embeddings.
+        for indexer in self._indexers():
+            indexer.index = None
+            indexer.files = {}
+            indexer.index_version = None
+            indexer.lexical = None
+
+    @metrics.timed("build_index_seconds", profiled=True)
+    def build_index(self, documents, batch_size=256):
+        """
+        Given chunked documents (a list, or a generator such as `loader.stream_documents`):
+        - Convert them to embeddings, `batch_size` chunks at a time.
         - Build a FAISS vector index for similarity search.
         - normalize_L2=True makes FAISS use cosine similarity instead of L2 distance.
+
+        Consuming the documents in batches lets embedding start while the
+        loader is still parsing later files.
+        """
+        self._clear()
+        self.index_version = uuid.uuid4().hex
+        for route in self.routes.values():
+            route.index_version = self.index_version
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                self._add_batch(batch)
+                batch = []
+        self._add_batch(batch)
+        for indexer in self._indexers():
+            indexer._apply_index_type()
+
+    def _create_index(self, documents, ids=None):
         """
-        self.index = FAISS.from_documents(
-            documents,
-            self.embeddings,
+        Creates the FAISS vector store from the first documents.
+        Chunks are kept in a ChunkStore instead of LangChain's in-memory
+        docstore, so no Document object is kept per chunk.
+        """
+        texts = [doc.page_content for doc in documents]
+        vectors = self.embeddings.embed_documents(texts)
+        self.index = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.IndexFlatL2(len(vectors[0])),
+            docstore=ChunkStore(),
+            index_to_docstore_id={},
             normalize_L2=True  # Using cosine similarity is generally better for embeddings.
         )
+        self.index.add_embeddings(
+            zip(texts, vectors), metadatas=[doc.metadata for doc in documents], ids=ids
+        )
+
+    def _partition(self, documents, ids):
+        """
+        Groups documents (and their ids) by the indexer their language is routed to.
+        """
+        groups = {}
+        for doc, doc_id in zip(documents, ids):
+            indexer = self._route(doc.metadata.get("language"))
+            group = groups.setdefault(id(indexer), (indexer, [], []))
+            group[1].append(doc)
+            group[2].append(doc_id)
+        return list(groups.values())
+
+    def _add_batch(self, documents):
+        """
+        Embeds one batch of documents into the index, creating it on the first batch.
+        """
+        self.add_documents(documents, [uuid.uuid4().hex for _ in documents])
+
+    def add_documents(self, documents, ids):
+        """
+        Adds chunked documents with the given ids, creating the index if needed.
+        Chunks of routed languages go to their model's sub-index.
+        """
+        if not documents:
+            return
+        for indexer, docs, doc_ids in self._partition(documents, ids):
+            if indexer.index is None:
+                indexer._create_index(docs, doc_ids)
+            else:
+                indexer.index.add_documents(docs, ids=doc_ids)
+
+    def remove_documents(self, ids):
+        """
+        Removes the chunks with the given ids from the index (or the sub-index holding them).
+        """
+        for indexer in self._indexers():
+            if indexer.index is None:
+                continue
+            rows = indexer.index.docstore.rows
+            own_ids = [doc_id for doc_id in ids if doc_id in rows]
+            if own_ids:
+                indexer._remove(own_ids)
+
+    def _remove(self, ids):
+        """
+        Removes chunks that are in this index (not in a sub-index).
+        """
+        if not is_flat(self.index.index):
+            # Only a flat index renumbers its vectors on removal the way
+            # LangChain renumbers `index_to_docstore_id` (HNSW cannot remove at
+            # all, IVF keeps the old positions). Switch back to an exact index;
+            # `_apply_index_type` retrains the approximate one once all changes are applied.
+            flat = faiss.IndexFlatL2(self.index.index.d)
+            flat.add(self._exact_vectors())
+            self.index.index = flat
+        self.index.delete(ids)
+
+    def _exact_vectors(self):
+        """
+        All vectors of this index, in index order, as they were embedded.
+        PQ and SQ8 indexes only keep lossy codes, so their chunks are embedded
+        again (read from the embedding cache when enabled): retraining on the
+        decoded vectors would add quantization error on every update.
+        """
+        if stores_exact_vectors(self.index.index):
+            return index_vectors(self.index.index)
+        texts = [
+            self.index.docstore.text(self.index.index_to_docstore_id[i]) for i in range(self.own_chunk_count)
+        ]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def _apply_index_type(self):
+        """
+        Chunks are first added to an exact flat index; for approximate index
+        types, the flat index is then replaced by a trained IVF/HNSW/PQ index
+        holding the same vectors in the same order (so docstore ids still match).
+        Later additions go straight into the trained index.
+        """
+        if self.index is None or self.index_type == "flat" or not is_flat(self.index.index):
+            return
+        self.index.index = build_faiss_index(
+            index_vectors(self.index.index), self.index_type, self.index_options
+        )
+
+    @staticmethod
+    def _route_dir(index_dir, route_model):
+        """
+        Folder of a language sub-index, inside the main index folder.
+        """
+        return os.path.join(index_dir, "route-" + re.sub(r"[^\w.-]+", "_", route_model))
+
+    def save(self, index_dir):
+        """
+        Saves the FAISS index, the chunk store and the file manifest to `index_dir`
+        (language sub-indexes are saved in subfolders first).
+        The manifest is written last, so a half-written save is detected on load.
+        """
+        if self.index is None and not self.routes:
+            return
+        os.makedirs(index_dir, exist_ok=True)
+        if isinstance(self.embeddings, CachedEmbeddings):
+            # Vectors embedded for this index are kept for the next build.
+            self.embeddings.cache.flush()
+        for route_model, route in self.routes.items():
+            route.save(self._route_dir(index_dir, route_model))
+
+        if self.index is not None:
+            faiss_path = os.path.join(index_dir, FAISS_FILE)
+            faiss.write_index(self.index.index, faiss_path + ".tmp")
+            os.replace(faiss_path + ".tmp", faiss_path)
+            order = [self.index.index_to_docstore_id[i] for i in range(self.own_chunk_count)]
+            self.index.docstore.save(index_dir, order)
+            if self.search_mode != "dense":
+                self.lexical_index().save(os.path.join(index_dir, LEXICAL_FILE))
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "model_name": self.model_name,
+            "index_type": self.index_type,
+            "chunking": self.chunking,
+            "language_models": self.language_models,
+            "index_version": self.index_version,
+            "chunk_count": self.own_chunk_count,
+            "routes": {route_model: route.chunk_count for route_model, route in self.routes.items()},
+            "files": self.files,
+        }
+        tmp_path = os.path.join(index_dir, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(index_dir, MANIFEST_FILE))
+
+    def load(self, index_dir):
+        """
+        Loads a previously saved index from `index_dir`.
+
+        :return: True if a usable index was loaded, False otherwise
+                 (missing files, other model or chunking, or an interrupted save).
+        """
+        manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return False
+
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (
+                manifest.get("version") != MANIFEST_VERSION
+                or manifest.get("model_name") != self.model_name
+                or manifest.get("index_type") != self.index_type
+                or manifest.get("chunking", "fixed") != self.chunking
+                or manifest.get("language_models", {}) != self.language_models
+            ):
+                return False
+
+            # Only the chunk columns are read; chunk text stays on disk (memory-mapped).
+            # An index whose chunks all went to sub-indexes has no files of its own.
+            index = None
+            if manifest.get("chunk_count") or not self.routes:
+                store = ChunkStore.load(index_dir)
+                index = FAISS(
+                    embedding_function=self.embeddings,
+                    index=faiss.read_index(os.path.join(index_dir, FAISS_FILE)),
+                    docstore=store,
+                    index_to_docstore_id=dict(enumerate(store.ids)),
+                    normalize_L2=True
+                )
+
+            # Reuse the saved BM25 index if it matches this version of the chunks.
+            lexical = None
+            lexical_path = os.path.join(index_dir, LEXICAL_FILE)
+            if os.path.exists(lexical_path):
+                lexical = BM25Index.load(lexical_path)
+                if lexical.version != manifest["index_version"]:
+                    lexical = None
+        except Exception as e:
+            print(f"⚠️ Could not load saved index from {index_dir}: {e}")
+            return False
+
+        # The index, chunk store and manifest must describe the same chunks.
+        if index is not None and not index.index.ntotal == len(store) == manifest.get("chunk_count"):
+            return False
+
+        # Sub-indexes must be the ones saved with this manifest (same version).
+        saved_routes = manifest.get("routes", {})
+        for route_model, route in self.routes.items():
+            if not saved_routes.get(route_model):
+                continue
+            if (
+                not route.load(self._route_dir(index_dir, route_model))
+                or route.index_version != manifest["index_version"]
+                or route.chunk_count != saved_routes[route_model]
+            ):
+                return False
 
+        if index is not None:
+            set_search_params(index.index, self.index_options)
+        self.index = index
+        self.files = manifest["files"]
+        self.index_version = manifest["index_version"]
+        self.lexical = lexical
+        return True
+
+    @metrics.timed("load_or_build_seconds", profiled=True)
+    def load_or_build(self, folder_path, index_dir=None, workers=1, include=None):
+        """
+        Loads the saved index for `folder_path` and brings it up to date:
+        - Files that are new or whose content changed are parsed, chunked and embedded.
+        - Chunks of files that were deleted (or changed) are removed from the index.
+        - Files whose size and mtime did not change are not even re-hashed.
+        The updated index is then saved back to disk.
+
+        :param folder_path: Path to the folder containing documents.
+        :param index_dir: Where to save the index (defaults to a folder under INDEX_ROOT).
+        :param workers: Number of processes used to parse files (1 = no pool).
+        :param include: Optional function (file path relative to the folder -> bool);
+                        other files are left out, as if absent (used by shards).
+        :return: Dict with the lists of 'added', 'updated' and 'removed' files
+                 and the number of 'unchanged' files.
+        """
+        index_dir = index_dir or default_index_dir(folder_path, self.index_type)
+        self.index_id = os.path.abspath(index_dir)
+        if not self.load(index_dir):
+            self._clear()
+
+        stats = {"added": [], "updated": [], "removed": [], "unchanged": 0}
+        seen = set()
+        changed = False
+
+        # 1️⃣ Find the files whose content is new or different.
+        to_parse = {}
+        for path in list_files(folder_path):
+            key = os.path.relpath(path, folder_path)
+            if include is not None and not include(key):
+                continue
+            seen.add(key)
+            stat = os.stat(path)
+            entry = self.files.get(key)
+
+            # Fast path: same size and mtime means the file was not touched.
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                stats["unchanged"] += 1
+                continue
+
+            file_hash = hash_file(path)
+            if entry and entry["sha256"] == file_hash:
+                # Touched but not modified: just remember the new mtime.
+                entry["mtime"] = stat.st_mtime
+                entry["size"] = stat.st_size
+                stats["unchanged"] += 1
+                changed = True
+                continue
+
+            to_parse[path] = {
+                "key": key,
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_hash,
+            }
+
+        # 2️⃣ Parse them (possibly in parallel) and embed each file as soon as it is ready.
+        # The hashes are passed on, so PDFs are not read again to check the page cache.
+        hashes = {path: info["sha256"] for path, info in to_parse.items()}
+        for path, chunks in iter_file_chunks(list(to_parse), workers, self.chunking, hashes):
+            info = to_parse[path]
+            key = info.pop("key")
+            entry = self.files.get(key)
+
+            # Replace the old chunks of this file with the new ones.
+            if entry:
+                self.remove_documents(entry["ids"])
+            ids = [uuid.uuid4().hex for _ in chunks]
+            self.add_documents(chunks, ids)
+
+            self.files[key] = dict(info, ids=ids)
+            stats["updated" if entry else "added"].append(key)
+            changed = True
+
+        # Drop chunks of files that no longer exist.
+        for key in sorted(set(self.files) - seen):
+            self.remove_documents(self.files.pop(key)["ids"])
+            stats["removed"].append(key)
+            changed = True
+
+        if changed:
+            self.index_version = uuid.uuid4().hex
+            for indexer in self._indexers():
+                # Sub-indexes share the version, so their BM25 indexes are rebuilt too.
+                indexer.index_version = self.index_version
+                indexer._apply_index_type()
+            self.save(index_dir)
+        elif self.search_mode != "dense" and self.chunk_count:
+            # Saved before lexical/hybrid search was turned on: add the BM25 indexes.
+            for route_model, route in self.routes.items():
+                if route.index is not None and route.lexical is None:
+                    route.lexical_index().save(os.path.join(self._route_dir(index_dir, route_model), LEXICAL_FILE))
+            if self.index is not None and self.lexical is None:
+                self.lexical_index().save(os.path.join(index_dir, LEXICAL_FILE))
+        return stats
+
+    @metrics.timed("search_seconds", profiled=True)
     def search(self, query, k=3):
         """
         Perform a similarity search:
         - Embed the input query.
         - Return the top-k most similar document chunks from the index.
-        
+
         :param query: The user question or search string.
         :param k: Number of top results to return.
         :return: List of matched Document chunks.
         """
-        return self.index.similarity_search(query, k=k)
+        if self.chunk_count == 0:
+            return []
+        # Same results as `self.index.similarity_search`, but with the query
+        # embedding and the FAISS search timed separately.
+        return self.search_vectors([self.embed_query(query)], k, [query])[0]
+
+    def lexical_index(self):
+        """
+        Returns the BM25 index for the current chunks, (re)building it if
+        the vector index changed since it was built.
+        """
+        if self.lexical is None or self.lexical.version != self.index_version:
+            doc_ids = list(self.index.index_to_docstore_id.values())
+            texts = [self.index.docstore.text(doc_id) for doc_id in doc_ids]
+            with metrics.timer("bm25_build_seconds"):
+                self.lexical = BM25Index.build(doc_ids, texts, version=self.index_version)
+        return self.lexical
+
+    def embed_query(self, query):
+        """
+        Returns the normalized float32 query vector used for searching.
+        """
+        vector = np.asarray([self.engine.embed_query(query)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector[0]
+
+    def search_by_vector(self, vector, k=3, query=None):
+        """
+        Same as `search`, for a query that was already embedded with `embed_query`.
+        Pass the query text too, so lexical/hybrid modes can use it.
+        """
+        queries = None if query is None else [query]
+        return self.search_vectors(np.asarray([vector], dtype=np.float32), k, queries)[0]
+
+    def search_batch(self, queries, k=3):
+        """
+        Searches many queries at once:
+        - One batched embedding call for all queries.
+        - One multi-query FAISS search.
+
+        :param queries: List of questions.
+        :param k: Number of top results per query.
+        :return: One list of matched Document chunks per query.
+        """
+        if self.chunk_count == 0 or not queries:
+            return [[] for _ in queries]
+        return self.search_vectors(self.embed_queries(queries), k, queries)
+
+    def embed_queries(self, queries):
+        """
+        Embeds many queries in one batched call; returns normalized float32 vectors.
+        """
+        vectors = np.asarray(self.engine.embed_queries(queries), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def search_vectors(self, vectors, k=3, queries=None):
+        """
+        One multi-query FAISS search for already embedded queries.
+        In lexical/hybrid mode, `queries` (the query texts) are also searched with BM25.
+
+        With language sub-indexes, the query texts are also embedded with each
+        sub-index's model and the results are merged (see `_merge_routes`);
+        without the texts only this index is searched.
+
+        :param vectors: float32 array (n, dim) from `embed_query`/`embed_queries`.
+        :param queries: Query texts (optional; without them the search is dense only).
+        :return: One list of matched Document chunks per vector.
+        """
+        results = self._search_own(vectors, k, queries)
+        if queries is None or not any(route.index is not None for route in self.routes.values()):
+            return results
+
+        # Each result list is weighted by whether its index serves the query's language.
+        languages = [detect_language(query) for query in queries]
+        ranked = [[(results[i], 1.0 if self._route(language) is self else CROSS_LANGUAGE_WEIGHT)]
+                  for i, language in enumerate(languages)]
+        for route in self.routes.values():
+            if route.index is None:
+                continue
+            route_results = route.search_vectors(route.embed_queries(queries), k, queries)
+            for i, language in enumerate(languages):
+                weight = 1.0 if self._route(language) is route else CROSS_LANGUAGE_WEIGHT
+                ranked[i].append((route_results[i], weight))
+        with metrics.timer("route_merge_seconds"):
+            return [self._merge_routes(lists, k) for lists in ranked]
+
+    @staticmethod
+    def _merge_routes(lists, k):
+        """
+        Merges ranked Document lists of several indexes with weighted
+        reciprocal rank fusion (their scores come from different models,
+        so only ranks are compared).
+
+        :param lists: List of (documents best first, weight).
+        :return: The top-k Documents.
+        """
+        scored = []
+        for order, (docs, weight) in enumerate(lists):
+            for rank, doc in enumerate(docs):
+                scored.append((-weight / (RRF_K + rank), order, rank, doc))
+        scored.sort(key=lambda item: item[:3])
+        return [doc for *_, doc in scored[:k]]
+
+    def _search_own(self, vectors, k=3, queries=None):
+        """
+        `search_vectors` on this index only (no sub-indexes).
+        """
+        if self.index is None:
+            return [[] for _ in vectors]
+        dense_only = self.search_mode == "dense" or queries is None
+        # Look at more candidates than needed, so fusion can reorder them.
+        n_candidates = k if dense_only else max(4 * k, 20)
+
+        results = []
+        for dense, lexical in self.search_candidates(vectors, n_candidates, queries):
+            if dense_only:
+                doc_ids = [doc_id for doc_id, _ in dense]
+            else:
+                with metrics.timer("fusion_seconds"):
+                    doc_ids = fuse_scores(dense, lexical, self.hybrid_alpha)[:k]
+            results.append([self.index.docstore.search(doc_id) for doc_id in doc_ids])
+        return results
+
+    def search_candidates(self, vectors, n, queries=None):
+        """
+        Scored candidates of this index, before fusion (the results of several
+        indexes, e.g. shards, can then be fused together, see sharding.py).
+
+        :param n: Candidates per list.
+        :return: Per query, (dense hits, lexical hits): lists of (doc id, score), best first.
+        """
+        if self.index is None:
+            return [([], []) for _ in vectors]
+        if self.search_mode == "dense" or queries is None:
+            return [(hits, []) for hits in self._dense_hits(vectors, n)]
+
+        lexical = self.lexical_index()
+        dense_hits = (
+            self._dense_hits(vectors, n)
+            if self.search_mode == "hybrid" else [[] for _ in queries]
+        )
+        candidates = []
+        for query, dense in zip(queries, dense_hits):
+            with metrics.timer("bm25_search_seconds"):
+                candidates.append((dense, lexical.search(query, n)))
+        return candidates
+
+    def _dense_hits(self, vectors, k):
+        """
+        FAISS search returning (docstore id, cosine similarity) pairs per query.
+        """
+        with metrics.timer("faiss_search_seconds", index_type=self.index_type):
+            distances, rows = self.index.index.search(np.ascontiguousarray(vectors, dtype=np.float32), k)
+        metrics.count("faiss_queries_total", len(rows), index_type=self.index_type)
+        results = []
+        for dist_row, row in zip(distances, rows):
+            # FAISS returns -1 when fewer than k chunks are available.
+            # Squared L2 distance between unit vectors is 2 - 2 * cosine.
+            results.append([
+                (self.index.index_to_docstore_id[i], 1.0 - float(d) / 2)
+                for d, i in zip(dist_row, row) if i != -1
+            ])
+        return results
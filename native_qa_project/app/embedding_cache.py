@@ -0,0 +1,264 @@
+# Import standard libraries for hashing chunk text and storing the cache index.
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# NumPy stores the cached vectors in a memory-mapped file.
+import numpy as np
+
+# Base class so the cache can be used anywhere LangChain expects embeddings.
+from langchain_core.embeddings import Embeddings
+
+# Folder where cached embeddings are kept (shared by every index build).
+CACHE_DIR = ".embedding_cache"
+
+# Default number of vectors kept before the least recently used ones are evicted.
+# 200k float16 vectors of 768 dims take about 300 MB on disk.
+DEFAULT_MAX_ENTRIES = 200_000
+
+# Minimum seconds between two writes of the JSON index during an ingest
+# (each write dumps every entry). Indexes flush the cache when they are saved.
+FLUSH_INTERVAL = 5.0
+
+
+# Open caches, so every user in this process shares one instance per file.
+_open_caches = {}
+_open_caches_lock = threading.Lock()
+
+
+def normalize_text(text):
+    """
+    Normalizes chunk text before hashing, so whitespace-only
+    differences still hit the same cache entry.
+    """
+    return " ".join(text.split())
+
+
+def text_hash(text):
+    """
+    Returns the hash used as cache key for a chunk of text.
+    """
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embedding vectors for one embedding model.
+
+    - Vectors live in a memory-mapped float16 (or float32) array on disk.
+    - A JSON index maps each text hash to its row in the array.
+    - The index is kept in least-recently-used order; once `max_entries`
+      vectors are stored, the oldest rows are reused for new vectors.
+
+    Note: one cache folder should only be written by one process at a time.
+    """
+
+    def __init__(self, model_name, cache_dir=CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, dtype="float16"):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+
+        # One pair of files per model, since vector sizes differ between models.
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, f"{slug}.vectors")
+        self.index_path = os.path.join(cache_dir, f"{slug}.json")
+
+        # text hash -> row, ordered from least to most recently used.
+        self.entries = OrderedDict()
+        self.free_rows = []
+        self.dim = None
+        self.capacity = 0
+        self.vectors = None
+        self.lock = threading.Lock()
+
+        # Simple counters to see how well the cache works.
+        self.hits = 0
+        self.misses = 0
+
+        # Entries changed since the last flush (and whether rows were reused).
+        self.dirty = False
+        self._evicted = False
+        self._last_flush = time.monotonic()
+
+        self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        """
+        Opens the vectors file and index written by a previous run, if any.
+        """
+        if not (os.path.exists(self.index_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["model_name"] != self.model_name or meta["dtype"] != self.dtype.name:
+                return
+            self.dim = meta["dim"]
+            self.capacity = meta["capacity"]
+            self.vectors = np.memmap(
+                self.vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim)
+            )
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable embedding cache {self.index_path}: {e}")
+            self.dim, self.capacity, self.vectors = None, 0, None
+            return
+
+        self.entries = OrderedDict((h, row) for h, row in meta["entries"])
+        used = set(self.entries.values())
+        self.free_rows = [row for row in range(self.capacity) if row not in used]
+
+    def _grow(self, needed):
+        """
+        Makes sure the vectors file has room for at least `needed` rows.
+        The file grows by doubling, up to `max_entries` rows.
+        """
+        if needed <= self.capacity:
+            return
+        new_capacity = min(self.max_entries, max(needed, 2 * self.capacity, 1024))
+
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * self.dtype.itemsize)
+        self.vectors = np.memmap(
+            self.vectors_path, dtype=self.dtype, mode="r+", shape=(new_capacity, self.dim)
+        )
+
+        self.free_rows.extend(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+
+    def get_many(self, hashes):
+        """
+        Looks up cached vectors.
+
+        :param hashes: List of text hashes.
+        :return: Dict of hash -> float32 vector for the hashes found in the cache.
+        """
+        found = {}
+        with self.lock:
+            for h in hashes:
+                row = self.entries.get(h)
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(h)
+                found[h] = np.asarray(self.vectors[row], dtype=np.float32)
+                self.hits += 1
+        return found
+
+    def put_many(self, hashes, vectors):
+        """
+        Stores vectors for the given hashes, evicting the least
+        recently used entries when the cache is full.
+        """
+        if not hashes:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            self._grow(len(self.entries) + len(hashes))
+
+            for h, vector in zip(hashes, vectors):
+                row = self.entries.get(h)
+                if row is None:
+                    if not self.free_rows:
+                        # Cache is full: reuse the row of the oldest entry.
+                        _, row = self.entries.popitem(last=False)
+                        self._evicted = True
+                    else:
+                        row = self.free_rows.pop()
+                self.vectors[row] = vector
+                self.entries[h] = row
+                self.entries.move_to_end(h)
+            self.dirty = True
+
+    def maybe_flush(self):
+        """
+        Flushes if entries changed and FLUSH_INTERVAL passed since the last
+        flush, or right away if rows of old entries were reused (the index on
+        disk would otherwise point them to the new vectors).
+        """
+        if self.dirty and (self._evicted or time.monotonic() - self._last_flush >= FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the vectors and the hash -> row index to disk (nothing to do
+        if no entry changed since the last flush).
+        """
+        with self.lock:
+            if self.vectors is None or not self.dirty:
+                return
+            self.vectors.flush()
+            meta = {
+                "model_name": self.model_name,
+                "dtype": self.dtype.name,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "entries": list(self.entries.items()),
+            }
+            # Per-process temporary name, so two writers never share it.
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = self._evicted = False
+            self._last_flush = time.monotonic()
+
+
+def get_cache(model_name, cache_dir=CACHE_DIR, **options):
+    """
+    Returns the process-wide EmbeddingCache for a model and folder,
+    opening it on first use. Two instances writing the same files would
+    overwrite each other's rows, so use this instead of EmbeddingCache().
+    """
+    key = (model_name, os.path.abspath(cache_dir))
+    with _open_caches_lock:
+        if key not in _open_caches:
+            _open_caches[key] = EmbeddingCache(model_name, cache_dir, **options)
+        return _open_caches[key]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so document chunks that were already
+    embedded (on an earlier run, or in another folder) are read from
+    an EmbeddingCache instead of running the model again.
+    Queries are always embedded directly.
+    """
+
+    def __init__(self, embeddings, cache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(hashes)
+
+        # Embed each missing text only once, even if it appears several times.
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = text
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.put_many(list(missing), new_vectors)
+            self.cache.maybe_flush()
+            for h, vector in zip(missing, new_vectors):
+                vectors[h] = np.asarray(vector, dtype=np.float32)
+
+        return [vectors[h].tolist() for h in hashes]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,224 @@
+# Import time to measure how fast chunks are embedded, and a lock for lazy loading.
+import threading
+import time
+from collections import deque
+
+# sentence-transformers (which runs the Hugging Face model) and torch are only
+# imported when the model is first needed: together they take seconds to import.
+# The ONNX backend (onnx_backend.py) does not need them once the model is exported.
+
+# Base class so the engine can be used anywhere LangChain expects embeddings.
+from langchain_core.embeddings import Embeddings
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+# Default embedding model used by the whole project.
+DEFAULT_MODEL = "intfloat/e5-base-v2"
+
+# Ways to run the model: 'torch' (sentence-transformers, float32) or 'onnx'
+# (exported model under onnxruntime, int8-quantized by default).
+BACKENDS = ("torch", "onnx")
+
+# Number of recent batches whose timings are kept (older ones are dropped,
+# so a long-running server does not accumulate them).
+MAX_BATCH_TIMINGS = 1000
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    Embedding model wrapper tuned for CPU-only ingest:
+    - Encodes chunks in batches of `batch_size`.
+    - Sorts chunks by length first, so each batch pads to similar lengths.
+    - Optionally pins the number of PyTorch intra-op threads.
+    - Optionally truncates inputs to `max_seq_length` tokens.
+    - Optionally adds the e5 "passage: " / "query: " prefixes.
+    - Optionally runs the model as int8 ONNX under onnxruntime (`backend="onnx"`),
+      which is faster on CPU; check it with `python app/onnx_backend.py`.
+    - Records the timings of recent batches and the overall chunks/sec.
+    - Loads the model on first use (or in the background with `warm_up`),
+      so creating an engine and loading a saved index stay fast.
+    """
+
+    def __init__(
+        self,
+        model_name=DEFAULT_MODEL,
+        batch_size=32,
+        num_threads=None,
+        max_seq_length=None,
+        use_prefixes=False,
+        device="cpu",
+        verbose=False,
+        backend="torch",
+        quantize=True,
+    ):
+        """
+        :param backend: 'torch' or 'onnx' (see BACKENDS); the ONNX model is
+                        exported to onnx_backend.ONNX_DIR on first use.
+        :param quantize: With the ONNX backend, use int8 weights (else float32).
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_seq_length = max_seq_length
+        self.use_prefixes = use_prefixes
+        self.verbose = verbose
+        self.num_threads = num_threads
+        self.device = device
+        self.backend = backend
+        self.quantize = quantize
+
+        # The SentenceTransformer model (or OnnxEncoder), loaded by `model` on first use.
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        # Throughput counters since the engine was created, and the
+        # (chunks, seconds) of the last MAX_BATCH_TIMINGS batches.
+        self.total_chunks = 0
+        self.total_seconds = 0.0
+        self.batch_timings = deque(maxlen=MAX_BATCH_TIMINGS)
+
+    @property
+    def model(self):
+        """
+        The SentenceTransformer model (or OnnxEncoder), loaded (once) on first access.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None and self.backend == "onnx":
+                    from onnx_backend import load_onnx_model
+                    self._model = load_onnx_model(
+                        self.model_name, quantize=self.quantize,
+                        num_threads=self.num_threads, max_seq_length=self.max_seq_length,
+                    )
+                elif self._model is None:
+                    import torch
+                    from sentence_transformers import SentenceTransformer
+
+                    # Pin intra-op threads (applies to the whole process).
+                    if self.num_threads:
+                        torch.set_num_threads(self.num_threads)
+
+                    model = SentenceTransformer(self.model_name, device=self.device)
+                    if self.max_seq_length:
+                        model.max_seq_length = self.max_seq_length
+                    self._model = model
+        return self._model
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def warm_up(self, background=True):
+        """
+        Loads the model now, in a background thread by default, so the first
+        query does not wait for it.
+
+        :return: The loading thread (None if loaded in the foreground or already loaded).
+        """
+        if self.loaded:
+            return None
+        if not background:
+            self.model
+            return None
+        thread = threading.Thread(target=lambda: self.model, name="embedding-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def cache_key(self):
+        """
+        Identifies everything that changes the vectors: the model and the
+        input settings. Used to keep caches and saved indexes apart.
+        """
+        key = self.model_name
+        if self.backend == "onnx":
+            key += "+onnx-int8" if self.quantize else "+onnx"
+        if self.use_prefixes:
+            key += "+prefixes"
+        if self.max_seq_length:
+            key += f"+len{self.max_seq_length}"
+        return key
+
+    @property
+    def chunks_per_second(self):
+        """
+        Average throughput of `embed_documents` so far.
+        """
+        return self.total_chunks / self.total_seconds if self.total_seconds else 0.0
+
+    def _encode(self, texts):
+        """
+        Runs the model on one batch and returns normalized vectors.
+        """
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+    def embed_documents(self, texts):
+        """
+        Embeds document chunks in length-sorted batches.
+
+        :param texts: List of chunk texts.
+        :return: List of vectors, in the same order as `texts`.
+        """
+        if not texts:
+            return []
+        if self.use_prefixes:
+            texts = [f"passage: {text}" for text in texts]
+
+        # Sort by length so chunks in the same batch need little padding.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        vectors = [None] * len(texts)
+
+        start = time.perf_counter()
+        for b in range(0, len(order), self.batch_size):
+            batch_ids = order[b:b + self.batch_size]
+            batch_start = time.perf_counter()
+            batch_vectors = self._encode([texts[i] for i in batch_ids])
+            elapsed = time.perf_counter() - batch_start
+
+            self.batch_timings.append((len(batch_ids), elapsed))
+            if self.verbose:
+                print(f"   ⏱️ Batch {b // self.batch_size + 1}: {len(batch_ids)} chunks in {elapsed:.2f}s")
+
+            for i, vector in zip(batch_ids, batch_vectors):
+                vectors[i] = vector.tolist()
+
+        elapsed = time.perf_counter() - start
+        self.total_chunks += len(texts)
+        self.total_seconds += elapsed
+        metrics.observe("embed_documents_seconds", elapsed)
+        metrics.count("embedded_chunks_total", len(texts))
+        if self.verbose:
+            print(f"⚡ Embedded {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / elapsed:.1f} chunks/sec)")
+        return vectors
+
+    def embed_query(self, text):
+        """
+        Embeds a single user question.
+        """
+        return self.embed_queries([text])[0].tolist()
+
+    def embed_queries(self, texts):
+        """
+        Embeds many user questions in batched model calls.
+
+        :param texts: List of questions.
+        :return: float32 array of shape (len(texts), dim) with normalized vectors.
+        """
+        if self.use_prefixes:
+            texts = [f"query: {text}" for text in texts]
+        with metrics.timer("embed_query_seconds"):
+            return self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
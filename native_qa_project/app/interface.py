@@ -1,16 +1,20 @@
-# Import the core pipeline modules: loader, embedder, and QA logic.
-from loader import load_documents
-from embedder import EmbeddingIndexer
-from qa import answer_question
-import os
+# Import the core pipeline modules: embedder (which uses the loader) and QA logic.
+import sys
+
+from batch_qa import main as batch_main
+from registry import IndexRegistry
+from qa import answer_question_stream, retrieval_k
+from answer_cache import AnswerCache
+import metrics
 
 def main():
     """
     Command-line test pipeline for running the Native Language QA prototype.
 
     Steps:
-    1️⃣ Load and chunk all documents in the ./data folder.
-    2️⃣ Build the embedding index (in-memory vector store).
+    1️⃣ Load the saved embedding index for the ./data folder.
+    2️⃣ Re-index only the files that were added, changed or deleted
+       (and keep doing it in the background while the folder is watched).
     3️⃣ Enter an interactive loop for the user to ask questions.
     4️⃣ Retrieve top similar chunks and generate an answer.
     5️⃣ Print the answer and sources for inspection.
@@ -19,44 +23,87 @@ def main():
     # Folder containing your documents.
     data_folder = './data'
 
-    print("📚 Loading and chunking documents...")
-    docs = load_documents(data_folder)
+    # Number of processes used to parse files (raise it for large PDF folders).
+    loader_workers = 1
+
+    # Watch the folder and update the index in the background when files change.
+    watch_folder = True
+
+    print("🧠 Loading embedding index (only new or changed files are re-embedded)...")
+    # Hybrid search: semantic similarity + exact words (names, emails, codes).
+    registry = IndexRegistry(search_mode="hybrid")
+
+    # Load the embedding model in the background while the saved index is read.
+    registry.warm_up()
 
-    print("🧠 Building new embedding index from scratch...")
-    indexer = EmbeddingIndexer()
+    # Load the saved index and update it with added/changed/deleted files.
+    indexer, stats = registry.get(data_folder, refresh=True, workers=loader_workers)
+    print(
+        f"🗂️ Index ready: {indexer.chunk_count} chunks "
+        f"({len(stats['added'])} added, {len(stats['updated'])} updated, "
+        f"{len(stats['removed'])} removed, {stats['unchanged']} unchanged files)"
+    )
+    if indexer.engine.total_chunks:
+        print(f"⚡ Embedding throughput: {indexer.engine.chunks_per_second:.1f} chunks/sec")
 
-    # Optional: Clear any previously saved index file.
-    # (You can ignore this if you're not saving/loading FAISS indexes to disk.)
-    if os.path.exists("faiss.index"):
-        os.remove("faiss.index")  # Remove old index if exists.
+    # Answers to repeated questions are kept between runs.
+    answer_cache = AnswerCache()
 
-    # Build the vector index using fresh embeddings.
-    indexer.build_index(docs)
+    if watch_folder:
+        registry.watch(data_folder, workers=loader_workers)
+        print(f"👀 Watching {data_folder} for changes")
 
     # Start an infinite loop for manual testing.
     while True:
-        query = input("Ask a question (or type 'exit'): ")
+        query = input("Ask a question (or type 'exit' / 'metrics'): ")
         if query.lower() == 'exit':
             break
+        if query.lower() == 'metrics':
+            # Timers and counters in Prometheus text format (set QA_METRICS=1 to collect them).
+            print(metrics.prometheus_text() if metrics.is_enabled() else "📈 Metrics are off (set QA_METRICS=1).")
+            continue
+
+        # Use the latest index (the watcher swaps in a new one after file changes).
+        indexer, _ = registry.get(data_folder)
+
+        # Serve repeated questions from the answer cache.
+        hit, query_vector = answer_cache.lookup(query, indexer)
+        if hit:
+            print(f"\n⚡ Cached answer (asked before as: {hit['question']!r})")
+            print(f"\n💬 Answer: {hit['answer']}\n")
+            print(f"Sources: {[doc.metadata.get('source') for doc in hit['docs']]}")
+            continue
 
         # Perform semantic search for the query.
-        results = indexer.search(query)
+        candidates = indexer.search_by_vector(query_vector, k=retrieval_k(3), query=query)
+
+        # Assemble the context (overlapping chunks merged, within the token budget).
+        stream = answer_question_stream(query, candidates, k=3)
+        results = stream.context
 
-        # Print the top chunks returned for context visibility.
+        # Print the chunks sent to the LLM for context visibility.
         for i, doc in enumerate(results):
             source = doc.metadata.get("source", "Unknown")
             print(f"\nChunk {i+1} (Source: {source}):\n{'-'*40}\n{doc.page_content[:1000]}...")
 
-        # Combine all retrieved chunk texts for answering.
-        combined_context = " ".join([doc.page_content for doc in results])
+        # Generate an answer from the LLM and print tokens as they arrive.
+        print("\n💬 Answer: ", end="", flush=True)
+        for token in stream:
+            print(token, end="", flush=True)
+        print("\n")
 
-        # Generate an answer from the LLM chain.
-        answer = answer_question(query, combined_context)
+        answer_cache.put(query, indexer, stream.text, results, query_vector)
 
-        # Print the final answer and the sources.
-        print(f"\n💬 Answer: {answer}\n")
+        # Print the latency and the sources.
+        if stream.first_token_s is not None:
+            print(f"⏱️ First token: {stream.first_token_s:.2f}s | Total: {stream.total_s:.2f}s")
         print(f"Sources: {[doc.metadata.get('source') for doc in results]}")
 
 # Run the CLI only if this script is called directly.
+# Use batch mode to answer a whole file of questions instead:
+#   python app/interface.py --batch questions.jsonl answers.jsonl [--folder ./data]
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch_main(sys.argv[2:])
+    else:
+        main()
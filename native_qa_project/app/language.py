@@ -0,0 +1,220 @@
+# Import standard libraries for sentence splitting.
+import re
+
+# LangChain Document objects for the chunks.
+from langchain_core.documents import Document
+
+# Optional: langdetect tells Latin-script languages apart more reliably than
+# the stopword vote below (other scripts are detected from their characters).
+try:
+    from langdetect import DetectorFactory, detect as _langdetect
+    DetectorFactory.seed = 0  # Same answer for the same text on every run.
+except ImportError:
+    _langdetect = None
+
+# Language used when nothing better can be detected (the default model is English).
+DEFAULT_LANGUAGE = "en"
+
+# Characters looked at to detect the language of a document.
+SAMPLE_CHARS = 2000
+
+# Unicode blocks of the scripts we recognise, and the language each script
+# is mapped to. Latin is handled separately (stopwords / langdetect).
+SCRIPT_RANGES = [
+    ("arabic", 0x0600, 0x06FF), ("arabic", 0x0750, 0x077F), ("arabic", 0x08A0, 0x08FF),
+    ("arabic", 0xFB50, 0xFDFF), ("arabic", 0xFE70, 0xFEFF),
+    ("hebrew", 0x0590, 0x05FF),
+    ("greek", 0x0370, 0x03FF),
+    ("cyrillic", 0x0400, 0x04FF),
+    ("devanagari", 0x0900, 0x097F),
+    ("thai", 0x0E00, 0x0E7F),
+    ("hangul", 0x1100, 0x11FF), ("hangul", 0x3130, 0x318F), ("hangul", 0xAC00, 0xD7AF),
+    ("kana", 0x3040, 0x30FF),
+    ("han", 0x3400, 0x4DBF), ("han", 0x4E00, 0x9FFF), ("han", 0xF900, 0xFAFF),
+]
+SCRIPT_LANGUAGES = {
+    "arabic": "ar", "hebrew": "he", "greek": "el", "cyrillic": "ru",
+    "devanagari": "hi", "thai": "th", "hangul": "ko", "kana": "ja", "han": "zh",
+}
+
+# Frequent short words of common Latin-script languages (used without langdetect).
+STOPWORDS = {
+    "en": {"the", "and", "of", "to", "is", "in", "that", "it", "for", "with", "was", "on", "are", "this"},
+    "fr": {"le", "la", "les", "et", "des", "est", "une", "du", "dans", "que", "pour", "pas", "sur", "avec"},
+    "es": {"el", "la", "los", "las", "y", "que", "del", "en", "una", "por", "con", "para", "es", "se"},
+    "de": {"der", "die", "das", "und", "ist", "nicht", "ein", "eine", "mit", "den", "von", "zu", "auf", "sich"},
+    "it": {"il", "la", "di", "che", "e", "un", "una", "per", "non", "sono", "della", "con", "gli", "le"},
+    "pt": {"o", "a", "os", "as", "de", "que", "e", "do", "da", "em", "um", "uma", "para", "com", "não"},
+}
+
+# Languages written without spaces between words: chunk sizes count characters.
+CHARACTER_LANGUAGES = {"zh", "ja", "th"}
+
+# Chunk size targets per language as (size, overlap). Sizes count words, or
+# characters for CHARACTER_LANGUAGES. The default is about the 300 characters
+# of the fixed splitter for English; Arabic words are shorter, so Arabic chunks
+# get more words. Chinese, Japanese and Thai keep 300 characters, but are cut
+# at sentence ends instead of in the middle of a sentence.
+CHUNK_TARGETS = {
+    "default": (55, 5),
+    "ar": (70, 6),
+    "ko": (60, 5),
+    "zh": (300, 30),
+    "ja": (300, 30),
+    "th": (300, 30),
+}
+
+# Sentence ends: Latin/Arabic/Devanagari punctuation followed by a space,
+# or CJK full-width punctuation (no space needed).
+SENTENCE_END = re.compile(r"(?<=[.!?;؟؛۔।])\s+|(?<=[。！？；])\s*")
+
+
+def _script(ch):
+    """
+    Name of the script of one character (None for digits, punctuation, spaces).
+    """
+    code = ord(ch)
+    if code < 0x0250:
+        return "latin" if ch.isalpha() else None
+    for script, low, high in SCRIPT_RANGES:
+        if low <= code <= high:
+            return script
+    return None
+
+
+def detect_language(text):
+    """
+    Detects the main language of a text (ISO 639-1 code such as 'en', 'ar', 'zh').
+
+    - The dominant script decides for non-Latin scripts (Arabic, Chinese, Cyrillic...);
+      Chinese characters mixed with kana are Japanese.
+    - Latin-script text goes to langdetect if it is installed, otherwise to a
+      stopword vote over a few European languages.
+    - Falls back to DEFAULT_LANGUAGE.
+    """
+    sample = text[:SAMPLE_CHARS]
+    counts = {}
+    for ch in sample:
+        script = _script(ch)
+        if script:
+            counts[script] = counts.get(script, 0) + 1
+    if not counts:
+        return DEFAULT_LANGUAGE
+
+    script = max(counts, key=counts.get)
+    if script in ("han", "kana"):
+        return "ja" if counts.get("kana", 0) * 10 >= counts.get("han", 0) else "zh"
+    if script != "latin":
+        return SCRIPT_LANGUAGES[script]
+
+    if _langdetect is not None:
+        try:
+            return _langdetect(sample).split("-")[0]
+        except Exception:
+            return DEFAULT_LANGUAGE
+
+    words = re.findall(r"\w+", sample.lower())
+    votes = {lang: sum(word in stopwords for word in words) for lang, stopwords in STOPWORDS.items()}
+    best = max(votes, key=votes.get)
+    return best if votes[best] >= 2 else DEFAULT_LANGUAGE
+
+
+def _size(text, language):
+    """
+    Size of a text in the unit of its language's chunk target (words or characters).
+    """
+    if language in CHARACTER_LANGUAGES:
+        return sum(not ch.isspace() for ch in text)
+    return len(text.split())
+
+
+class LanguageAwareSplitter:
+    """
+    Splits documents into chunks along sentence boundaries, with a size target
+    per language (see CHUNK_TARGETS) instead of a fixed character count:
+    - Sentences are packed into a chunk until the next one would pass the target.
+    - A sentence longer than the target is cut at word (or character) boundaries.
+    - The last sentences of a chunk are repeated at the start of the next one,
+      up to the overlap target.
+
+    Like the fixed splitter, every chunk records its `start_index` in the page
+    text, and the document language is kept in the `language` metadata.
+    """
+
+    def __init__(self, targets=None):
+        """
+        :param targets: Overrides of CHUNK_TARGETS, e.g. {"ar": (80, 8)}.
+        """
+        self.targets = dict(CHUNK_TARGETS, **(targets or {}))
+
+    def _sentences(self, text, language, size):
+        """
+        Yields (start, end) spans of the sentences, long ones cut to `size`.
+        """
+        position = 0
+        for match in SENTENCE_END.finditer(text):
+            if match.start() > position:
+                yield from self._cut(text, position, match.start(), language, size)
+            position = match.end()
+        if position < len(text):
+            yield from self._cut(text, position, len(text), language, size)
+
+    @staticmethod
+    def _cut(text, start, end, language, size):
+        """
+        Cuts one span into pieces of at most `size` words (or characters).
+        """
+        if _size(text[start:end], language) <= size:
+            yield start, end
+            return
+        if language in CHARACTER_LANGUAGES:
+            for piece in range(start, end, size):
+                yield piece, min(piece + size, end)
+            return
+        words = [m.span() for m in re.finditer(r"\S+", text[start:end])]
+        for i in range(0, len(words), size):
+            group = words[i:i + size]
+            yield start + group[0][0], start + group[-1][1]
+
+    def split_text(self, text, language=DEFAULT_LANGUAGE):
+        """
+        :return: List of (start_index, chunk text) for one page of text.
+        """
+        size, overlap = self.targets.get(language, self.targets["default"])
+        spans = [(start, end, _size(text[start:end], language))
+                 for start, end in self._sentences(text, language, size)]
+
+        chunks = []
+        first = 0
+        while first < len(spans):
+            # Pack sentences until the target is reached (at least one per chunk).
+            last, total = first, spans[first][2]
+            while last + 1 < len(spans) and total + spans[last + 1][2] <= size:
+                last += 1
+                total += spans[last][2]
+            chunks.append((spans[first][0], text[spans[first][0]:spans[last][1]]))
+            if last + 1 >= len(spans):
+                break
+
+            # Start the next chunk with the last sentences that fit in the overlap.
+            next_first, repeated = last + 1, 0
+            while next_first - 1 > first and repeated + spans[next_first - 1][2] <= overlap:
+                next_first -= 1
+                repeated += spans[next_first][2]
+            first = next_first
+        return chunks
+
+    def split_documents(self, documents):
+        """
+        Splits documents (e.g. the pages of a file) into chunk Documents.
+        The language comes from the `language` metadata, or is detected per document.
+        """
+        chunks = []
+        for doc in documents:
+            language = doc.metadata.get("language") or detect_language(doc.page_content)
+            for start, text in self.split_text(doc.page_content, language):
+                chunks.append(Document(
+                    page_content=text,
+                    metadata=dict(doc.metadata, language=language, start_index=start),
+                ))
+        return chunks
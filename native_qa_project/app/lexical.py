@@ -0,0 +1,170 @@
+# Import standard libraries for tokenizing text and saving the index.
+import os
+import re
+import unicodedata
+
+# NumPy stores the inverted index as flat arrays.
+import numpy as np
+
+# Words, plus whole e-mail addresses so they can be matched exactly.
+WORD_RE = re.compile(r"\w+")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+
+# Scripts written without spaces (Thai, Japanese kana, Chinese characters):
+# a run of them is one "word" for WORD_RE, so it is indexed as overlapping
+# character pairs instead, the usual way to search such text.
+UNSPACED_RE = re.compile(r"[\u0e00-\u0e7f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def _bigrams(match):
+    run = match.group()
+    if len(run) == 1:
+        return f" {run} "
+    return " " + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + " "
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase search terms.
+    Accents are removed, so "Aurélien" and "Aurelien" match.
+    Chinese, Japanese and Thai text is split into character pairs.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return WORD_RE.findall(UNSPACED_RE.sub(_bigrams, text)) + EMAIL_RE.findall(text)
+
+
+class BM25Index:
+    """
+    BM25 inverted index over chunk texts, stored in compact NumPy arrays
+    (CSR layout) instead of Python dicts of lists:
+    - vocab: term -> term id.
+    - offsets[t]:offsets[t + 1] is the slice of postings for term t.
+    - postings: chunk positions (int32), tfs: term frequencies (uint16).
+    - doc_len: number of terms per chunk.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.doc_len = np.zeros(0, dtype=np.int32)
+        self.doc_ids = []
+
+        # Version of the vector index this was built from.
+        self.version = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, doc_ids, texts, version=None, **params):
+        """
+        Builds the index from chunk texts.
+
+        :param doc_ids: Docstore id of each chunk (returned by `search`).
+        :param texts: Text of each chunk.
+        :param version: Index version the chunks belong to.
+        """
+        index = cls(**params)
+        index.doc_ids = list(doc_ids)
+        index.version = version
+
+        term_ids, doc_pos, counts = [], [], []
+        doc_len = np.zeros(len(index.doc_ids), dtype=np.int32)
+        for pos, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[pos] = len(tokens)
+            tf = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            for token, count in tf.items():
+                term_ids.append(index.vocab.setdefault(token, len(index.vocab)))
+                doc_pos.append(pos)
+                counts.append(min(count, np.iinfo(np.uint16).max))
+
+        # Sort postings by term to get one contiguous slice per term.
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids, kind="stable")
+        index.postings = np.asarray(doc_pos, dtype=np.int32)[order]
+        index.tfs = np.asarray(counts, dtype=np.uint16)[order]
+        index.offsets = np.zeros(len(index.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(index.vocab)), out=index.offsets[1:])
+        index.doc_len = doc_len
+        return index
+
+    def scores(self, query):
+        """
+        BM25 score of every chunk for the query (0 for chunks without any query term).
+        """
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        if not len(self.doc_ids):
+            return scores
+        avg_len = max(float(self.doc_len.mean()), 1.0)
+        n_docs = len(self.doc_ids)
+
+        for token in set(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[docs] / avg_len)
+            # Each chunk appears once per term, so plain fancy-index adding is safe.
+            scores[docs] += idf * tf * (self.k1 + 1) / norm
+        return scores
+
+    def search(self, query, k=3):
+        """
+        Top-k chunks for the query.
+
+        :return: List of (doc_id, score), best first, only chunks with score > 0.
+        """
+        scores = self.scores(query)
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def save(self, path):
+        """
+        Saves the arrays to a .npz file (written to a temporary file first,
+        so an interrupted save never leaves a half-written index).
+        """
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            terms=np.array(terms, dtype=str),
+            offsets=self.offsets,
+            postings=self.postings,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+            doc_ids=np.array(self.doc_ids, dtype=str),
+            version=np.array(self.version or ""),
+            params=np.array([self.k1, self.b]),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index written by `save`.
+        """
+        with np.load(path) as data:
+            index = cls(*data["params"].tolist())
+            index.vocab = {term: i for i, term in enumerate(data["terms"].tolist())}
+            index.offsets = data["offsets"]
+            index.postings = data["postings"]
+            index.tfs = data["tfs"]
+            index.doc_len = data["doc_len"]
+            index.doc_ids = data["doc_ids"].tolist()
+            index.version = str(data["version"]) or None
+        return index
@@ -1,12 +1,43 @@
-# Import standard libraries for file handling and regex cleaning.
+# Import standard libraries for file handling, hashing, regex cleaning and parallel loading.
+import hashlib
 import os
 import re
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-# Import LangChain document loaders for different file formats.
-from langchain_community.document_loaders import PDFPlumberLoader, Docx2txtLoader, TextLoader
+# LangChain document loaders (PDF, DOCX, TXT) and the text splitter are
+# imported inside the functions using them, so importing this module is fast.
 
-# Import LangChain text splitter for chunking long documents into smaller pieces.
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+# Language detection and sentence-based, per-language chunking.
+from language import LanguageAwareSplitter, detect_language
+
+# Fast PDF extraction (PDFium, pdfplumber for table pages) with a per-page cache.
+from pdf_extract import PageCache, extract_pdf
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+# File extensions the loader knows how to read.
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Chunking strategies: 'fixed' (300-character chunks for every language) or
+# 'language' (sentence-based chunks sized per detected language).
+CHUNKING_MODES = ("fixed", "language")
+
+# Cache of extracted PDF page text, so unchanged pages are not extracted twice.
+page_cache = PageCache()
+
+
+def hash_file(path):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+    The file is read in blocks so large PDFs do not need to fit in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 def clean_text(text):
@@ -15,80 +46,245 @@ def clean_text(text):
     - Removing excessive whitespace.
     - Removing invisible unicode characters.
     - Normalizing bullet points or dashes.
+    - Normalizing Unicode (NFC) and dropping Arabic tatweel (letter stretching).
 
     :param text: The raw text to clean.
     :return: Cleaned text as a string.
     """
+    # Compose accents the same way everywhere (PDFs often store them separately).
+    text = unicodedata.normalize("NFC", text)
     # Replace multiple spaces/newlines with single spaces.
     text = re.sub(r'\s+', ' ', text)
     # Remove hidden unicode control characters.
-    text = re.sub(r'[\u200b-\u200f]', '', text)
+    text = re.sub(r'[\u200b-\u200f\ufeff]', '', text)
+    # Remove Arabic tatweel, which only stretches words visually.
+    text = text.replace('\u0640', '')
     # Replace various bullet symbols with a simple dash.
     text = re.sub(r'[•–—●]+', '-', text)
     return text.strip()
 
 
-def load_documents(folder_path):
+def make_splitter(chunking="fixed"):
     """
-    Loads and preprocesses all supported documents inside the given folder path.
+    Returns the text splitter used for every document.
+    Small chunks with a little overlap work well for short factual questions.
+    Each chunk records its `start_index` in the page text, so neighbouring
+    chunks can be merged back together when building the LLM context.
 
-    Steps:
-    - Walk through the folder and subfolders.
-    - Detect file extension and choose the right loader (PDF, DOCX, TXT).
-    - Clean the text content.
-    - Attach useful metadata: file path, file name, and page number.
-    - Split the text into smaller chunks for embedding.
-
-    :param folder_path: Path to the folder containing documents.
-    :return: A list of chunked Document objects.
+    :param chunking: 'fixed' (300 characters) or 'language' (sentence-based,
+                     sized per language, see language.LanguageAwareSplitter).
     """
-    docs = []
+    if chunking not in CHUNKING_MODES:
+        raise ValueError(f"Unknown chunking '{chunking}', expected one of {CHUNKING_MODES}")
+    if chunking == "language":
+        return LanguageAwareSplitter()
+
+    # Import LangChain text splitter for chunking long documents into smaller pieces.
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-    # Initialize a text splitter with small chunk size and overlap.
-    splitter = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=300,
-        chunk_overlap=30
+        chunk_overlap=30,
+        add_start_index=True
     )
 
-    # Walk through all files in all subdirectories.
+
+def list_files(folder_path):
+    """
+    Walks through the folder and subfolders and returns the paths
+    of all files with a supported extension (PDF, DOCX, TXT).
+
+    :param folder_path: Path to the folder containing documents.
+    :return: Sorted list of file paths.
+    """
+    paths = []
     for root, _, files in os.walk(folder_path):
         for file in files:
-            path = os.path.join(root, file)
-            ext = os.path.splitext(file)[-1].lower()
+            if os.path.splitext(file)[-1].lower() in SUPPORTED_EXTENSIONS:
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+
+def read_file(path, file_hash=None):
+    """
+    Loads and cleans a single file, without chunking it.
+
+    Steps:
+    - Detect file extension and choose the right loader (PDF, DOCX, TXT).
+      PDFs are read page by page by `pdf_extract.extract_pdf` (PDFium, with
+      pdfplumber only for pages with tables, and cached page text).
+    - Clean the text content.
+    - Detect the language of the file.
+    - Attach useful metadata: file path, file name, page number and language.
+
+    :param path: Path to the file.
+    :param file_hash: SHA-256 of the file if already known (see `hash_file`),
+                      to check the PDF page cache without reading the file again.
+    :return: A list of Document objects, one per page for PDFs (empty for unsupported files).
+    """
+    file = os.path.basename(path)
+    ext = os.path.splitext(file)[-1].lower()
+
+    # Import LangChain document loaders for different file formats.
+    from langchain_community.document_loaders import Docx2txtLoader, TextLoader
+    from langchain_core.documents import Document
+
+    # Pick loader based on file extension.
+    if ext == ".pdf":
+        loader = None
+    elif ext == ".docx":
+        loader = Docx2txtLoader(path)
+    elif ext == ".txt":
+        loader = TextLoader(path)
+    else:
+        # Skip unsupported file types.
+        return []
+
+    # Load the raw documents using the loader (one Document per PDF page).
+    with metrics.timer("loader_parse_seconds", ext=ext):
+        if loader is None:
+            pages = extract_pdf(path, cache=page_cache, file_hash=file_hash or hash_file(path))
+            raw_docs = [
+                Document(page_content=text, metadata={"page": page, "total_pages": len(pages)})
+                for page, text in pages
+            ]
+        else:
+            raw_docs = loader.load()
+    metrics.count("loader_files_total", ext=ext)
+
+    for doc in raw_docs:
+        # Clean the text content.
+        with metrics.timer("loader_clean_seconds"):
+            doc.page_content = clean_text(doc.page_content)
 
+        # Add useful metadata for traceability.
+        doc.metadata["source"] = path  # Full file path.
+        doc.metadata["file_name"] = file  # File name only.
+
+        # PDFs keep their exact 0-based page number.
+        if ext != ".pdf":
+            doc.metadata["page"] = "N/A"
+
+    # One language per file, detected on a sample of its first pages.
+    with metrics.timer("language_detect_seconds"):
+        language = detect_language(" ".join(doc.page_content[:1000] for doc in raw_docs[:5]))
+    metrics.count("loader_files_by_language_total", language=language)
+    for doc in raw_docs:
+        doc.metadata["language"] = language
+
+    return raw_docs
+
+
+def load_file(path, splitter=None, file_hash=None):
+    """
+    Loads, cleans and chunks a single file (see `read_file`),
+    splitting the text into smaller chunks for embedding.
+
+    :param path: Path to the file.
+    :param splitter: Optional text splitter (a default one is created if missing).
+    :param file_hash: SHA-256 of the file if already known.
+    :return: A list of chunked Document objects (empty for unsupported files).
+    """
+    raw_docs = read_file(path, file_hash)
+
+    # Split into chunks for embedding.
+    splitter = splitter or make_splitter()
+    with metrics.timer("loader_split_seconds"):
+        chunks = splitter.split_documents(raw_docs)
+    metrics.count("loader_chunks_total", len(chunks))
+    return chunks
+
+
+def _load_file_safe(path, chunking="fixed", file_hash=None):
+    """
+    Worker function for the process pool: loads one file and returns
+    (path, chunks, error message) instead of raising, so one broken
+    file does not stop the whole pool.
+    """
+    try:
+        return path, load_file(path, make_splitter(chunking), file_hash), None
+    except Exception as e:
+        return path, [], str(e)
+
+
+def iter_file_chunks(paths, workers=1, chunking="fixed", hashes=None):
+    """
+    Loads the given files and yields (path, chunks) as each file finishes.
+
+    - workers=1 loads files one by one in this process.
+    - workers>1 parses files in a pool of worker processes (PDF parsing is
+      CPU-bound, so threads would not help). Results arrive in completion order.
+      Per-file loader metrics are then recorded in the workers, not in this process.
+    - At most `2 * workers` files are in flight, so memory stays bounded
+      even for large folders.
+
+    Files that fail to load are reported and skipped.
+
+    :param paths: File paths to load.
+    :param workers: Number of worker processes (None = one per CPU core).
+    :param chunking: Chunking strategy (see CHUNKING_MODES).
+    :param hashes: Optional {path: SHA-256} of files already hashed by the caller.
+    """
+    workers = workers or os.cpu_count() or 1
+    hashes = hashes or {}
+
+    if workers <= 1:
+        splitter = make_splitter(chunking)
+        for path in paths:
             try:
-                # Pick loader based on file extension.
-                if ext == ".pdf":
-                    loader = PDFPlumberLoader(path)
-                elif ext == ".docx":
-                    loader = Docx2txtLoader(path)
-                elif ext == ".txt":
-                    loader = TextLoader(path)
+                yield path, load_file(path, splitter, hashes.get(path))
+            except Exception as e:
+                print(f"❌ Error loading {os.path.basename(path)}: {e}")
+        return
+
+    pending_paths = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        while True:
+            # Keep the pool busy without queueing every file at once.
+            for path in pending_paths:
+                in_flight.add(pool.submit(_load_file_safe, path, chunking, hashes.get(path)))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, chunks, error = future.result()
+                if error:
+                    print(f"❌ Error loading {os.path.basename(path)}: {error}")
                 else:
-                    # Skip unsupported file types.
-                    continue
+                    yield path, chunks
 
-                # Load the raw documents using the loader.
-                raw_docs = loader.load()
 
-                for doc in raw_docs:
-                    # Clean the text content.
-                    doc.page_content = clean_text(doc.page_content)
+def stream_documents(folder_path, workers=1, chunking="fixed"):
+    """
+    Generator version of `load_documents`: yields cleaned, chunked
+    Document objects as soon as each file is processed, so embedding
+    can start while later files are still being parsed.
 
-                    # Add useful metadata for traceability.
-                    doc.metadata["source"] = path  # Full file path.
-                    doc.metadata["file_name"] = file  # File name only.
+    :param folder_path: Path to the folder containing documents.
+    :param workers: Number of worker processes (1 = load in this process).
+    :param chunking: Chunking strategy (see CHUNKING_MODES).
+    """
+    for _, chunks in iter_file_chunks(list_files(folder_path), workers, chunking):
+        yield from chunks
 
-                    # Try to preserve page number if it’s a PDF.
-                    if ext == ".pdf":
-                        doc.metadata["page"] = doc.metadata.get("page", "Unknown")
-                    else:
-                        doc.metadata["page"] = "N/A"
 
-                # Split and add the chunks to the final docs list.
-                docs.extend(splitter.split_documents(raw_docs))
+@metrics.timed("load_documents_seconds", profiled=True)
+def load_documents(folder_path, workers=1, chunking="fixed"):
+    """
+    Loads and preprocesses all supported documents inside the given folder path.
 
-            except Exception as e:
-                print(f"❌ Error loading {file}: {e}")
+    Steps:
+    - Walk through the folder and subfolders.
+    - Load, clean and chunk every supported file (see `load_file`),
+      optionally in several worker processes.
 
-    return docs
+    :param folder_path: Path to the folder containing documents.
+    :param workers: Number of worker processes (1 = load in this process).
+    :param chunking: Chunking strategy (see CHUNKING_MODES).
+    :return: A list of chunked Document objects.
+    """
+    return list(stream_documents(folder_path, workers, chunking))
@@ -0,0 +1,322 @@
+# Import standard libraries for timing, profiling and structured logs.
+import atexit
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# Structured log lines (one JSON object per timed block) go to this logger.
+logger = logging.getLogger("native_qa.metrics")
+
+# Upper bounds (seconds) of the latency histogram buckets, as in Prometheus.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+class _State:
+    """
+    Global switches. Everything is off by default, so the only cost on the
+    hot path is one attribute check; set QA_METRICS=1 (or call `enable`) to turn it on.
+    """
+    enabled = os.environ.get("QA_METRICS", "") not in ("", "0")
+    log = os.environ.get("QA_METRICS_LOG", "") not in ("", "0")
+    profile_dir = os.environ.get("QA_PROFILE_DIR") or None
+
+
+def _setup_logging():
+    """
+    Sends structured log lines to stderr, unless the application already
+    configured a handler for them.
+    """
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+_state = _State()
+if _state.log:
+    _setup_logging()
+_lock = threading.Lock()
+_timers = {}    # (name, labels) -> {"count", "sum", "max", "buckets"}
+_counters = {}  # (name, labels) -> value
+_profilers = {}   # name -> cProfile.Profile accumulating every profiled call
+
+
+def enable(log=False, profile_dir=None):
+    """
+    Turns metrics on.
+
+    :param log: Also write one JSON log line per timed block (logger 'native_qa.metrics').
+    :param profile_dir: Folder where `dump_profiles` writes cProfile .prof files (None = no profiling).
+    """
+    _state.enabled = True
+    _state.log = log
+    _state.profile_dir = profile_dir
+    if log:
+        _setup_logging()
+
+
+def disable():
+    """
+    Turns metrics, logs and profiling off (collected values are kept).
+    """
+    _state.enabled = False
+    _state.log = False
+    _state.profile_dir = None
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def reset():
+    """
+    Clears every collected timer, counter and profile.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _profilers.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """
+    Records one duration for timer `name`.
+    """
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        stats = _timers.get(key)
+        if stats is None:
+            stats = _timers[key] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stats["buckets"][i] += 1
+                break
+    if _state.log:
+        logger.info(json.dumps({"metric": name, "seconds": round(seconds, 6), **labels}))
+
+
+def count(name, value=1, **labels):
+    """
+    Adds `value` to counter `name`.
+    """
+    if not _state.enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class _Timer:
+    """
+    Context manager timing one block into `observe`.
+    """
+
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    """
+    Shared do-nothing context manager used while metrics are disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """
+    Times a block: `with metrics.timer("faiss_search_seconds"): ...`
+    """
+    if not _state.enabled:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+# Held while a block is profiled: cProfile cannot run in two threads at once,
+# so blocks entered meanwhile (nested or in other threads) are not profiled.
+_profile_lock = threading.Lock()
+
+
+class _Profile:
+    """
+    Context manager adding one block to the cProfile stats of `name`.
+    Stats of every call are accumulated and written by `dump_profiles`.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        with _lock:
+            self.profiler = _profilers.setdefault(name, cProfile.Profile())
+
+    def __enter__(self):
+        try:
+            self.profiler.enable()
+            self.active = True
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already running.
+            self.active = False
+            _profile_lock.release()
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            self.profiler.disable()
+            _profile_lock.release()
+        return False
+
+
+def profile(name):
+    """
+    Profiles a block with cProfile when profiling is on (see `enable`).
+    """
+    if not (_state.enabled and _state.profile_dir) or not _profile_lock.acquire(blocking=False):
+        return _NULL_TIMER
+    return _Profile(name)
+
+
+def dump_profiles():
+    """
+    Writes the accumulated stats to `<profile_dir>/<name>.prof`
+    (open them with pstats or snakeviz). Also runs at exit.
+
+    :return: List of written file paths.
+    """
+    if not _state.profile_dir:
+        return []
+    os.makedirs(_state.profile_dir, exist_ok=True)
+    paths = []
+    with _lock:
+        for name, profiler in _profilers.items():
+            path = os.path.join(_state.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            paths.append(path)
+    return paths
+
+
+atexit.register(dump_profiles)
+
+
+def timed(name, profiled=False):
+    """
+    Decorator timing every call of a function into timer `name`
+    (and profiling it too if `profiled` and profiling is on).
+    While metrics are disabled it only adds one flag check per call.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with timer(name), (profile(name) if profiled else _NULL_TIMER):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """
+    Returns every timer and counter as a JSON-ready dict.
+    """
+    with _lock:
+        return {
+            "timers": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": stats["count"],
+                    "sum_s": stats["sum"],
+                    "mean_s": stats["sum"] / stats["count"] if stats["count"] else 0.0,
+                    "max_s": stats["max"],
+                }
+                for (name, labels), stats in sorted(_timers.items())
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_counters.items())
+            ],
+        }
+
+
+def _labels_text(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def prometheus_text(prefix="qa_"):
+    """
+    Renders all metrics in the Prometheus text exposition format:
+    timers as histograms (`_bucket`, `_sum`, `_count`) and counters as counters.
+    """
+    lines = []
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    typed = set()
+    for (name, labels), stats in timers:
+        metric = prefix + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, stats["buckets"]):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{metric}_bucket{_labels_text(labels, [('le', le)])} {cumulative}")
+        lines.append(f"{metric}_sum{_labels_text(labels)} {stats['sum']:.6f}")
+        lines.append(f"{metric}_count{_labels_text(labels)} {stats['count']}")
+
+    for (name, labels), value in counters:
+        metric = prefix + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_labels_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """
+    Writes `prometheus_text()` to a file (e.g. for node_exporter's textfile collector).
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
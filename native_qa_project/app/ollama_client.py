@@ -0,0 +1,224 @@
+# Import standard libraries for the background event loop.
+import asyncio
+import json
+import os
+import queue
+import threading
+
+# Address of the Ollama server (same default as the Ollama CLI).
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+
+class OllamaBackend:
+    """
+    Concurrent client for the Ollama /api/generate endpoint.
+
+    - All requests run on one background asyncio event loop, so any thread
+      or event loop can use the same backend safely.
+    - HTTP connections are pooled and reused between requests.
+    - At most `max_in_flight` requests are sent at once; others wait their turn
+      instead of each holding a thread.
+    - Every request has a timeout and can be cancelled.
+    - Answers can be streamed token by token (`stream` / `astream`).
+    """
+
+    def __init__(self, model="phi3:mini", options=None, base_url=OLLAMA_HOST,
+                 max_in_flight=4, timeout=120.0):
+        """
+        :param model: Ollama model name.
+        :param options: Generation options sent with each request (temperature, num_predict, ...).
+        :param base_url: Ollama server address.
+        :param max_in_flight: Max requests sent to the server at the same time.
+        :param timeout: Default per-request timeout in seconds.
+        """
+        self.model = model
+        self.options = options or {}
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+
+        # Created lazily by `_start` on the first request.
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """
+        Starts the background event loop and creates the HTTP client inside it.
+        """
+        with self._lock:
+            if self._loop is not None:
+                return
+            # httpx keeps a pool of open HTTP connections to the Ollama server
+            # (imported on the first request to keep startup fast).
+            import httpx
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ollama-backend", daemon=True)
+            thread.start()
+
+            async def setup():
+                self._client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    limits=httpx.Limits(
+                        max_connections=self.max_in_flight,
+                        max_keepalive_connections=self.max_in_flight,
+                    ),
+                    timeout=self.timeout,
+                )
+                self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+            asyncio.run_coroutine_threadsafe(setup(), loop).result()
+            self._loop, self._thread = loop, thread
+
+    def _payload(self, prompt, stream=False):
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": self.options,
+        }
+
+    async def _acquire(self, timeout):
+        """
+        Waits for a free request slot, at most `timeout` seconds
+        (raises asyncio.TimeoutError if the server stays busy).
+        """
+        await asyncio.wait_for(self._semaphore.acquire(), timeout)
+
+    async def _generate(self, prompt, timeout):
+        """
+        Sends one request (runs on the background loop). `timeout` covers
+        both the wait for a free slot and the request itself.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await self._acquire(timeout)
+        try:
+            remaining = max(deadline - loop.time(), 0.0)
+            # The client's default timeout would cap longer per-request ones.
+            response = await asyncio.wait_for(
+                self._client.post("/api/generate", json=self._payload(prompt), timeout=remaining),
+                remaining,
+            )
+        finally:
+            self._semaphore.release()
+        response.raise_for_status()
+        return response.json()["response"]
+
+    async def _stream(self, prompt, timeout, emit):
+        """
+        Streams one request (runs on the background loop), calling `emit(token)`
+        for each token. `timeout` applies to the wait for a free slot and to
+        each read, not the whole answer.
+        """
+        await self._acquire(timeout)
+        try:
+            async with self._client.stream(
+                "POST", "/api/generate", json=self._payload(prompt, stream=True), timeout=timeout
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("response"):
+                        emit(data["response"])
+                    if data.get("done"):
+                        break
+        finally:
+            self._semaphore.release()
+
+    def stream(self, prompt, timeout=None):
+        """
+        Blocking generator yielding answer tokens as they arrive.
+        Stopping the iteration early cancels the request.
+        """
+        self._start()
+        tokens = queue.Queue()
+        done = object()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(prompt, timeout or self.timeout, tokens.put), self._loop
+        )
+        future.add_done_callback(lambda _: tokens.put(done))
+        try:
+            while True:
+                token = tokens.get()
+                if token is done:
+                    break
+                yield token
+            # Raise the request's error, if any.
+            future.result()
+        finally:
+            future.cancel()
+
+    async def astream(self, prompt, timeout=None):
+        """
+        Async generator yielding answer tokens as they arrive, usable from any event loop.
+        """
+        self._start()
+        loop = asyncio.get_running_loop()
+        tokens = asyncio.Queue()
+        done = object()
+        future = asyncio.run_coroutine_threadsafe(
+            self._stream(
+                prompt,
+                timeout or self.timeout,
+                lambda token: loop.call_soon_threadsafe(tokens.put_nowait, token),
+            ),
+            self._loop,
+        )
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(tokens.put_nowait, done))
+        try:
+            while True:
+                token = await tokens.get()
+                if token is done:
+                    break
+                yield token
+            future.result()
+        finally:
+            future.cancel()
+
+    def submit(self, prompt, timeout=None):
+        """
+        Schedules a request and returns a concurrent.futures.Future.
+        Cancelling the future cancels the request.
+        """
+        self._start()
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(prompt, timeout or self.timeout), self._loop
+        )
+
+    async def agenerate(self, prompt, timeout=None):
+        """
+        Async generation usable from any event loop.
+        Cancelling the awaiting task also cancels the HTTP request.
+        """
+        return await asyncio.wrap_future(self.submit(prompt, timeout))
+
+    def generate(self, prompt, timeout=None):
+        """
+        Blocking, thread-safe generation.
+        """
+        future = self.submit(prompt, timeout)
+        try:
+            return future.result()
+        except BaseException:
+            # Stop the request if this thread is interrupted.
+            future.cancel()
+            raise
+
+    def close(self):
+        """
+        Closes pooled connections and stops the background loop.
+        """
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = self._client = self._semaphore = None
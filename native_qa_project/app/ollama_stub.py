@@ -0,0 +1,157 @@
+# Import standard libraries for a tiny local HTTP server.
+import argparse
+import asyncio
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_answer(prompt):
+    """
+    Deterministic fake answer: the first sentence of the prompt's context.
+    Good enough to exercise the pipeline without a real model.
+    """
+    # The last "Context:" block is the real one (earlier ones are few-shot examples).
+    context = prompt.rsplit("Context:\n", 1)[-1].split("\n\nQuestion:", 1)[0].strip()
+    sentence = re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0]
+    return sentence or "I'm sorry, I couldn't find the answer in the provided documents."
+
+
+def stub_tokens(prompt):
+    """
+    The stub answer split into word tokens, the way it is streamed.
+    """
+    words = stub_answer(prompt).split(" ")
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+class FakeBackend:
+    """
+    In-process stand-in for OllamaBackend (same methods), answering with
+    `stub_answer` without any HTTP server. Deterministic, so benchmarks and
+    tests can run offline: qa.use_backend(FakeBackend()).
+    """
+
+    def __init__(self, delay=0.0, token_delay=0.0, max_in_flight=4):
+        """
+        :param delay: Seconds before the first token (simulated generation time).
+        :param token_delay: Seconds between streamed words.
+        :param max_in_flight: Threads used by `submit`.
+        """
+        self.delay = delay
+        self.token_delay = token_delay
+        self.max_in_flight = max_in_flight
+        self._pool = None
+
+    def generate(self, prompt, timeout=None):
+        time.sleep(self.delay)
+        return stub_answer(prompt)
+
+    def submit(self, prompt, timeout=None):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="fake-backend")
+        return self._pool.submit(self.generate, prompt, timeout)
+
+    async def agenerate(self, prompt, timeout=None):
+        await asyncio.sleep(self.delay)
+        return stub_answer(prompt)
+
+    def stream(self, prompt, timeout=None):
+        time.sleep(self.delay)
+        for token in stub_tokens(prompt):
+            yield token
+            time.sleep(self.token_delay)
+
+    async def astream(self, prompt, timeout=None):
+        await asyncio.sleep(self.delay)
+        for token in stub_tokens(prompt):
+            yield token
+            await asyncio.sleep(self.token_delay)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /api/generate like an Ollama server, after a fixed delay.
+    With "stream": true the answer is sent word by word as JSON lines.
+    """
+
+    # Seconds to wait before answering / between streamed words (set from the command line).
+    delay = 0.5
+    token_delay = 0.02
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.delay)
+        if body.get("stream"):
+            self._stream(body)
+            return
+
+        payload = json.dumps({
+            "model": body.get("model"),
+            "response": stub_answer(body.get("prompt", "")),
+            "done": True,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except BrokenPipeError:
+            # The client cancelled or timed out.
+            pass
+
+    def _stream(self, body):
+        """
+        Sends the answer as newline-delimited JSON, one word per line.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for token in stub_tokens(body.get("prompt", "")):
+                line = {"model": body.get("model"), "response": token, "done": False}
+                self.wfile.write((json.dumps(line) + "\n").encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.wfile.write((json.dumps({"model": body.get("model"), "response": "", "done": True}) + "\n").encode("utf-8"))
+        except BrokenPipeError:
+            pass
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load.
+        pass
+
+
+def main():
+    """
+    Runs the stub server, e.g.:
+    python app/ollama_stub.py --port 11435 --delay 0.5
+    OLLAMA_HOST=http://localhost:11435 python app/batch_qa.py questions.jsonl answers.jsonl
+    """
+    parser = argparse.ArgumentParser(description="Local stand-in for an Ollama server.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds before the first token.")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed words.")
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay
+    StubHandler.token_delay = args.token_delay
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"🧪 Ollama stub listening on http://127.0.0.1:{args.port} ({args.delay}s per answer)")
+    server.serve_forever()
+
+
+# Run the server only if this script is called directly.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+# Import standard libraries for the exported model files and CLI arguments.
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+# NumPy holds token ids and vectors; onnxruntime, tokenizers and (for the
+# export only) torch/sentence-transformers are imported when needed.
+import numpy as np
+
+# Folder where exported models are kept (one sub-folder per model).
+ONNX_DIR = ".onnx_models"
+
+# File names inside an exported model folder.
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "export.json"
+
+# ONNX opset used for the export (supported by every recent onnxruntime).
+OPSET = 17
+
+# Pooling modes of sentence-transformers models that can be run here.
+POOLING_MODES = ("mean", "cls")
+
+# Minimum agreement with the PyTorch model for the validation report to pass.
+MIN_MEAN_COSINE = 0.99
+MIN_RECALL = 0.95
+
+
+def model_dir(model_name, onnx_dir=ONNX_DIR):
+    """
+    Folder of the exported files of one model.
+    """
+    return os.path.join(onnx_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+
+def export_model(model_name, output_dir=None, quantize=True, verbose=True):
+    """
+    Exports a sentence-transformers model to ONNX (transformer only; pooling and
+    normalization are done in NumPy), then optionally quantizes its weights to
+    int8 (dynamic quantization: activations are quantized on the fly, no
+    calibration data needed).
+
+    :param model_name: Hugging Face model name, e.g. intfloat/e5-base-v2.
+    :param output_dir: Target folder (default: `model_dir(model_name)`).
+    :param quantize: Also write the int8 model.
+    :return: The output folder.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = output_dir or model_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st_model[0], st_model[1]
+    # `pooling_mode` in sentence-transformers 6+, a method before.
+    pooling_mode = (pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str")
+                    else pooling.pooling_mode)
+    if pooling_mode not in POOLING_MODES:
+        raise ValueError(f"Pooling '{pooling_mode}' of {model_name} is not supported, expected one of {POOLING_MODES}")
+
+    tokenizer = st_model.tokenizer
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids")
+                   if name in tokenizer.model_input_names]
+
+    class _Transformer(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        # Inputs are passed by name, so models without token_type_ids export too.
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    sample = tokenizer(["passage: an example sentence to trace the model"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            _Transformer(transformer.auto_model.eval()),
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=OPSET,
+            dynamo=False,
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+
+        # Shape inference and graph fusions first, as onnxruntime recommends
+        # (more MatMuls end up quantized).
+        prepared = os.path.join(output_dir, "model.prepared.onnx")
+        quant_pre_process(os.path.join(output_dir, MODEL_FILE), prepared, skip_symbolic_shape=True)
+        quantize_dynamic(prepared, os.path.join(output_dir, QUANTIZED_FILE), weight_type=QuantType.QInt8)
+        os.remove(prepared)
+
+    # The fast tokenizer alone (no transformers needed to run the model).
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    with open(os.path.join(output_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": model_name,
+            "pooling": pooling_mode,
+            "max_seq_length": st_model.max_seq_length,
+            "do_lower_case": bool(getattr(transformer, "do_lower_case", False)),
+            "pad_token": tokenizer.pad_token,
+            "pad_id": tokenizer.pad_token_id,
+            "input_names": input_names,
+            "dim": getattr(st_model, "get_embedding_dimension", st_model.get_sentence_embedding_dimension)(),
+            "quantized": quantize,
+            "opset": OPSET,
+        }, f, indent=2)
+
+    if verbose:
+        print(f"📦 Exported {model_name} to ONNX{' (int8)' if quantize else ''} in {time.perf_counter() - start:.1f}s")
+    return output_dir
+
+
+class OnnxEncoder:
+    """
+    Runs an exported model under onnxruntime, with the `encode` signature of
+    SentenceTransformer so EmbeddingEngine can use either one:
+    - Tokenizes with the model's fast tokenizer (Rust `tokenizers`, no torch).
+    - Runs the int8 (or float32) model with a fixed number of intra-op threads
+      and one inter-op thread (a single request at a time is fastest this way).
+    - Pools token vectors like the original model (mean or CLS) and normalizes.
+    """
+
+    def __init__(self, path, quantized=True, num_threads=None, max_seq_length=None):
+        """
+        :param path: Folder written by `export_model`.
+        :param quantized: Use the int8 model (if it was exported).
+        :param num_threads: onnxruntime intra-op threads (default: all cores).
+        :param max_seq_length: Truncate inputs to this many tokens (default: the model's).
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(path, CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.quantized = quantized and self.config["quantized"]
+        self.max_seq_length = max_seq_length or self.config["max_seq_length"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.config["pad_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(path, QUANTIZED_FILE if self.quantized else MODEL_FILE),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dim"]
+
+    def _run(self, texts):
+        texts = [text.strip() for text in texts]
+        if self.config["do_lower_case"]:
+            texts = [text.lower() for text in texts]
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.config["input_names"]})[0]
+
+        if self.config["pooling"] == "cls":
+            return hidden[:, 0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True,
+               show_progress_bar=False):
+        """
+        Embeds texts in batches (same arguments as SentenceTransformer.encode).
+
+        :return: float32 array of shape (len(texts), dim).
+        """
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size, convert_to_numpy, normalize_embeddings)[0]
+        vectors = np.zeros((len(texts), self.config["dim"]), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            vectors[start:start + batch_size] = self._run(texts[start:start + batch_size])
+        if normalize_embeddings:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors
+
+
+def _is_exported(path, quantize):
+    """
+    True if `path` holds a complete export (with the int8 model if `quantize`).
+    """
+    try:
+        with open(os.path.join(path, CONFIG_FILE), encoding="utf-8") as f:
+            return json.load(f)["quantized"] or not quantize
+    except (OSError, ValueError):
+        return False
+
+
+def load_onnx_model(model_name, onnx_dir=ONNX_DIR, quantize=True, num_threads=None, max_seq_length=None):
+    """
+    Returns an OnnxEncoder for a model, exporting it first if needed
+    (the export loads the PyTorch model once; later runs only load the ONNX file).
+    """
+    path = model_dir(model_name, onnx_dir)
+    if not _is_exported(path, quantize):
+        # Export to a temporary folder and rename it, so processes starting
+        # together (e.g. shards) never load a half-written model.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        export_model(model_name, tmp_path, quantize=quantize)
+        if _is_exported(path, quantize):
+            shutil.rmtree(tmp_path)  # Another process finished first.
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp_path, path)
+    return OnnxEncoder(path, quantized=quantize, num_threads=num_threads, max_seq_length=max_seq_length)
+
+
+def compare_backends(reference, candidate, texts, queries, k=3):
+    """
+    Measures how close a candidate engine (e.g. ONNX int8) is to the reference
+    (PyTorch) engine on the same chunks and questions.
+
+    :param reference: EmbeddingEngine giving the expected vectors.
+    :param candidate: EmbeddingEngine to validate.
+    :param texts: Chunk texts.
+    :param queries: Questions searched in both sets of vectors.
+    :param k: Number of neighbours compared for recall.
+    :return: Dict with cosine similarity stats (chunks and queries), recall@k of
+             the candidate's top-k against the reference's top-k, and chunks/sec of both.
+    """
+    report = {}
+    vectors = {}
+    for name, engine in (("reference", reference), ("candidate", candidate)):
+        engine.warm_up(background=False)
+        start = time.perf_counter()
+        docs = np.asarray(engine.embed_documents(texts), dtype=np.float32)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        questions = np.asarray(engine.embed_queries(queries), dtype=np.float32)
+        query_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+        vectors[name] = (docs, questions)
+        report[name] = {"chunks_per_second": len(texts) / elapsed if elapsed else 0.0, "query_ms": query_ms}
+
+    (ref_docs, ref_queries), (cand_docs, cand_queries) = vectors["reference"], vectors["candidate"]
+    cosines = np.sum(ref_docs * cand_docs, axis=1)
+    report["chunk_cosine_mean"] = float(cosines.mean())
+    report["chunk_cosine_min"] = float(cosines.min())
+    report["query_cosine_mean"] = float(np.sum(ref_queries * cand_queries, axis=1).mean())
+
+    # Same questions searched in each model's own vectors, as the app would.
+    k = min(k, len(texts))
+    truth = np.argsort(-(ref_queries @ ref_docs.T), axis=1)[:, :k]
+    found = np.argsort(-(cand_queries @ cand_docs.T), axis=1)[:, :k]
+    hits = sum(len(set(found[i]) & set(truth[i])) for i in range(len(queries)))
+    report["recall_at_k"] = hits / truth.size if truth.size else 0.0
+    report["passed"] = report["chunk_cosine_mean"] >= MIN_MEAN_COSINE and report["recall_at_k"] >= MIN_RECALL
+    return report
+
+
+def main():
+    """
+    Exports the embedding model to ONNX and validates it against PyTorch on a
+    document folder: cosine similarity of the vectors, recall of the top-k
+    chunks for the pipeline test questions and sampled chunks, and speed.
+    Exits with code 1 if the ONNX model is not close enough.
+    """
+    # Imported here so this module can be imported without the QA modules.
+    from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+    from loader import load_documents
+    from test_pipeline import test_cases
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX and compare it with PyTorch.")
+    parser.add_argument("folder", nargs="?", default="./data")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--no-quantize", action="store_true", help="Validate the float32 ONNX model instead of int8.")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for both backends.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--sample-queries", type=int, default=200)
+    parser.add_argument("--export-only", action="store_true", help="Export (and quantize) without validating.")
+    args = parser.parse_args()
+
+    quantize = not args.no_quantize
+    if args.export_only:
+        export_model(args.model, quantize=quantize)
+        return 0
+
+    texts = [doc.page_content for doc in load_documents(args.folder)]
+    if not texts:
+        print("❌ No documents loaded.")
+        return 1
+
+    # Test questions, plus chunk starts used as questions.
+    rng = np.random.default_rng(0)
+    sampled = rng.choice(len(texts), min(args.sample_queries, len(texts)), replace=False)
+    queries = [t["question"] for t in test_cases] + [" ".join(texts[i].split()[:12]) for i in sampled]
+
+    options = {"batch_size": args.batch_size, "num_threads": args.threads}
+    reference = EmbeddingEngine(args.model, **options)
+    candidate = EmbeddingEngine(args.model, backend="onnx", quantize=quantize, **options)
+    report = compare_backends(reference, candidate, texts, queries, args.k)
+
+    label = "ONNX int8" if quantize else "ONNX float32"
+    print(f"📊 {len(texts)} chunks, {len(queries)} queries, k={args.k}")
+    print(f"{'backend':<14}{'chunks/sec':>12}{'ms/query':>10}")
+    for name, title in (("reference", "PyTorch"), ("candidate", label)):
+        print(f"{title:<14}{report[name]['chunks_per_second']:>12.1f}{report[name]['query_ms']:>10.2f}")
+    print(f"🔁 Cosine (chunks): mean {report['chunk_cosine_mean']:.4f}, min {report['chunk_cosine_min']:.4f}")
+    print(f"🔁 Cosine (queries): mean {report['query_cosine_mean']:.4f}")
+    print(f"🎯 Recall@{args.k} vs PyTorch: {report['recall_at_k']:.3f}")
+    if report["passed"]:
+        print(f"✅ {label} matches PyTorch (mean cosine ≥ {MIN_MEAN_COSINE}, recall ≥ {MIN_RECALL}).")
+        return 0
+    print(f"❌ {label} differs too much from PyTorch (mean cosine < {MIN_MEAN_COSINE} or recall < {MIN_RECALL}).")
+    return 1
+
+
+# Run the validation only if this script is called directly.
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# Import standard libraries for page fingerprints, the page cache and parallel extraction.
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+# pypdfium2 (PDFium bindings) extracts page text about 10x faster than
+# pdfplumber. Without it, every page goes through pdfplumber.
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# Folder of the per-page text cache (one JSON file per PDF).
+PAGE_CACHE_DIR = ".page_cache"
+
+# Bump this when the extraction changes, so cached page text is not reused.
+PAGE_CACHE_VERSION = 1
+
+# PDFium page object types (FPDF_PAGEOBJ_*).
+OBJ_TEXT, OBJ_PATH, OBJ_IMAGE = 1, 2, 3
+
+# Pages with at least this many path objects (lines, rectangles) may contain
+# a table: pdfplumber checks them, and extracts the text if it finds one.
+TABLE_MIN_PATHS = 20
+
+# Share of unreadable characters above which PDFium text is considered broken
+# (e.g. fonts without a Unicode map) and pdfplumber is tried instead.
+MAX_BAD_CHAR_RATIO = 0.05
+
+# PDFs with at least this many pages are extracted in several processes
+# (below that, starting the processes costs more than it saves).
+PARALLEL_MIN_PAGES = 32
+
+
+def _bad_char_ratio(text):
+    """
+    Share of characters PDFium could not map to Unicode.
+    """
+    if not text:
+        return 0.0
+    bad = sum(ch == "\ufffd" or "\ue000" <= ch <= "\uf8ff" for ch in text)
+    return bad / len(text)
+
+
+def _plumber_pages(path, pages, check_tables):
+    """
+    Extracts the given pages with pdfplumber.
+
+    :param pages: 0-based page numbers.
+    :param check_tables: Pages to keep only if pdfplumber finds a table on them.
+    :return: {page: text} for the extracted pages.
+    """
+    # Imported here: pdfplumber is only needed for the fallback pages.
+    import pdfplumber
+
+    texts = {}
+    with pdfplumber.open(path) as pdf:
+        for page in pages:
+            plumber_page = pdf.pages[page]
+            if page not in check_tables or plumber_page.find_tables():
+                texts[page] = plumber_page.extract_text() or ""
+            plumber_page.close()
+    return texts
+
+
+def _extract_pages(path, pages, cached):
+    """
+    Extracts a range of pages of one PDF (runs in a worker process for large PDFs).
+
+    - PDFium reads the text and the objects of every page; the page fingerprint
+      is a hash of both.
+    - A page whose fingerprint matches the cached one keeps its cached text and
+      method, so pdfplumber only runs again for pages that changed.
+    - Other pages that look like tables, or whose PDFium text is unreadable,
+      are extracted with pdfplumber.
+
+    :param pages: 0-based page numbers.
+    :param cached: {page: cached entry} from the previous extraction of this file.
+    :return: {page: {"fingerprint", "text", "method"}}.
+    """
+    results = {}
+    fallback, check_tables = [], set()
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for page_number in pages:
+            page = pdf[page_number]
+            textpage = page.get_textpage()
+            text = textpage.get_text_bounded()
+            objects = [obj.type for obj in page.get_objects()]
+            textpage.close()
+            page.close()
+
+            signature = f"{text}\0{objects.count(OBJ_TEXT)}/{objects.count(OBJ_PATH)}/{objects.count(OBJ_IMAGE)}"
+            fingerprint = hashlib.sha1(signature.encode("utf-8")).hexdigest()
+            entry = cached.get(page_number)
+            if entry and entry["fingerprint"] == fingerprint:
+                results[page_number] = entry
+                continue
+
+            results[page_number] = {"fingerprint": fingerprint, "text": text, "method": "pdfium"}
+            if _bad_char_ratio(text) > MAX_BAD_CHAR_RATIO:
+                fallback.append(page_number)
+            elif objects.count(OBJ_PATH) >= TABLE_MIN_PATHS:
+                fallback.append(page_number)
+                check_tables.add(page_number)
+    finally:
+        pdf.close()
+
+    if fallback:
+        for page_number, text in _plumber_pages(path, fallback, check_tables).items():
+            results[page_number].update(text=text, method="pdfplumber")
+    return results
+
+
+class PageCache:
+    """
+    Extracted text of every PDF page, saved per file in `cache_dir`.
+
+    Each entry records the file hash, and per page its fingerprint, text and
+    extraction method. An unchanged file (same hash) is not opened at all;
+    for an edited file, only pages whose fingerprint changed are extracted again.
+    """
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, pdf_path):
+        key = hashlib.sha1(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, pdf_path):
+        """
+        :return: The saved entry for a PDF, or None.
+        """
+        try:
+            with open(self._path(pdf_path), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("version") == PAGE_CACHE_VERSION else None
+
+    def put(self, pdf_path, file_hash, pages):
+        """
+        Saves the pages of a PDF (list of page entries, in page order).
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(pdf_path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": PAGE_CACHE_VERSION, "file_hash": file_hash, "pages": pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def _page_workers(n_pages):
+    """
+    Processes to extract a PDF with: one per 16 pages, up to the CPU count.
+    Always 1 inside a child process (e.g. the loader's worker pool), where
+    files are already extracted in parallel.
+    """
+    if n_pages < PARALLEL_MIN_PAGES or multiprocessing.parent_process() is not None:
+        return 1
+    return max(1, min(os.cpu_count() or 1, n_pages // 16))
+
+
+def extract_pdf(path, cache=None, workers=None, file_hash=None):
+    """
+    Extracts the text of every page of a PDF.
+
+    :param path: Path to the PDF.
+    :param cache: PageCache to reuse and store page text (None disables caching).
+    :param file_hash: SHA-256 of the file (`loader.hash_file`, already computed
+                      for the index manifest); the cache is only used with it.
+    :param workers: Processes for page-level extraction (None = based on page count).
+    :return: List of (page number, text), 0-based and in page order, one per page.
+    """
+    if pdfium is None:
+        # No PDFium: extract every page with pdfplumber, as before.
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            n_pages = len(pdf.pages)
+        texts = _plumber_pages(path, range(n_pages), set())
+        metrics.count("pdf_pages_total", n_pages, method="pdfplumber")
+        return [(page, texts[page]) for page in range(n_pages)]
+
+    if file_hash is None:
+        cache = None
+    entry = cache.get(path) if cache else None
+    if entry and entry["file_hash"] == file_hash:
+        metrics.count("pdf_pages_total", len(entry["pages"]), method="cache")
+        return [(page, item["text"]) for page, item in enumerate(entry["pages"])]
+
+    cached = dict(enumerate(entry["pages"])) if entry else {}
+    pdf = pdfium.PdfDocument(path)
+    n_pages = len(pdf)
+    pdf.close()
+
+    workers = workers or _page_workers(n_pages)
+    if workers <= 1:
+        results = _extract_pages(path, range(n_pages), cached)
+    else:
+        # Contiguous page ranges, one task per worker.
+        step = -(-n_pages // workers)
+        ranges = [range(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_extract_pages, [path] * len(ranges), ranges,
+                                 [{p: cached[p] for p in r if p in cached} for r in ranges]):
+                results.update(part)
+
+    pages = [results[page] for page in range(n_pages)]
+    for page, item in enumerate(pages):
+        metrics.count("pdf_pages_total", method="cache" if cached.get(page) == item else item["method"])
+    if cache:
+        cache.put(path, file_hash, pages)
+    return [(page, item["text"]) for page, item in enumerate(pages)]
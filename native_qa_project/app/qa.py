@@ -1,17 +1,42 @@
-# Import LangChain tools to:
-# 1️⃣ Combine documents as context,
-# 2️⃣ Create prompts,
-# 3️⃣ Run LLM chains with a defined template.
-from langchain.chains.combine_documents.stuff import StuffDocumentsChain
-from langchain.prompts import PromptTemplate
-from langchain_community.llms import Ollama
-from langchain.chains.llm import LLMChain
-
-# Initialize the Ollama LLM.
-# Uses the local or hosted Ollama server with the specified lightweight model.
+# Import standard libraries to time streamed answers.
+import time
+from collections import deque
+
+# Import the concurrent Ollama client (pooled connections, in-flight limit, timeouts).
+from ollama_client import OllamaBackend
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+# Context assembly: token budget, overlap dedup/merge and optional re-ranking.
+from context import ContextBuilder, CrossEncoderReranker
+
+# Generation settings for the Ollama LLM.
 # 'temperature' controls randomness; lower is more factual.
 # 'num_predict' sets the max token output (~1 token ≈ 0.75 English word).
-llm = Ollama(model="phi3:mini", temperature=0.2, num_predict=200)
+LLM_MODEL = "phi3:mini"
+LLM_OPTIONS = {"temperature": 0.2, "num_predict": 200}
+
+# Initialize the Ollama backend shared by every caller (CLI, Streamlit sessions, batch jobs).
+# Uses the local or hosted Ollama server (set OLLAMA_HOST to change it).
+backend = OllamaBackend(model=LLM_MODEL, options=LLM_OPTIONS)
+
+# Latency of the most recent streamed answers (first token and total, in seconds).
+latency_log = deque(maxlen=1000)
+
+# Token budget for the retrieved context in each prompt. Prompt length drives
+# Ollama's prefill time, so this caps it however many chunks are retrieved.
+CONTEXT_MAX_TOKENS = 700
+
+# Optional cross-encoder used to re-rank retrieved chunks (None = keep search order),
+# e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2".
+RERANK_MODEL = None
+
+# Shared context builder (see configure_context).
+context_builder = ContextBuilder(
+    max_tokens=CONTEXT_MAX_TOKENS,
+    reranker=CrossEncoderReranker(RERANK_MODEL) if RERANK_MODEL else None,
+)
 
 # Define the system prompt template:
 # - Tells the LLM to ONLY answer using context.
@@ -56,32 +81,195 @@ Question: {question}
 Answer:
 """
 
-# Wrap the template in a LangChain PromptTemplate.
-# It dynamically injects context and question at runtime.
-prompt = PromptTemplate(
-    input_variables=["context", "question"],
-    template=template
-)
+# The template is wrapped in a LangChain PromptTemplate on first use (see get_prompt),
+# so importing this module does not import LangChain's prompt classes.
+_prompt = None
 
-# Create an LLM chain that uses the Ollama LLM + custom prompt.
-llm_chain = LLMChain(llm=llm, prompt=prompt)
 
-# Wrap it in a StuffDocumentsChain:
-# This feeds multiple retrieved document chunks into the prompt.
-chain = StuffDocumentsChain(
-    llm_chain=llm_chain,
-    document_variable_name="context"
-)
+def get_prompt():
+    """
+    Returns the LangChain PromptTemplate that injects context and question at runtime.
+    """
+    global _prompt
+    if _prompt is None:
+        # Import LangChain tools to create prompts with a defined template.
+        from langchain.prompts import PromptTemplate
+
+        _prompt = PromptTemplate(
+            input_variables=["context", "question"],
+            template=template
+        )
+    return _prompt
+
+
+def use_backend(new_backend):
+    """
+    Replaces the shared backend with any object offering the OllamaBackend
+    methods, e.g. ollama_stub.FakeBackend() to run without an Ollama server.
+
+    :return: The previous backend (not closed), so it can be restored.
+    """
+    global backend
+    old_backend = backend
+    backend = new_backend
+    return old_backend
 
-def answer_question(question, context):
+
+def configure_backend(**kwargs):
+    """
+    Replaces the shared Ollama backend, e.g. configure_backend(max_in_flight=8, timeout=60).
+    Keyword arguments are passed to OllamaBackend.
+    """
+    use_backend(OllamaBackend(**{"model": LLM_MODEL, "options": LLM_OPTIONS, **kwargs})).close()
+    return backend
+
+
+def configure_context(max_tokens=CONTEXT_MAX_TOKENS, rerank_model=None, **kwargs):
+    """
+    Replaces the shared context builder, e.g.
+    configure_context(max_tokens=400, rerank_model="cross-encoder/ms-marco-MiniLM-L-6-v2").
+    Other keyword arguments are passed to ContextBuilder.
+    """
+    global context_builder
+    reranker = CrossEncoderReranker(rerank_model) if rerank_model else None
+    context_builder = ContextBuilder(max_tokens=max_tokens, reranker=reranker, **kwargs)
+    return context_builder
+
+
+def retrieval_k(k=3):
+    """
+    Number of chunks to retrieve so the context builder can pick the best k
+    (more than k when a reranker is configured).
+    """
+    return context_builder.fetch_k(k)
+
+
+def build_context(question, docs, k=None):
+    """
+    Selects the chunks sent to the LLM: re-ranked (if configured), with
+    overlapping/adjacent chunks merged, within the token budget.
+
+    :param k: Final number of blocks, when `docs` were retrieved with `retrieval_k(k)`.
+    :return: List of Documents, best first.
+    """
+    with metrics.timer("context_build_seconds"):
+        return context_builder.build(question, docs, k)
+
+
+def join_context(docs):
+    """
+    Joins chunk texts with blank lines, as in the prompt.
+    """
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def build_prompt(question, context):
+    """
+    Fills the prompt template, the same way LangChain's StuffDocumentsChain does:
+    the chunk texts are joined with blank lines.
+
+    :param question: The user input.
+    :param context: List of document chunks (assembled with `build_context` first)
+                    or an already joined string (used as is).
+    """
+    with metrics.timer("prompt_build_seconds"):
+        if not isinstance(context, str):
+            context = join_context(build_context(question, context))
+        return get_prompt().format(context=context, question=question)
+
+
+async def answer_question_async(question, context, timeout=None):
+    """
+    Async version of `answer_question`.
+    Cancelling the awaiting task also cancels the request to Ollama.
+
+    :param timeout: Per-request timeout in seconds (defaults to the backend's).
+    """
+    text = build_prompt(question, context)
+    with metrics.timer("llm_generate_seconds"):
+        return await backend.agenerate(text, timeout)
+
+
+@metrics.timed("answer_seconds", profiled=True)
+def answer_question(question, context, timeout=None):
     """
     Generates an answer given:
     - 'question': the user input.
     - 'context': list of top document chunks from vector search.
 
-    Runs the LLM chain and returns the model's final answer.
+    Sends the prompt to the Ollama LLM and returns the model's final answer.
+    Safe to call from many threads at once; requests share pooled connections
+    and the backend's in-flight limit.
+    """
+    text = build_prompt(question, context)
+    with metrics.timer("llm_generate_seconds"):
+        return backend.generate(text, timeout)
+
+
+class AnswerStream:
+    """
+    Streamed answer: iterate over it (with `for` or `async for`) to get tokens
+    as the model produces them. Once finished, it holds:
+    - text: the full answer.
+    - first_token_s: time until the first token arrived (what users perceive as latency).
+    - total_s: time until the answer was complete.
+    Each finished stream is also appended to `latency_log`.
+    """
+
+    def __init__(self, question, context, timeout=None, k=None):
+        self.question = question
+        # The chunks actually sent to the model (after merging and the token budget).
+        self.context = context if isinstance(context, str) else build_context(question, context, k)
+        self.prompt = build_prompt(
+            question, self.context if isinstance(self.context, str) else join_context(self.context)
+        )
+        self.timeout = timeout
+        self.tokens = []
+        self.first_token_s = None
+        self.total_s = None
+
+    @property
+    def text(self):
+        return "".join(self.tokens)
+
+    def _record(self, token, start):
+        if self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - start
+        self.tokens.append(token)
+
+    def _finish(self, start):
+        self.total_s = time.perf_counter() - start
+        if self.first_token_s is not None:
+            metrics.observe("llm_first_token_seconds", self.first_token_s)
+        metrics.observe("llm_stream_seconds", self.total_s)
+        metrics.count("llm_tokens_total", len(self.tokens))
+        latency_log.append({
+            "question": self.question,
+            "first_token_s": self.first_token_s,
+            "total_s": self.total_s,
+            "tokens": len(self.tokens),
+        })
+
+    def __iter__(self):
+        start = time.perf_counter()
+        for token in backend.stream(self.prompt, self.timeout):
+            self._record(token, start)
+            yield token
+        self._finish(start)
+
+    async def __aiter__(self):
+        start = time.perf_counter()
+        async for token in backend.astream(self.prompt, self.timeout):
+            self._record(token, start)
+            yield token
+        self._finish(start)
+
+
+def answer_question_stream(question, context, timeout=None, k=None):
+    """
+    Streaming version of `answer_question`: returns an AnswerStream that yields
+    tokens from the Ollama backend as they arrive and records their latency.
+
+    :param k: Final number of blocks (see `build_context`).
     """
-    return chain.run({
-        "input_documents": context,
-        "question": question
-    })
+    return AnswerStream(question, context, timeout, k)
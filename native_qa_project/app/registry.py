@@ -0,0 +1,194 @@
+# Import standard libraries for locking and tracking when indexes were used.
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Import the embedding model and the indexer built on top of it.
+from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+from embedder import EmbeddingIndexer
+
+# Background folder watcher for live index updates.
+from watcher import FolderWatcher
+
+
+class IndexRegistry:
+    """
+    Process-wide home for the embedding model and the indexes built with it,
+    so every user of the process (e.g. every Streamlit browser session) shares
+    one copy of each instead of loading their own.
+
+    - The embedding model is loaded once, on first use (or early with `warm_up`).
+    - One index is kept per (folder, index type) and shared read-only.
+    - Builds are single-flight: if several callers ask for the same folder
+      at the same time, one builds it and the others wait for that result.
+    - At most `max_indexes` are kept; the least recently used ones, and any
+      unused for `idle_ttl` seconds, are dropped (they reload quickly from disk).
+    - Refreshes build the updated index on the side and swap it in at once, so
+      searches are never blocked by an update; `watch` does this automatically.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, max_indexes=4, idle_ttl=3600,
+                 engine_options=None, **indexer_options):
+        """
+        :param model_name: Embedding model shared by all indexes.
+        :param max_indexes: Max number of indexes kept in memory.
+        :param idle_ttl: Seconds after which an unused index is dropped.
+        :param engine_options: Settings passed to EmbeddingEngine.
+        :param indexer_options: Settings passed to every EmbeddingIndexer
+                                (index_type, search_mode, chunking, language_models, ...).
+        """
+        self.model_name = model_name
+        self.max_indexes = max_indexes
+        self.idle_ttl = idle_ttl
+        self.engine_options = engine_options or {}
+        self.indexer_options = indexer_options
+
+        self._engine = None
+        self._engines = {}             # model name -> EmbeddingEngine of language sub-indexes.
+        self._entries = OrderedDict()  # key -> entry, least recently used first.
+        self._build_locks = {}         # key -> {"lock" held while that index is built, "users" of it}.
+        self._watchers = {}            # key -> FolderWatcher.
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        """
+        The shared EmbeddingEngine, loaded on first use.
+        """
+        with self._lock:
+            if self._engine is None:
+                self._engine = EmbeddingEngine(self.model_name, **self.engine_options)
+            return self._engine
+
+    def warm_up(self):
+        """
+        Starts loading the embedding model in a background thread, so it is
+        ready by the time the first question arrives.
+
+        :return: The loading thread (None if the model is already loaded).
+        """
+        return self.engine.warm_up(background=True)
+
+    def _key(self, folder_path):
+        return (os.path.abspath(folder_path), self.indexer_options.get("index_type", "flat"))
+
+    def _evict(self):
+        """
+        Drops idle indexes and, if still too many, the least recently used ones.
+        Must be called with `_lock` held.
+        """
+        now = time.monotonic()
+        evicted = [key for key, entry in self._entries.items() if now - entry["last_used"] > self.idle_ttl]
+        for key in evicted:
+            del self._entries[key]
+        while len(self._entries) > self.max_indexes:
+            evicted.append(self._entries.popitem(last=False)[0])
+        for key in evicted:
+            self._drop_build_lock(key)
+
+    def _drop_build_lock(self, key):
+        """
+        Forgets the build lock of an index that is not loaded, unless a caller
+        is still using it (it is then dropped when the last one is done).
+        Must be called with `_lock` held.
+        """
+        build = self._build_locks.get(key)
+        if build is not None and build["users"] == 0 and key not in self._entries:
+            del self._build_locks[key]
+
+    def get(self, folder_path, refresh=False, workers=1):
+        """
+        Returns the shared index for `folder_path`, loading or building it if needed.
+
+        :param folder_path: Path to the folder containing documents.
+        :param refresh: Re-check the folder for added/changed/deleted files.
+                        The updated index replaces the old one for every caller,
+                        while searches on the old one keep working.
+        :param workers: Number of processes used to parse files.
+        :return: (EmbeddingIndexer, stats) — stats is None if the index was already loaded.
+        """
+        key = self._key(folder_path)
+        requested = time.monotonic()
+
+        with self._lock:
+            # Fast path: an index is loaded, use it even while a refresh is being built.
+            entry = self._entries.get(key)
+            if entry and not refresh:
+                entry["last_used"] = time.monotonic()
+                self._entries.move_to_end(key)
+                return entry["indexer"], None
+            build = self._build_locks.setdefault(key, {"lock": threading.Lock(), "users": 0})
+            build["users"] += 1
+
+        try:
+            with build["lock"]:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    # Reuse the index unless a refresh was asked for and
+                    # nobody refreshed it while we were waiting for the lock.
+                    if entry and (not refresh or entry["built_at"] >= requested):
+                        entry["last_used"] = time.monotonic()
+                        self._entries.move_to_end(key)
+                        return entry["indexer"], None
+
+                # Build a new indexer (from the saved index, so only changes are embedded)
+                # instead of updating the shared one that other sessions are searching.
+                indexer = EmbeddingIndexer(
+                    engine=self.engine, engines=self._engines, **self.engine_options, **self.indexer_options
+                )
+                stats = indexer.load_or_build(folder_path, workers=workers)
+
+                with self._lock:
+                    now = time.monotonic()
+                    self._entries[key] = {"indexer": indexer, "built_at": now, "last_used": now}
+                    self._entries.move_to_end(key)
+                    self._evict()
+                return indexer, stats
+        finally:
+            with self._lock:
+                build["users"] -= 1
+                self._drop_build_lock(key)
+
+    def watch(self, folder_path, interval=2.0, debounce=1.0, workers=1):
+        """
+        Keeps the index of `folder_path` up to date in the background: when files
+        are added, changed or deleted, only those files are re-parsed and embedded
+        and the updated index replaces the old one (see `get(refresh=True)`).
+
+        :param interval: Seconds between folder checks.
+        :param debounce: Quiet period before an update starts (groups bursts of changes).
+        :return: The FolderWatcher (already started).
+        """
+        key = self._key(folder_path)
+        with self._lock:
+            watcher = self._watchers.get(key)
+            if watcher is None:
+                watcher = self._watchers[key] = FolderWatcher(
+                    folder_path,
+                    lambda: self.get(folder_path, refresh=True, workers=workers),
+                    interval=interval,
+                    debounce=debounce,
+                )
+        return watcher.start()
+
+    def unwatch(self, folder_path):
+        """
+        Stops watching `folder_path` (the loaded index is kept).
+        """
+        with self._lock:
+            watcher = self._watchers.pop(self._key(folder_path), None)
+        if watcher is not None:
+            watcher.stop()
+
+    def is_watched(self, folder_path):
+        with self._lock:
+            watcher = self._watchers.get(self._key(folder_path))
+            return watcher is not None and watcher.running
+
+    def loaded(self):
+        """
+        Lists the folders whose index is currently in memory.
+        """
+        with self._lock:
+            return [folder for folder, _ in self._entries]
@@ -0,0 +1,427 @@
+# Import standard libraries for the asyncio HTTP server and the search thread.
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Shared index (loaded once, optionally watched) or a sharded one, and the QA steps.
+from registry import IndexRegistry
+from sharding import ShardedIndexer
+from watcher import FolderWatcher
+from qa import answer_question_async, build_context, configure_backend, join_context, retrieval_k
+from batch_qa import source_info
+import metrics
+
+# Largest accepted request body (questions are short).
+MAX_BODY_BYTES = 64 * 1024
+
+# Reason phrases of the status codes the service sends.
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """
+    Turned into an HTTP error response: {"error": message} with `status`.
+    """
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class QueryBatcher:
+    """
+    Groups queries arriving at about the same time into one batched search:
+    one embedding call and one multi-query FAISS (+ BM25) search for all of them.
+
+    - A single worker takes the waiting queries (at most `max_batch`) and
+      searches them in a background thread, so the event loop keeps accepting
+      requests. Queries arriving meanwhile form the next batch, so batches
+      grow with the number of concurrent clients.
+    - When a query arrives alone, the worker waits `window` seconds for
+      others to join, which costs at most that much latency.
+    - At most `max_pending` queries wait; more are rejected (HTTP 503)
+      instead of queueing without limit.
+    """
+
+    def __init__(self, get_indexer, window=0.005, max_batch=32, max_pending=256):
+        """
+        :param get_indexer: Function returning the current EmbeddingIndexer
+                            (called per batch, so index refreshes are picked up).
+        :param window: Seconds a lone query waits for others to join its batch.
+        :param max_batch: Max queries per search call.
+        :param max_pending: Max queries waiting for a batch.
+        """
+        self.get_indexer = get_indexer
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+
+        # Embedding and FAISS are CPU-bound: one search thread, batches run one at a time.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self._queue = None
+        self._worker = None
+
+        self.batches = 0
+        self.queries = 0
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """
+        Starts the batching worker on the running event loop.
+        """
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
+
+    async def search(self, question, k=3):
+        """
+        Searches one question as part of the next batch.
+
+        :return: List of matched Document chunks.
+        """
+        if self._queue.qsize() >= self.max_pending:
+            raise HTTPError(503, "Search queue is full, retry later.", retry_after=1)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((question, k, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.empty() and self.window > 0:
+                # Alone: give concurrent queries a moment to join.
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Skip queries whose client went away while waiting.
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+
+            questions = [question for question, _, _ in batch]
+            k = max(k for _, k, _ in batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self._search, questions, k)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.queries += len(batch)
+            metrics.count("server_batches_total")
+            metrics.count("server_batched_queries_total", len(batch))
+            for (_, k, future), docs in zip(batch, results):
+                if not future.done():
+                    future.set_result(docs[:k])
+
+    def _search(self, questions, k):
+        """
+        Runs in the search thread: one embedding call and one multi-query search.
+        """
+        indexer = self.get_indexer()
+        with metrics.timer("server_batch_search_seconds"):
+            return indexer.search_vectors(indexer.embed_queries(questions), k, questions)
+
+
+class QAService:
+    """
+    Lightweight async HTTP service in front of the QA pipeline (standard
+    library only; JSON in and out, HTTP/1.1 keep-alive):
+
+    - POST /search  {"question": "...", "k": 3} → retrieved chunks.
+    - POST /answer  {"question": "...", "k": 3} → LLM answer with its sources.
+    - GET  /health  → index size and queue state.
+    - GET  /metrics → Prometheus text (pipeline metrics if enabled, plus service gauges).
+
+    Searches go through a QueryBatcher. Answers are limited to `llm_queue`
+    requests waiting for or running on the LLM; beyond that the service
+    answers 503 with Retry-After instead of letting latency grow without bound.
+    """
+
+    def __init__(self, get_indexer, folder_path, batcher_options=None, llm_queue=16, llm_timeout=None):
+        """
+        :param get_indexer: Function returning the current index of `folder_path`
+                            (an EmbeddingIndexer from an IndexRegistry, or a ShardedIndexer).
+        :param folder_path: Document folder served.
+        :param batcher_options: Settings passed to QueryBatcher (window, max_batch, max_pending).
+        :param llm_queue: Max answer requests waiting for or running on the LLM.
+        :param llm_timeout: Per-request LLM timeout in seconds (None = backend default).
+        """
+        self.indexer = get_indexer
+        self.folder_path = folder_path
+        self.batcher = QueryBatcher(get_indexer, **(batcher_options or {}))
+        self.llm_queue = llm_queue
+        self.llm_timeout = llm_timeout
+        self.llm_in_flight = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    # ---------- Endpoints ----------
+
+    async def search(self, body):
+        question, k = self._question(body)
+        start = time.perf_counter()
+        docs = await self.batcher.search(question, k)
+        return {
+            "question": question,
+            "results": [dict(source_info(doc), text=doc.page_content) for doc in docs],
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    async def answer(self, body):
+        question, k = self._question(body)
+        # Backpressure: refuse before doing any work if the LLM is saturated.
+        if self.llm_in_flight >= self.llm_queue:
+            self.rejected += 1
+            metrics.count("server_rejected_total", reason="llm_queue")
+            raise HTTPError(503, "LLM queue is full, retry later.", retry_after=2)
+
+        self.llm_in_flight += 1
+        try:
+            start = time.perf_counter()
+            docs = await self.batcher.search(question, retrieval_k(k))
+            # Merging/re-ranking may use a cross-encoder: keep it off the event loop.
+            docs = await asyncio.to_thread(build_context, question, docs, k)
+            retrieval_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            answer = await answer_question_async(question, join_context(docs), self.llm_timeout)
+            llm_ms = (time.perf_counter() - start) * 1000
+        finally:
+            self.llm_in_flight -= 1
+
+        return {
+            "question": question,
+            "answer": answer,
+            "sources": [source_info(doc) for doc in docs],
+            "timings": {"retrieval_ms": retrieval_ms, "llm_ms": llm_ms},
+        }
+
+    async def health(self):
+        # Getting the index may load it again (after the registry dropped it
+        # as idle): keep that off the event loop.
+        indexer = await asyncio.to_thread(self.indexer)
+        return {
+            "status": "ok",
+            "folder": self.folder_path,
+            "chunks": indexer.chunk_count,
+            "index_version": indexer.index_version,
+            "search_pending": self.batcher.pending,
+            "llm_in_flight": self.llm_in_flight,
+            "llm_queue": self.llm_queue,
+            "batches": self.batcher.batches,
+            "queries": self.batcher.queries,
+            "rejected": self.rejected,
+            "uptime_s": time.time() - self.started,
+        }
+
+    def metrics_text(self):
+        gauges = {
+            "server_search_pending": self.batcher.pending,
+            "server_llm_in_flight": self.llm_in_flight,
+            "server_batches": self.batcher.batches,
+            "server_queries": self.batcher.queries,
+            "server_rejected": self.rejected,
+        }
+        lines = [f"# TYPE qa_{name} gauge\nqa_{name} {value}" for name, value in gauges.items()]
+        return metrics.prometheus_text() + "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _question(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON.")
+        question = data.get("question") if isinstance(data, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            raise HTTPError(400, 'Missing "question".')
+        k = data.get("k", 3)
+        # bool is a subclass of int: reject {"k": true} too.
+        if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= 50:
+            raise HTTPError(400, '"k" must be an integer between 1 and 50.')
+        return question.strip(), k
+
+    # ---------- HTTP ----------
+
+    async def _dispatch(self, method, path, body):
+        """
+        :return: (status, payload bytes, content type)
+        """
+        routes = {
+            "/search": ("POST", self.search),
+            "/answer": ("POST", self.answer),
+            "/health": ("GET", None),
+            "/metrics": ("GET", None),
+        }
+        if path not in routes:
+            raise HTTPError(404, f"Unknown path {path}.")
+        if method != routes[path][0]:
+            raise HTTPError(405, f"Use {routes[path][0]} for {path}.")
+
+        if path == "/metrics":
+            return 200, self.metrics_text().encode("utf-8"), "text/plain; version=0.0.4"
+        with metrics.timer("server_request_seconds", endpoint=path):
+            result = await (self.health() if path == "/health" else routes[path][1](body))
+        return 200, json.dumps(result, ensure_ascii=False).encode("utf-8"), "application/json"
+
+    async def handle(self, reader, writer):
+        """
+        Serves the requests of one connection (several with keep-alive).
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                extra_headers = {}
+                length = int(headers.get("content-length", 0))
+                try:
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "Request body too large.")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, content_type = await self._dispatch(method, urlsplit(target).path, body)
+                except HTTPError as e:
+                    status, content_type = e.status, "application/json"
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+                    if e.retry_after:
+                        extra_headers["Retry-After"] = str(e.retry_after)
+                except Exception as e:
+                    print(f"❌ Error serving {target}: {e}")
+                    status, content_type = 500, "application/json"
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                head = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(payload)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ] + [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive or length > MAX_BODY_BYTES:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Client went away, or sent something that is not HTTP.
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """
+        Runs the service until cancelled.
+        """
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🌐 QA service listening on http://{host}:{port} (POST /search, /answer; GET /health, /metrics)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def main(argv=None):
+    """
+    Command-line entry point, e.g.:
+    python app/server.py --folder ./data --port 8000
+    curl -s localhost:8000/answer -d '{"question": "Who is the CEO?"}'
+    """
+    parser = argparse.ArgumentParser(description="HTTP service for document QA.")
+    parser.add_argument("--folder", default="./data", help="Document folder to serve.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Max wait for a lone query to be batched.")
+    parser.add_argument("--max-batch", type=int, default=32, help="Max queries per search call.")
+    parser.add_argument("--max-pending", type=int, default=256, help="Max queries waiting to be searched.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max LLM calls in flight.")
+    parser.add_argument("--llm-queue", type=int, default=16, help="Max answer requests waiting for or running on the LLM.")
+    parser.add_argument("--llm", choices=["ollama", "fake"], default="ollama", help="'fake' answers offline (load tests).")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="Simulated seconds per fake answer.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse files.")
+    parser.add_argument("--shards", type=int, default=1, help="Split the index across N shard processes.")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch",
+                        help="Embedding backend ('onnx' = int8 ONNX model under onnxruntime).")
+    parser.add_argument("--no-watch", action="store_true", help="Do not update the index when files change.")
+    parser.add_argument("--metrics", action="store_true", help="Collect pipeline timers for /metrics.")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.enable()
+    if args.llm == "fake":
+        import qa
+        from ollama_stub import FakeBackend
+        qa.use_backend(FakeBackend(delay=args.llm_delay))
+    else:
+        configure_backend(max_in_flight=args.concurrency)
+
+    if args.shards > 1:
+        # Each shard process indexes and searches part of the files.
+        sharded = ShardedIndexer(args.shards, search_mode="hybrid", engine_options={"backend": args.backend})
+        sharded.engine.warm_up()
+        stats = sharded.load_or_build(args.folder, workers=args.workers)
+        get_indexer = lambda: sharded
+        if not args.no_watch:
+            # Every shard re-checks its files; only changed ones are re-embedded.
+            FolderWatcher(args.folder, lambda: sharded.load_or_build(args.folder, workers=args.workers)).start()
+    else:
+        registry = IndexRegistry(search_mode="hybrid", engine_options={"backend": args.backend})
+        registry.warm_up()
+        stats = registry.get(args.folder, refresh=True, workers=args.workers)[1]
+        get_indexer = lambda: registry.get(args.folder)[0]
+        if not args.no_watch:
+            registry.watch(args.folder, workers=args.workers)
+    print(f"🗂️ Index ready: {get_indexer().chunk_count} chunks ({len(stats['added'])} added, "
+          f"{len(stats['updated'])} updated, {len(stats['removed'])} removed)"
+          + (f" in {args.shards} shards" if args.shards > 1 else ""))
+
+    service = QAService(
+        get_indexer,
+        args.folder,
+        batcher_options={
+            "window": args.window_ms / 1000,
+            "max_batch": args.max_batch,
+            "max_pending": args.max_pending,
+        },
+        llm_queue=args.llm_queue,
+    )
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Stopped.")
+
+
+# Run the service only if this script is called directly.
+if __name__ == "__main__":
+    main()
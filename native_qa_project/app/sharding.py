@@ -0,0 +1,368 @@
+# Import standard libraries for shard processes and the request/reply plumbing.
+import atexit
+import hashlib
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+# Each shard is a regular EmbeddingIndexer over part of the files.
+from embedder import EmbeddingIndexer, default_index_dir, fuse_scores
+from embedding_cache import CACHE_DIR
+from embedding_engine import DEFAULT_MODEL, EmbeddingEngine
+
+# Timers and counters (no-ops unless metrics are enabled).
+import metrics
+
+
+def shard_of(key, n_shards):
+    """
+    Shard number of a file (its path relative to the document folder).
+    Stable across runs and machines, so a file always goes to the same shard.
+    """
+    return int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % n_shards
+
+
+def shard_index_dir(folder_path, shard, n_shards, index_type="flat"):
+    """
+    Folder where one shard's index is saved (next to the unsharded index).
+    """
+    return os.path.join(f"{default_index_dir(folder_path, index_type)}-shards{n_shards}", f"shard{shard}")
+
+
+class _ShardWorker:
+    """
+    Runs in the shard process: owns the shard's index and answers requests
+    from the coordinator. A rebuild runs in a background thread on a new
+    indexer that replaces the old one when done, so the shard keeps
+    answering searches meanwhile.
+    """
+
+    def __init__(self, conn, shard, n_shards, engine_class, engine_options, indexer_options):
+        self.conn = conn
+        self.shard = shard
+        self.n_shards = n_shards
+        self.engine = engine_class(**engine_options)
+
+        # An embedding cache folder must only be written by one process:
+        # each shard gets its own (its files always go to the same shard).
+        cache_dir = indexer_options.get("cache_dir", CACHE_DIR)
+        self.indexer_options = dict(indexer_options, cache_dir=cache_dir and os.path.join(cache_dir, f"shard{shard}"))
+        self.indexer = EmbeddingIndexer(engine=self.engine, **self.indexer_options)
+        self._send_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _reply(self, request_id, result=None, error=None):
+        with self._send_lock:
+            self.conn.send((request_id, result, error))
+
+    def include(self, key):
+        return shard_of(key, self.n_shards) == self.shard
+
+    def info(self):
+        return {
+            "shard": self.shard,
+            "pid": os.getpid(),
+            "chunks": self.indexer.chunk_count,
+            "index_version": self.indexer.index_version,
+        }
+
+    def load_or_build(self, folder_path, index_dir, workers):
+        with self._build_lock:
+            indexer = EmbeddingIndexer(engine=self.engine, **self.indexer_options)
+            stats = indexer.load_or_build(folder_path, index_dir, workers=workers, include=self.include)
+            if indexer.search_mode != "dense" and indexer.index is not None:
+                # Build BM25 now rather than on the first search.
+                indexer.lexical_index()
+            self.indexer = indexer
+        return dict(stats, **self.info())
+
+    def search(self, vectors, n, queries):
+        """
+        :return: Per query, (dense hits, lexical hits, {doc id: Document}).
+        """
+        indexer = self.indexer
+        results = []
+        for dense, lexical in indexer.search_candidates(vectors, n, queries):
+            docs = {doc_id: indexer.index.docstore.search(doc_id) for doc_id, _ in dense + lexical}
+            results.append((dense, lexical, docs))
+        return results
+
+    def _handle(self, request_id, method, args):
+        try:
+            self._reply(request_id, getattr(self, method)(*args))
+        except Exception as e:
+            self._reply(request_id, error=f"{type(e).__name__}: {e}")
+
+    def run(self):
+        while True:
+            try:
+                request_id, method, args = self.conn.recv()
+            except EOFError:
+                break
+            if method == "close":
+                self._reply(request_id)
+                break
+            if method == "load_or_build":
+                threading.Thread(target=self._handle, args=(request_id, method, args), daemon=True).start()
+            else:
+                self._handle(request_id, method, args)
+
+
+def _shard_main(conn, shard, n_shards, engine_class, engine_options, indexer_options):
+    """
+    Entry point of a shard process.
+    """
+    _ShardWorker(conn, shard, n_shards, engine_class, engine_options, indexer_options).run()
+
+
+class _ShardClient:
+    """
+    Coordinator side of one shard: starts its process and sends requests;
+    a reader thread resolves the Future of each request when its reply arrives.
+    """
+
+    def __init__(self, context, shard, n_shards, engine_class, engine_options, indexer_options):
+        self.shard = shard
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_shard_main,
+            args=(child_conn, shard, n_shards, engine_class, engine_options, indexer_options),
+            name=f"qa-shard-{shard}",
+        )
+        self.process.start()
+        child_conn.close()
+
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read, name=f"qa-shard-{shard}-reader", daemon=True)
+        self._reader.start()
+
+    def call(self, method, *args):
+        """
+        Sends a request to the shard.
+
+        :return: A Future resolved with the result (or the shard's error).
+        """
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            self.conn.send((request_id, method, args))
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                request_id, result, error = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(f"Shard {self.shard}: {error}"))
+            else:
+                future.set_result(result)
+
+        # The shard process is gone: fail whatever is still waiting.
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError(f"Shard {self.shard} stopped."))
+
+    def close(self, timeout=10):
+        if self.process.is_alive():
+            try:
+                self.call("close").result(timeout)
+            except Exception:
+                pass
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+
+
+class ShardedIndexer:
+    """
+    Splits a document folder into `n_shards` by file, each served by its own
+    process with its own EmbeddingIndexer (own FAISS/BM25 index, own saved
+    files, own embedding cache folder `<cache_dir>/shard{i}`, own copy of the
+    embedding model), so building and searching use several cores instead of
+    one Python process.
+
+    - Build: every shard parses, embeds and indexes its files in parallel.
+      `rebuild_shard` updates a single shard; the others are not touched.
+    - Search (scatter-gather): the query is embedded once here, sent to all
+      shards, and their scored candidates are merged: dense hits by cosine
+      similarity, hybrid hits fused together like in EmbeddingIndexer (BM25
+      statistics are per shard, which is close enough when files are spread
+      evenly).
+
+    Has the search methods of EmbeddingIndexer, so it can be used in its place.
+    Call `close` to stop the shard processes (also done at exit).
+    """
+
+    def __init__(self, n_shards=2, model_name=DEFAULT_MODEL, engine=None, shard_threads=None,
+                 engine_options=None, engine_class=EmbeddingEngine, **indexer_options):
+        """
+        :param n_shards: Number of shard processes.
+        :param model_name: Embedding model (loaded once per shard, and here for queries).
+        :param engine: An already loaded EmbeddingEngine to embed queries with.
+        :param shard_threads: PyTorch threads per shard (default: CPU cores / shards).
+        :param engine_options: Settings passed to every EmbeddingEngine (batch_size, ...).
+        :param engine_class: EmbeddingEngine (sub)class created by the shards; it must be
+                             importable by name, since shard processes are spawned.
+        :param indexer_options: Settings passed to every shard's EmbeddingIndexer
+                                (index_type, search_mode, chunking, ...).
+        """
+        if indexer_options.get("language_models"):
+            raise ValueError("language_models is not supported with shards")
+        self.n_shards = n_shards
+        self.engine_options = dict(engine_options or {}, model_name=model_name)
+        self.engine_class = engine_class
+        self.engine = engine or engine_class(**self.engine_options)
+        self.engine_options.setdefault(
+            "num_threads", shard_threads or max(1, (os.cpu_count() or 1) // n_shards)
+        )
+        self.indexer_options = indexer_options
+        self.index_type = indexer_options.get("index_type", "flat")
+        self.search_mode = indexer_options.get("search_mode", "dense")
+        self.hybrid_alpha = indexer_options.get("hybrid_alpha", 0.5)
+
+        self.shards = []
+        self.shard_info = {}
+        self.folder_path = None
+        self.index_id = "in-memory"
+        self.index_version = None
+
+    def start(self):
+        """
+        Starts the shard processes (done by `load_or_build` if needed).
+        """
+        if self.shards:
+            return
+        # 'spawn' starts clean processes: forking a process that already runs
+        # PyTorch/FAISS threads is unsafe.
+        context = multiprocessing.get_context("spawn")
+        self.shards = [
+            _ShardClient(context, shard, self.n_shards, self.engine_class, self.engine_options,
+                         self.indexer_options)
+            for shard in range(self.n_shards)
+        ]
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Stops the shard processes.
+        """
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+    @property
+    def chunk_count(self):
+        return sum(info["chunks"] for info in self.shard_info.values())
+
+    def _update_version(self):
+        versions = [str(self.shard_info[shard]["index_version"]) for shard in sorted(self.shard_info)]
+        self.index_version = hashlib.sha1("/".join(versions).encode("utf-8")).hexdigest()
+
+    def load_or_build(self, folder_path, index_dir=None, workers=1):
+        """
+        Loads and updates every shard in parallel (see EmbeddingIndexer.load_or_build).
+
+        :param index_dir: Ignored, each shard saves to `shard_index_dir`.
+        :param workers: Processes used by each shard to parse its files.
+        :return: The stats of all shards combined, plus 'shards' (stats per shard).
+        """
+        self.start()
+        self.folder_path = folder_path
+        self.index_id = os.path.abspath(os.path.dirname(shard_index_dir(folder_path, 0, self.n_shards, self.index_type)))
+        futures = [
+            shard.call(
+                "load_or_build", folder_path,
+                shard_index_dir(folder_path, shard.shard, self.n_shards, self.index_type), workers,
+            )
+            for shard in self.shards
+        ]
+        stats = {"added": [], "updated": [], "removed": [], "unchanged": 0, "shards": []}
+        for future in futures:
+            shard_stats = future.result()
+            self.shard_info[shard_stats["shard"]] = shard_stats
+            for key in ("added", "updated", "removed"):
+                stats[key] += shard_stats[key]
+            stats["unchanged"] += shard_stats["unchanged"]
+            stats["shards"].append(shard_stats)
+        self._update_version()
+        return stats
+
+    def rebuild_shard(self, shard, workers=1):
+        """
+        Brings a single shard up to date with the folder (the other shards
+        keep serving, and are not re-scanned).
+
+        :return: That shard's stats.
+        """
+        shard_stats = self.shards[shard].call(
+            "load_or_build", self.folder_path,
+            shard_index_dir(self.folder_path, shard, self.n_shards, self.index_type), workers,
+        ).result()
+        self.shard_info[shard] = shard_stats
+        self._update_version()
+        return shard_stats
+
+    # ---------- Search ----------
+
+    def embed_query(self, query):
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries):
+        """
+        Embeds queries once, here; the vectors are sent to the shards.
+        """
+        vectors = np.asarray(self.engine.embed_queries(queries), dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def search(self, query, k=3):
+        return self.search_vectors(self.embed_queries([query]), k, [query])[0]
+
+    def search_by_vector(self, vector, k=3, query=None):
+        queries = None if query is None else [query]
+        return self.search_vectors(np.asarray([vector], dtype=np.float32), k, queries)[0]
+
+    def search_batch(self, queries, k=3):
+        if not queries:
+            return []
+        return self.search_vectors(self.embed_queries(queries), k, queries)
+
+    def search_vectors(self, vectors, k=3, queries=None):
+        """
+        Scatters the queries to every shard and merges their candidates.
+
+        :return: One list of matched Document chunks per vector.
+        """
+        dense_only = self.search_mode == "dense" or queries is None
+        n_candidates = k if dense_only else max(4 * k, 20)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+        with metrics.timer("shard_scatter_gather_seconds", shards=self.n_shards):
+            futures = [shard.call("search", vectors, n_candidates, queries) for shard in self.shards]
+            shard_results = [future.result() for future in futures]
+
+        results = []
+        for per_shard in zip(*shard_results):
+            dense = sorted((hit for d, _, _ in per_shard for hit in d), key=lambda hit: -hit[1])
+            lexical = sorted((hit for _, l, _ in per_shard for hit in l), key=lambda hit: -hit[1])
+            docs = {doc_id: doc for _, _, shard_docs in per_shard for doc_id, doc in shard_docs.items()}
+            if dense_only:
+                doc_ids = [doc_id for doc_id, _ in dense[:k]]
+            else:
+                doc_ids = fuse_scores(dense[:n_candidates], lexical[:n_candidates], self.hybrid_alpha)[:k]
+            results.append([docs[doc_id] for doc_id in doc_ids])
+        return results
@@ -1,15 +1,28 @@
 # ✅ Import core modules:
 # - streamlit: web UI framework
-# - os, pickle: standard Python libs (pickle is unused here)
-# - loader, embedder, qa: your custom pipeline modules
-# - FAISS: vector store class (imported but not directly used here)
+# - registry, qa, answer_cache: your custom pipeline modules (the registry uses the embedder and loader)
+# Heavy dependencies (sentence-transformers, torch, document loaders) load on first use.
 import streamlit as st
-import os
-import pickle  # Note: not used in current code
-from loader import load_documents
-from embedder import EmbeddingIndexer
-from qa import answer_question
-from langchain_community.vectorstores import FAISS
+from registry import IndexRegistry
+from qa import answer_question_stream, retrieval_k
+from answer_cache import AnswerCache
+import metrics
+
+# 🧠 One embedding model + one index per folder, shared by every browser session
+@st.cache_resource
+def get_registry():
+    registry = IndexRegistry(search_mode="hybrid")
+    # Load the embedding model in the background, so the page renders right away
+    # and the model is ready by the time a folder is loaded.
+    registry.warm_up()
+    return registry
+
+
+# ⚡ One answer cache shared by every browser session
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
+
 
 # 🚀 Set the page title
 st.title("📚 Native Language QA on Documents")
@@ -24,37 +37,61 @@ with col3:
 # 📂 Text input for the folder path with a default suggestion
 folder_path = st.text_input("📁 Enter path to document folder:", "./data")
 
+# 👀 Watch mode: added/changed/deleted files are indexed in the background
+watch_folder = st.checkbox("👀 Watch folder for changes", value=True)
+
 # 📂 Load Folder button:
-# 1️⃣ Load all files from folder if not loaded yet.
-# 2️⃣ If path changed, clear old index and reload.
+# 1️⃣ Load the saved index for the folder (or build it the first time).
+# 2️⃣ Re-index only files that were added, changed or deleted since last time.
+# 3️⃣ The index is shared: other sessions on the same folder reuse it.
+# 4️⃣ In watch mode, later file changes update the index without pressing the button again.
 if st.button("📂 Load Folder"):
-    if (
-        "indexer" not in st.session_state
-        or folder_path != st.session_state.get("loaded_path", "")
-    ):
-        # Remember the folder path to detect changes later
+    with st.spinner("🔄 Loading & updating index from folder..."):
+        indexer, stats = get_registry().get(folder_path, refresh=True)
+
+    if indexer.chunk_count == 0:
+        st.error("❌ No valid documents found in the selected folder.")
+        st.session_state.loaded_path = None
+    else:
+        # Remember the folder path; the index itself lives in the registry
         st.session_state.loaded_path = folder_path
-        st.session_state.indexer = None
-        st.session_state.docs = None
+        summary = f"✅ {indexer.chunk_count} chunks ready"
+        if stats:
+            summary += (
+                f" ({len(stats['added'])} added, {len(stats['updated'])} updated, "
+                f"{len(stats['removed'])} removed, {stats['unchanged']} unchanged files)"
+            )
+        st.success(summary)
 
-        with st.spinner("🔄 Loading & building index from folder..."):
-            # Call your custom loader to read and chunk all valid docs
-            st.session_state.docs = load_documents(folder_path)
+        if watch_folder:
+            get_registry().watch(folder_path)
+        else:
+            get_registry().unwatch(folder_path)
 
-            if not st.session_state.docs:
-                st.error("❌ No valid documents found in the selected folder.")
-            else:
-                # Initialize the embedder and build the FAISS index
-                st.session_state.indexer = EmbeddingIndexer()
-                st.session_state.indexer.build_index(st.session_state.docs)
+# 🗂️ Get this session's index from the shared registry (reloaded from disk if it was dropped)
+indexer = None
+if st.session_state.get("loaded_path"):
+    indexer, _ = get_registry().get(st.session_state.loaded_path)
+    if get_registry().is_watched(st.session_state.loaded_path):
+        st.caption(f"👀 Watching folder · {indexer.chunk_count} chunks indexed")
 
 # ✅ If index is ready, show question input and answer output
-if "indexer" in st.session_state and st.session_state.indexer:
+if indexer is not None and indexer.chunk_count:
     query = st.text_input("🔎 Ask a question:")
 
     if query:
-        # 🔍 Search the vector store for top-k similar chunks
-        results = st.session_state.indexer.search(query)
+        answer_cache = get_answer_cache()
+
+        # ⚡ Reuse a cached answer for the same (or a near-identical) question,
+        # otherwise search the vector store for top-k similar chunks
+        # and assemble them into the LLM context (merged, within the token budget)
+        hit, query_vector = answer_cache.lookup(query, indexer)
+        if hit:
+            results = hit["docs"]
+        else:
+            candidates = indexer.search_by_vector(query_vector, k=retrieval_k(3), query=query)
+            stream = answer_question_stream(query, candidates, k=3)
+            results = stream.context
 
         # 🗂️ Build metadata for source display (file name, page, path)
         sources = []
@@ -77,12 +114,24 @@ if "indexer" in st.session_state and st.session_state.indexer:
                 height=150
             )
 
-        # 🧠 Run LLM to generate the final answer
-        with st.spinner("🤖 Generating answer..."):
-            answer = answer_question(query, results)
+        # 🧠 Run LLM and show the answer token by token as it is generated
+        answer_box = st.empty()
+        if hit:
+            answer = hit["answer"]
+        else:
+            answer_box.markdown("**💬 Answer:** 🤖 ...")
+            answer = ""
+            for token in stream:
+                answer += token
+                answer_box.markdown(f"**💬 Answer:** {answer}▌")
+            answer_cache.put(query, indexer, answer, results, query_vector)
 
-        # ✅ Show final answer + sources
-        st.markdown(f"**💬 Answer:** {answer}")
+        # ✅ Show final answer + latency + sources
+        answer_box.markdown(f"**💬 Answer:** {answer}")
+        if hit:
+            st.caption(f"⚡ Cached answer (asked before as: “{hit['question']}”)")
+        elif stream.first_token_s is not None:
+            st.caption(f"⏱️ First token: {stream.first_token_s:.2f}s · Total: {stream.total_s:.2f}s")
         st.markdown("**📄 Sources Used:**")
         for src in unique_sources:
             st.markdown(src)
@@ -90,3 +139,8 @@ if "indexer" in st.session_state and st.session_state.indexer:
 else:
     # 📌 Reminder for the user to load a folder first
     st.info("👆 Select a folder and press **Load Folder** to start.")
+
+# 📈 Timers and counters of this server process (run with QA_METRICS=1 to collect them)
+if metrics.is_enabled():
+    with st.expander("📈 Metrics"):
+        st.code(metrics.prometheus_text(), language="text")
@@ -0,0 +1,98 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+import ann_index
+import embedder
+from ann_index import MIN_ANN_VECTORS, build_faiss_index, compare_index_types, index_vectors, is_flat
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer
+
+
+def _search_files(indexer, query, k=3):
+    return {doc.metadata["file_name"] for doc in indexer.search(query, k)}
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_sq8", "hnsw"])
+def test_delete_and_edit_files_keep_ids_in_sync(engine, workdir, index_type):
+    # Enough chunks for the approximate index to be trained (not the flat fallback).
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(100, sentences=12))
+    indexer = EmbeddingIndexer(engine=engine, index_type=index_type)
+    indexer.load_or_build(folder)
+    assert indexer.chunk_count >= MIN_ANN_VECTORS[index_type]
+    assert not is_flat(indexer.index.index)
+
+    # One file deleted, one edited: LangChain renumbers the docstore ids.
+    os.remove(os.path.join(folder, "doc010.txt"))
+    write_files(folder, {"doc020.txt": "Replaced text about zebra crossings and zebra stripes."})
+    stats = indexer.load_or_build(folder)
+    assert stats["removed"] == ["doc010.txt"] and stats["updated"] == ["doc020.txt"]
+    assert not is_flat(indexer.index.index)
+
+    reloaded = EmbeddingIndexer(engine=engine, index_type=index_type)
+    reloaded.load_or_build(folder)
+    for current in (indexer, reloaded):
+        assert current.index.index.ntotal == len(current.index.index_to_docstore_id)
+        assert "doc020.txt" in _search_files(current, "zebra stripes")
+        for i in (0, 10, 50, 99):
+            files = _search_files(current, f"topic{i} subject{i}")
+            assert "doc010.txt" not in files
+            if i != 10:
+                assert f"doc{i:03d}.txt" in files
+
+
+def test_ivf_pq_falls_back_to_flat_below_training_minimum():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 32)).astype(np.float32)
+    assert is_flat(build_faiss_index(vectors, "ivf_pq"))
+    # IVF-flat trains on the same vectors.
+    assert not is_flat(build_faiss_index(vectors, "ivf_flat"))
+
+
+def test_index_vectors_reads_ivf_in_insertion_order():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(600, 16)).astype(np.float32)
+    index = build_faiss_index(vectors, "ivf_flat")
+    np.testing.assert_allclose(index_vectors(index), vectors, rtol=1e-5)
+
+
+def test_comparison_reports_the_flat_fallback():
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(1000, 32)).astype(np.float32)
+    rows = compare_index_types(vectors, vectors[:20], configs=[("ivf_pq", {}), ("ivf_flat", {})])
+    assert rows[0]["factory"] == "Flat" and rows[0]["fallback"]
+    assert rows[1]["factory"].startswith("IVF") and not rows[1]["fallback"]
+
+
+def test_report_on_an_empty_folder(monkeypatch, workdir, capsys):
+    os.makedirs("empty")
+    monkeypatch.setattr(sys, "argv", ["ann_index.py", "empty"])
+    ann_index.main()
+    assert "No documents loaded" in capsys.readouterr().out
+
+
+def test_quantized_index_is_rebuilt_from_the_embedded_vectors(engine, monkeypatch, workdir):
+    write_files("docs", topic_files(100, sentences=12))
+    indexer = EmbeddingIndexer(engine=engine, cache_dir=None, index_type="ivf_sq8")
+    indexer.load_or_build("docs")
+    assert not is_flat(indexer.index.index)
+
+    rebuilt = []
+    build = embedder.build_faiss_index
+
+    def spy(vectors, *args):
+        rebuilt.append(vectors)
+        return build(vectors, *args)
+
+    monkeypatch.setattr(embedder, "build_faiss_index", spy)
+    removed = [indexer.index.index_to_docstore_id[i] for i in range(12)]
+    indexer.remove_documents(removed)
+    indexer._apply_index_type()
+
+    # Retrained on the model's vectors, not on the decoded 8-bit codes.
+    texts = [indexer.index.docstore.text(indexer.index.index_to_docstore_id[i]) for i in range(indexer.own_chunk_count)]
+    np.testing.assert_allclose(rebuilt[0], engine.embed_documents(texts), atol=1e-6)
+    assert not is_flat(indexer.index.index)
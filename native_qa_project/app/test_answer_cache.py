@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from answer_cache import AnswerCache
+
+
+class FakeIndexer:
+    """
+    The attributes AnswerCache reads from an EmbeddingIndexer.
+    """
+
+    def __init__(self, index_id="docs", index_version="v1", vectors=None):
+        self.index_id = index_id
+        self.index_version = index_version
+        self.vectors = vectors or {}
+
+    def embed_query(self, question):
+        return self.vectors[question]
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _docs(name):
+    return [Document(page_content=f"chunk of {name}", metadata={"file_name": name})]
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = AnswerCache()
+    indexer = FakeIndexer()
+    cache.put("What is Charbel's email?", indexer, "charbel@example.com", _docs("cv.pdf"))
+    hit = cache.get("what is charbel's email", indexer.index_id, indexer.index_version)
+    assert hit["answer"] == "charbel@example.com"
+    assert hit["docs"][0].metadata == {"file_name": "cv.pdf"}
+
+
+def test_paraphrases_with_different_answers_are_not_merged():
+    # Two different questions whose embeddings are close, but below the threshold.
+    when, where = _unit(1.0, 0.3, 0.0), _unit(1.0, 0.0, 0.3)
+    assert 0.9 < float(when @ where) < 0.95
+    indexer = FakeIndexer(vectors={"When was the company founded?": when, "Where was the company founded?": where})
+    cache = AnswerCache()
+    cache.put("When was the company founded?", indexer, "In 1998.", _docs("history.txt"), when)
+
+    hit, vector = cache.lookup("Where was the company founded?", indexer)
+    assert hit is None and vector is where
+    cache.put("Where was the company founded?", indexer, "In Beirut.", _docs("history.txt"), where)
+    assert cache.lookup("When was the company founded?", indexer)[0]["answer"] == "In 1998."
+    assert cache.lookup("Where was the company founded?", indexer)[0]["answer"] == "In Beirut."
+
+    # A true paraphrase (almost the same embedding) reuses the answer.
+    close = _unit(1.0, 0.3, 0.01)
+    assert cache.get_similar(close, "docs", "v1")["answer"] == "In 1998."
+    # A lower threshold merges the two questions.
+    loose = AnswerCache("loose.sqlite3", similarity_threshold=0.9)
+    loose.put("When was the company founded?", indexer, "In 1998.", _docs("history.txt"), when)
+    assert loose.get_similar(where, "docs", "v1")["answer"] == "In 1998."
+
+
+def test_answers_are_kept_per_index_version():
+    old, new = FakeIndexer(index_version="v1"), FakeIndexer(index_version="v2")
+    vector = _unit(0.0, 1.0, 0.0)
+    cache = AnswerCache()
+    cache.put("Who signed the contract?", old, "Alice", _docs("contract.pdf"), vector)
+    cache.put("Who signed the contract?", new, "Bob", _docs("contract.pdf"), vector)
+
+    # Each version only sees its own answer, and the other one is still there.
+    assert cache.get("Who signed the contract?", "docs", "v1")["answer"] == "Alice"
+    assert cache.get("Who signed the contract?", "docs", "v2")["answer"] == "Bob"
+    assert cache.get_similar(vector, "docs", "v2")["answer"] == "Bob"
+    assert cache.get_similar(vector, "docs", "v3") is None
+    assert cache.get_similar(vector, "other", "v1") is None
+    # A query of another size (another embedding model) never matches.
+    assert cache.get_similar(_unit(0.0, 1.0), "docs", "v1") is None
+
+
+def test_answers_survive_restarts_and_lru_eviction():
+    indexer = FakeIndexer()
+    cache = AnswerCache(max_entries=2)
+    for i in range(3):
+        cache.put(f"question {i}", indexer, f"answer {i}", _docs("a.txt"), _unit(1.0, i, 0.0))
+    assert len(cache) == 2
+
+    reloaded = AnswerCache(max_entries=2)
+    assert reloaded.get("question 0", "docs", "v1") is None
+    assert reloaded.get("question 2", "docs", "v1")["answer"] == "answer 2"
+    assert reloaded.get_similar(_unit(1.0, 1.0, 0.0), "docs", "v1")["answer"] == "answer 1"
+
+
+def test_invalid_threshold_is_rejected():
+    with pytest.raises(ValueError):
+        AnswerCache(similarity_threshold=1.5)
+
+
+def test_close_questions_asking_for_different_facts_are_not_merged():
+    # e5 puts questions with the same wording very close, whatever fact they ask for.
+    email, phone, address = _unit(1.0, 0.1, 0.0), _unit(1.0, 0.0, 0.1), _unit(1.0, 0.1, 0.01)
+    assert float(email @ phone) > 0.98 and float(email @ address) > 0.98
+    indexer = FakeIndexer(vectors={
+        "What is Charbel's email?": email,
+        "What is Charbel's phone number?": phone,
+        "What's Charbel's email address?": address,
+    })
+    cache = AnswerCache()
+    cache.put("What is Charbel's email?", indexer, "charbel@example.com", _docs("cv.pdf"), email)
+
+    assert cache.lookup("What is Charbel's phone number?", indexer)[0] is None
+    assert cache.lookup("What's Charbel's email address?", indexer)[0]["answer"] == "charbel@example.com"
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from answer_cache import AnswerCache
+from batch_qa import read_questions, run_batch
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer
+
+
+@pytest.fixture
+def indexer(engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(6))
+    indexer = EmbeddingIndexer(engine=engine, search_mode="hybrid")
+    indexer.load_or_build(folder)
+    return indexer
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_questions_are_read_from_jsonl_and_csv(workdir):
+    with open("questions.jsonl", "w", encoding="utf-8") as f:
+        f.write('{"id": "q1", "question": "First?"}\n\n"Second?"\n')
+    with open("questions.csv", "w", encoding="utf-8") as f:
+        f.write("id,question\na,Third?\n,Fourth?\n")
+    assert read_questions("questions.jsonl") == [{"id": "q1", "question": "First?"}, {"id": 1, "question": "Second?"}]
+    assert read_questions("questions.csv") == [{"id": "a", "question": "Third?"}, {"id": 1, "question": "Fourth?"}]
+
+
+def test_batch_answers_every_question_with_its_sources(indexer, fake_llm):
+    questions = [{"id": i, "question": f"What about topic{i} and subject{i}?"} for i in range(6)]
+    assert run_batch(indexer, questions, "answers.jsonl", k=2, batch_size=4) == 6
+
+    records = sorted(_read_jsonl("answers.jsonl"), key=lambda record: record["id"])
+    assert [record["id"] for record in records] == list(range(6))
+    for i, record in enumerate(records):
+        assert record["sources"][0]["file_name"] == f"doc{i:03d}.txt"
+        assert f"topic{i}" in record["answer"] and not record["cached"]
+
+
+def test_repeated_questions_are_answered_from_the_cache(indexer, fake_llm):
+    cache = AnswerCache()
+    questions = [{"id": 0, "question": "What about topic1?"}]
+    run_batch(indexer, questions, "first.jsonl", cache=cache)
+    repeated = [{"id": 0, "question": "what about topic1"}, {"id": 1, "question": "What about topic2?"}]
+    assert run_batch(indexer, repeated, "second.jsonl", cache=cache) == 2
+
+    records = {record["id"]: record for record in _read_jsonl("second.jsonl")}
+    assert records[0]["cached"] and records[0]["timings"]["llm_ms"] == 0.0
+    assert records[0]["answer"] == _read_jsonl("first.jsonl")[0]["answer"]
+    assert not records[1]["cached"]
+
+
+def test_failed_llm_calls_are_recorded_and_not_cached(indexer, fake_llm, monkeypatch):
+    async def fail(prompt, timeout=None):
+        raise TimeoutError("LLM timed out")
+
+    monkeypatch.setattr(fake_llm, "agenerate", fail)
+    cache = AnswerCache()
+    assert run_batch(indexer, [{"id": 0, "question": "topic3?"}], "answers.jsonl", cache=cache) == 0
+    record = _read_jsonl("answers.jsonl")[0]
+    assert record["answer"] is None and "timed out" in record["error"]
+    assert len(cache) == 0
@@ -0,0 +1,57 @@
+import json
+import os
+
+import pytest
+
+import benchmark
+import loader
+import pdf_extract
+from conftest import HashEngine
+from benchmark import make_synthetic_corpus, measure_ingest, percentiles, run_benchmark
+from embedder import EmbeddingIndexer
+from test_pdf_extract import SAMPLE_PDF
+
+
+def test_synthetic_corpus_is_reproducible(workdir):
+    first = make_synthetic_corpus("a", n_files=3, paragraphs=4, seed=7)
+    second = make_synthetic_corpus("b", n_files=3, paragraphs=4, seed=7)
+    assert first == second
+    for case in first:
+        with open(os.path.join("a", case["expected_file"]), encoding="utf-8") as f:
+            assert case["expected_keywords"][0] in f.read()
+
+
+def test_percentiles():
+    summary = percentiles([float(ms) for ms in range(1, 101)])
+    assert summary["count"] == 100 and summary["max_ms"] == 100.0
+    assert summary["p50_ms"] == pytest.approx(50.5)
+    assert percentiles([]) == {"count": 0}
+
+
+def test_benchmark_report_on_a_synthetic_corpus(monkeypatch, workdir):
+    monkeypatch.setattr(benchmark, "EmbeddingEngine", HashEngine)
+    report = run_benchmark(synthetic_files=8, paragraphs=3, repeat=1, llm="fake", model_name="test/hash")
+    json.dumps(report)
+
+    assert report["config"]["model_name"] == "test/hash"
+    assert set(report["ingest"]) == {"load", "chunk", "embed", "index_build"}
+    assert report["ingest"]["load"]["files"] == 8
+    assert report["search"]["latency"]["count"] == 8
+    # Hybrid search finds the project codes by name.
+    assert report["search"]["recall"]["file_recall_at_k"] >= 0.75
+    assert report["end_to_end"]["latency"]["count"] == 8
+
+
+@pytest.mark.skipif(pdf_extract.pdfium is None, reason="pypdfium2 is not installed")
+def test_ingest_parses_pdfs_on_every_run(engine, monkeypatch, workdir):
+    extracted = []
+    extract_pages = pdf_extract._extract_pages
+    monkeypatch.setattr(pdf_extract, "_extract_pages", lambda *args: extracted.append(args[0]) or extract_pages(*args))
+    app_cache = loader.page_cache
+    indexer = EmbeddingIndexer(engine=engine)
+    for run in ("first", "second"):
+        stages = measure_ingest([SAMPLE_PDF], indexer, f"{run}/embedding_cache", f"{run}/page_cache")
+        assert stages["load"]["files"] == 1
+    # Both runs extracted the PDF, and the app's page cache was left alone.
+    assert extracted == [SAMPLE_PDF, SAMPLE_PDF]
+    assert loader.page_cache is app_cache and not os.path.exists(app_cache.cache_dir)
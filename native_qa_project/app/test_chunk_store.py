@@ -0,0 +1,74 @@
+import os
+
+from langchain_core.documents import Document
+
+from chunk_store import TEXT_FILE, ChunkStore
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer
+
+
+def _doc(i, file_name="a.txt"):
+    return Document(page_content=f"Chunk {i} text é", metadata={"file_name": file_name, "page": 0, "start_index": i * 10})
+
+
+def test_documents_round_trip_and_metadata_is_interned(workdir):
+    store = ChunkStore()
+    store.add({f"id{i}": _doc(i, "a.txt" if i < 3 else "b.txt") for i in range(5)})
+    assert len(store.metadata) == 2
+    assert store.search("id4") == _doc(4, "b.txt")
+    assert store.text("id1") == "Chunk 1 text é"
+    assert store.search("missing") == "ID missing not found."
+
+    store.save(str(workdir), [f"id{i}" for i in range(5)])
+    loaded = ChunkStore.load(str(workdir))
+    assert [loaded.search(f"id{i}") for i in range(5)] == [_doc(i, "a.txt" if i < 3 else "b.txt") for i in range(5)]
+    loaded.close()
+    store.close()
+
+
+def test_saves_append_new_text_and_compact_deleted_text(workdir):
+    index_dir = str(workdir)
+    text_path = os.path.join(index_dir, TEXT_FILE)
+    store = ChunkStore()
+    store.add({f"id{i}": _doc(i) for i in range(10)})
+    store.save(index_dir, [f"id{i}" for i in range(10)])
+    size = os.path.getsize(text_path)
+
+    # New chunks are appended; a few deleted ones stay in the file.
+    store.add({"id10": _doc(10)})
+    store.delete(["id0", "id1"])
+    order = [f"id{i}" for i in range(2, 11)]
+    store.save(index_dir, order)
+    assert os.path.getsize(text_path) == size + len(_doc(10).page_content.encode("utf-8"))
+    assert store.garbage_bytes > 0
+
+    # Once more than half of the file is garbage, it is rewritten with live chunks only.
+    store.delete([f"id{i}" for i in range(2, 8)])
+    order = ["id8", "id9", "id10"]
+    store.save(index_dir, order)
+    assert store.garbage_bytes == 0
+    assert os.path.getsize(text_path) == sum(len(_doc(i).page_content.encode("utf-8")) for i in (8, 9, 10))
+
+    loaded = ChunkStore.load(index_dir)
+    assert len(loaded) == 3
+    assert [loaded.search(doc_id) for doc_id in order] == [_doc(8), _doc(9), _doc(10)]
+    loaded.close()
+    store.close()
+
+
+def test_index_keeps_chunks_in_the_store_across_updates(engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(6))
+    indexer = EmbeddingIndexer(engine=engine)
+    indexer.load_or_build(folder)
+    assert isinstance(indexer.index.docstore, ChunkStore)
+
+    for i in range(4):
+        os.remove(os.path.join(folder, f"doc{i:03d}.txt"))
+    indexer.load_or_build(folder)
+    reloaded = EmbeddingIndexer(engine=engine)
+    reloaded.load_or_build(folder)
+    store = reloaded.index.docstore
+    assert len(store) == reloaded.chunk_count == indexer.chunk_count
+    assert store.garbage_bytes == 0
+    assert reloaded.search("topic5 subject5", 1)[0].metadata["file_name"] == "doc005.txt"
@@ -0,0 +1,61 @@
+from langchain_core.documents import Document
+
+from context import ContextBuilder, estimate_tokens
+
+PAGE = "The warranty lasts two years from delivery. Batteries are covered for six months only. Returns need the receipt."
+
+
+def _chunk(start, end, page=0, source="terms.pdf", **metadata):
+    return Document(page_content=PAGE[start:end],
+                    metadata=dict(source=source, page=page, start_index=start, **metadata))
+
+
+class ReverseReranker:
+    """
+    Stand-in for CrossEncoderReranker: reverses the search order.
+    """
+
+    def rerank(self, question, docs):
+        return docs[::-1]
+
+
+def test_overlapping_chunks_are_merged_and_duplicates_dropped():
+    first, second = _chunk(0, 60), _chunk(45, len(PAGE))
+    other_page = _chunk(0, 40, page=1)
+    context = ContextBuilder().build("warranty?", [second, other_page, first, first])
+
+    assert [doc.page_content for doc in context] == [PAGE, PAGE[:40]]
+    assert context[0].metadata["merged_chunks"] == 2
+    assert "start_index" not in context[0].metadata
+
+
+def test_chunks_without_positions_merge_on_text_overlap():
+    first = Document(page_content=PAGE[:60], metadata={"source": "terms.pdf", "page": 0})
+    second = Document(page_content=PAGE[45:], metadata={"source": "terms.pdf", "page": 0})
+    assert [doc.page_content for doc in ContextBuilder().build("q", [first, second])] == [PAGE]
+
+
+def test_context_fits_the_token_budget_best_blocks_first():
+    docs = [Document(page_content=f"File {i}: {PAGE[:36]}", metadata={"source": f"file{i}.pdf"}) for i in range(10)]
+    builder = ContextBuilder(max_tokens=30, min_block_tokens=5)
+    context = builder.build("q", docs)
+    assert sum(estimate_tokens(doc.page_content) for doc in context) <= 30
+    assert [doc.metadata["source"] for doc in context] == ["file0.pdf", "file1.pdf", "file2.pdf"]
+    # The last block was cut at a word boundary.
+    assert docs[2].page_content.startswith(context[-1].page_content + " ")
+
+
+def test_reranker_orders_blocks_and_widens_retrieval():
+    docs = [_chunk(0, 20, source="a.pdf"), _chunk(20, 44, source="b.pdf")]
+    builder = ContextBuilder(reranker=ReverseReranker(), candidates=10)
+    assert builder.fetch_k(3) == 10 and ContextBuilder().fetch_k(3) == 3
+    assert [doc.metadata["source"] for doc in builder.build("q", docs)] == ["b.pdf", "a.pdf"]
+
+
+def test_reranked_context_keeps_only_the_top_k_blocks():
+    docs = [Document(page_content=f"File {i} says the warranty lasts {i} years.", metadata={"source": f"file{i}.pdf"})
+            for i in range(10)]
+    builder = ContextBuilder(reranker=ReverseReranker(), candidates=10)
+    assert len(docs) == builder.fetch_k(3)
+    context = builder.build("q", docs, k=3)
+    assert [doc.metadata["source"] for doc in context] == ["file9.pdf", "file8.pdf", "file7.pdf"]
@@ -0,0 +1,52 @@
+import os
+
+from conftest import HashEngine, topic_files, write_files
+from embedder import EmbeddingIndexer
+
+
+def _files(indexer, query, k=3):
+    return [doc.metadata["file_name"] for doc in indexer.search(query, k)]
+
+
+def test_reindex_only_embeds_changed_files(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(5))
+    first = EmbeddingIndexer(engine=HashEngine(), cache_dir=None)
+    stats = first.load_or_build(folder)
+    assert sorted(stats["added"]) == [f"doc{i:03d}.txt" for i in range(5)]
+    version = first.index_version
+
+    # Nothing changed: the saved index is loaded and nothing is embedded.
+    engine = HashEngine()
+    second = EmbeddingIndexer(engine=engine, cache_dir=None)
+    stats = second.load_or_build(folder)
+    assert stats == {"added": [], "updated": [], "removed": [], "unchanged": 5}
+    assert engine._model.calls == 0
+    assert second.index_version == version and second.chunk_count == first.chunk_count
+
+    # Touched but identical, edited, deleted and new files.
+    path = os.path.join(folder, "doc001.txt")
+    os.utime(path, (1, 1))
+    write_files(folder, {"doc002.txt": "Rewritten notes about lighthouses.", "new.txt": "Fresh notes on glaciers."})
+    os.remove(os.path.join(folder, "doc003.txt"))
+    stats = second.load_or_build(folder)
+    assert stats == {"added": ["new.txt"], "updated": ["doc002.txt"], "removed": ["doc003.txt"], "unchanged": 3}
+    assert engine._model.calls == 2  # One batch per changed file.
+    assert second.index_version != version
+
+    third = EmbeddingIndexer(engine=HashEngine(), cache_dir=None)
+    assert third.load_or_build(folder)["unchanged"] == 5
+    assert _files(third, "lighthouses", 1) == ["doc002.txt"]
+    assert _files(third, "glaciers", 1) == ["new.txt"]
+    assert "doc003.txt" not in _files(third, "topic3 subject3", 5)
+    assert _files(third, "topic4 subject4", 1) == ["doc004.txt"]
+
+
+def test_each_folder_and_index_type_has_its_own_saved_index(engine, workdir):
+    for name in ("a", "b"):
+        write_files(os.path.join(workdir, name), {f"{name}.txt": f"Notes about folder {name}."})
+    indexer = EmbeddingIndexer(engine=engine)
+    indexer.load_or_build(os.path.join(workdir, "a"))
+    stats = indexer.load_or_build(os.path.join(workdir, "b"))
+    assert stats["added"] == ["b.txt"] and indexer.chunk_count == 1
+    assert _files(indexer, "folder", 3) == ["b.txt"]
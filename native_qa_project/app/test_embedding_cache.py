@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+
+import embedding_cache
+from conftest import HashEncoder, HashEngine, topic_files, write_files
+from embedder import EmbeddingIndexer
+from embedding_cache import CachedEmbeddings, EmbeddingCache, text_hash
+
+
+class CountingEmbeddings:
+    """
+    LangChain-style embeddings recording which texts reached the model.
+    """
+
+    def __init__(self):
+        self.encoder = HashEncoder()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return self.encoder.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.encoder.encode([text])[0].tolist()
+
+
+def test_hits_skip_the_model_and_misses_embed_each_text_once():
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache("test/hash"))
+    first = cached.embed_documents(["alpha beta", "gamma", "alpha beta"])
+    assert model.embedded == ["alpha beta", "gamma"]
+
+    second = cached.embed_documents(["gamma", "delta", "alpha beta"])
+    assert model.embedded == ["alpha beta", "gamma", "delta"]
+    np.testing.assert_allclose(second[0], first[1], atol=1e-3)
+    np.testing.assert_allclose(second[2], first[0], atol=1e-3)
+    assert cached.cache.hits >= 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = EmbeddingCache("test/hash", max_entries=3)
+    vectors = HashEncoder().encode(["a", "b", "c", "d"])
+    hashes = [text_hash(t) for t in "abcd"]
+    cache.put_many(hashes[:3], vectors[:3])
+    cache.get_many([hashes[0]])  # "a" becomes the most recently used.
+    cache.put_many(hashes[3:], vectors[3:])
+
+    assert len(cache) == 3
+    assert set(cache.get_many(hashes)) == {hashes[0], hashes[2], hashes[3]}
+    np.testing.assert_allclose(cache.get_many([hashes[3]])[hashes[3]], vectors[3], atol=1e-3)
+
+
+def test_flushed_entries_are_reloaded_and_unchanged_cache_is_not_rewritten():
+    cache = EmbeddingCache("test/hash")
+    vectors = HashEncoder().encode(["one", "two"])
+    cache.put_many([text_hash("one"), text_hash("two")], vectors)
+    cache.flush()
+    assert not cache.dirty
+
+    # A flush without changes leaves the index file alone.
+    mtime = os.stat(cache.index_path).st_mtime_ns
+    os.utime(cache.index_path, ns=(mtime - 10 ** 9, mtime - 10 ** 9))
+    cache.flush()
+    assert os.stat(cache.index_path).st_mtime_ns == mtime - 10 ** 9
+    assert not [name for name in os.listdir(os.path.dirname(cache.index_path)) if name.endswith(".tmp")]
+
+    reloaded = EmbeddingCache("test/hash")
+    found = reloaded.get_many([text_hash("one"), text_hash("two")])
+    np.testing.assert_allclose(found[text_hash("two")], vectors[1], atol=1e-3)
+
+
+def test_cache_of_another_model_or_dtype_is_not_reused():
+    cache = EmbeddingCache("test/hash")
+    cache.put_many([text_hash("one")], HashEncoder().encode(["one"]))
+    cache.flush()
+
+    # Another model gets its own files; a model name with the same file name
+    # or another dtype finds an index written for something else and ignores it.
+    assert not EmbeddingCache("test/other").get_many([text_hash("one")])
+    assert not EmbeddingCache("test_hash").get_many([text_hash("one")])
+    assert not EmbeddingCache("test/hash", dtype="float32").get_many([text_hash("one")])
+    assert EmbeddingCache("test/hash").get_many([text_hash("one")])
+
+
+def test_ingest_flushes_after_evictions():
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache("test/hash", max_entries=2))
+    cached.embed_documents(["a", "b"])
+    assert cached.cache.dirty  # Within FLUSH_INTERVAL: not written yet.
+
+    cached.embed_documents(["c"])  # Reuses the row of "a".
+    assert not cached.cache.dirty
+    reloaded = EmbeddingCache("test/hash", max_entries=2)
+    assert set(reloaded.get_many([text_hash(t) for t in "abc"])) == {text_hash("b"), text_hash("c")}
+
+
+def test_index_builds_reuse_cached_chunk_vectors(workdir):
+    for name in ("a", "b"):
+        write_files(os.path.join(workdir, name), topic_files(4))
+    first = HashEngine()
+    EmbeddingIndexer(engine=first).load_or_build(os.path.join(workdir, "a"))
+    assert first._model.calls > 0
+
+    # Same chunks in another folder (and in a new process: the cache is read from disk).
+    embedding_cache._open_caches.clear()
+    second = HashEngine()
+    indexer = EmbeddingIndexer(engine=second)
+    indexer.load_or_build(os.path.join(workdir, "b"))
+    assert second._model.calls == 0
+    assert indexer.search("topic2 subject2", 1)[0].metadata["file_name"] == "doc002.txt"
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import embedding_engine
+from conftest import HashEncoder, HashEngine
+from embedding_engine import EmbeddingEngine
+
+
+def test_batches_are_length_sorted_but_vectors_keep_input_order():
+    engine = HashEngine(batch_size=2)
+    texts = ["short", "a much longer chunk of text here", "medium sized text", "x"]
+    vectors = engine.embed_documents(texts)
+    np.testing.assert_allclose(vectors, HashEncoder().encode(texts), rtol=1e-6)
+    assert [chunks for chunks, _ in engine.batch_timings] == [2, 2]
+    assert engine.total_chunks == 4 and engine.chunks_per_second > 0
+
+
+def test_prefixes_are_added_to_passages_and_queries():
+    engine = HashEngine(use_prefixes=True)
+    np.testing.assert_allclose(engine.embed_documents(["cats"])[0], HashEncoder().encode(["passage: cats"])[0], rtol=1e-6)
+    np.testing.assert_allclose(engine.embed_query("cats"), HashEncoder().encode(["query: cats"])[0], rtol=1e-6)
+    assert engine.cache_key == "test/hash+prefixes"
+
+
+def test_batch_timings_are_bounded(monkeypatch):
+    monkeypatch.setattr(embedding_engine, "MAX_BATCH_TIMINGS", 5)
+    engine = HashEngine(batch_size=1)
+    for i in range(4):
+        engine.embed_documents([f"text {i}", f"more {i}", f"again {i}"])
+    assert len(engine.batch_timings) == 5
+    assert engine.total_chunks == 12
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        EmbeddingEngine(backend="tensorrt")
@@ -0,0 +1,62 @@
+import os
+
+from langchain_core.documents import Document
+
+from conftest import HashEngine, write_files
+from embedder import EmbeddingIndexer
+from language import LanguageAwareSplitter, detect_language
+
+ARABIC = "تقع المكتبة في وسط المدينة. تفتح المكتبة أبوابها كل يوم من الساعة التاسعة صباحا."
+ENGLISH = "The library is in the city centre. It opens every day at nine in the morning."
+
+
+def test_detect_language_by_script_and_stopwords():
+    assert detect_language(ARABIC) == "ar"
+    assert detect_language(ENGLISH) == "en"
+    assert detect_language("东京是日本的首都。") == "zh"
+    assert detect_language("東京はとても大きいです。") == "ja"
+    assert detect_language("Привет, как дела?") == "ru"
+    assert detect_language("12345 ---") == "en"
+
+
+def test_sentence_chunks_respect_the_language_target_and_overlap():
+    splitter = LanguageAwareSplitter(targets={"default": (12, 6)})
+    text = " ".join(f"Sentence {i} has exactly six words." for i in range(1, 7))
+    chunks = splitter.split_text(text, "en")
+    for start, chunk in chunks:
+        assert text[start:start + len(chunk)] == chunk
+        assert len(chunk.split()) <= 12 and chunk.endswith(".")
+    # Each chunk starts with the last sentence of the previous one.
+    assert [chunk.split()[1] for _, chunk in chunks] == ["1", "2", "3", "4", "5"]
+
+    # Chinese is counted in characters and cut at full-width sentence ends.
+    chinese = "今天天气很好。" * 60
+    chunks = LanguageAwareSplitter().split_text(chinese, "zh")
+    assert len(chunks) > 1 and all(chunk.endswith("。") and len(chunk) <= 300 for _, chunk in chunks)
+
+
+def test_split_documents_records_language_and_position():
+    docs = LanguageAwareSplitter().split_documents([Document(page_content=ARABIC, metadata={"page": 0})])
+    assert docs[0].metadata == {"page": 0, "language": "ar", "start_index": 0}
+
+
+def test_languages_are_routed_to_their_own_model(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, {"library_ar.txt": ARABIC, "library_en.txt": ENGLISH})
+    arabic_engine = HashEngine("test/ar")
+    indexer = EmbeddingIndexer(engine=HashEngine(), engines={"test/ar": arabic_engine},
+                               language_models={"ar": "test/ar"}, chunking="language")
+    indexer.load_or_build(folder)
+
+    route = indexer.routes["test/ar"]
+    assert route.engine is arabic_engine
+    assert {doc.metadata["file_name"] for doc in route.search("المكتبة", 3)} == {"library_ar.txt"}
+    assert indexer.own_chunk_count == 1 and indexer.chunk_count == 2
+    assert indexer.search("المكتبة المدينة", 1)[0].metadata["file_name"] == "library_ar.txt"
+    assert indexer.search("library city centre", 1)[0].metadata["file_name"] == "library_en.txt"
+
+    # The routes are saved with the index.
+    reloaded = EmbeddingIndexer(engine=HashEngine(), engines={"test/ar": arabic_engine},
+                                language_models={"ar": "test/ar"}, chunking="language")
+    assert reloaded.load_or_build(folder)["unchanged"] == 2
+    assert reloaded.routes["test/ar"].chunk_count == 1
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer, fuse_scores
+from lexical import BM25Index, tokenize
+
+TEXTS = [
+    "Contact Aurélien at aurelien.martin@example.com for invoices.",
+    "Invoices are paid within thirty days of receipt.",
+    "The cafeteria opens at noon and closes at three.",
+]
+
+
+def test_tokenize_strips_accents_and_keeps_emails_and_cjk_pairs():
+    tokens = tokenize(TEXTS[0])
+    assert "aurelien" in tokens and "aurelien.martin@example.com" in tokens
+    assert tokenize("東京都") == ["東京", "京都"]
+
+
+def test_bm25_ranks_rare_terms_first_and_survives_save(workdir):
+    index = BM25Index.build(["a", "b", "c"], TEXTS, version="v1")
+    assert [doc_id for doc_id, _ in index.search("invoices aurelien", 3)] == ["a", "b"]
+    assert index.search("warranty", 3) == []
+
+    index.save("bm25.npz")
+    loaded = BM25Index.load("bm25.npz")
+    assert loaded.version == "v1" and loaded.doc_ids == ["a", "b", "c"]
+    np.testing.assert_allclose(loaded.scores("cafeteria noon"), index.scores("cafeteria noon"))
+
+
+def test_fuse_scores_mixes_normalized_scores():
+    dense = [("a", 0.9), ("b", 0.8), ("c", 0.1)]
+    lexical = [("c", 12.0), ("d", 3.0)]
+    assert fuse_scores(dense, lexical, alpha=1.0)[:3] == ["a", "b", "c"]
+    assert fuse_scores(dense, lexical, alpha=0.0)[0] == "c"
+    # "c" is last for dense but first for BM25: BM25 decides below alpha=0.5.
+    assert fuse_scores(dense, lexical, alpha=0.4)[0] == "c"
+    assert fuse_scores(dense, lexical, alpha=0.6)[0] == "a"
+    # Without dense hits, the lexical order is kept.
+    assert fuse_scores([], lexical, alpha=0.9) == ["c", "d"]
+
+
+def test_lexical_and_hybrid_search_find_exact_identifiers(engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, dict(topic_files(10), **{"contact.txt": TEXTS[0]}))
+    for mode in ("lexical", "hybrid"):
+        indexer = EmbeddingIndexer(engine=engine, search_mode=mode)
+        indexer.load_or_build(folder)
+        assert indexer.search("aurelien.martin@example.com", 1)[0].metadata["file_name"] == "contact.txt"
+        assert indexer.search("item95", 1)[0].metadata["file_name"] == "doc003.txt"
+
+    # The BM25 index follows updates of the vector index.
+    write_files(folder, {"contact.txt": "Write to support@example.org instead."})
+    indexer.load_or_build(folder)
+    assert indexer.lexical_index().version == indexer.index_version
+    assert indexer.search("support@example.org", 1)[0].metadata["file_name"] == "contact.txt"
+    assert not any("aurelien" in doc.page_content.lower() for doc in indexer.search("aurelien.martin@example.com", 3))
+
+
+def test_corrupt_saved_bm25_index_is_rebuilt(engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, dict(topic_files(10), **{"contact.txt": TEXTS[0]}))
+    EmbeddingIndexer(engine=engine, search_mode="hybrid").load_or_build(folder, "index")
+    with open(os.path.join("index", "lexical.npz"), "r+b") as f:
+        f.truncate(100)
+
+    indexer = EmbeddingIndexer(engine=engine, search_mode="hybrid")
+    indexer.load_or_build(folder, "index")
+    assert indexer.search("aurelien.martin@example.com", 1)[0].metadata["file_name"] == "contact.txt"
+    assert BM25Index.load(os.path.join("index", "lexical.npz")).version == indexer.index_version
+
+
+def test_interrupted_save_keeps_the_previous_file(monkeypatch, workdir):
+    BM25Index.build(["a", "b", "c"], TEXTS, version="v1").save("bm25.npz")
+
+    def crash(path, **arrays):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez", crash)
+    with pytest.raises(OSError):
+        BM25Index.build(["a"], TEXTS[:1], version="v2").save("bm25.npz")
+    assert BM25Index.load("bm25.npz").version == "v1"
@@ -0,0 +1,45 @@
+import os
+import types
+
+from conftest import topic_files, write_files
+from loader import clean_text, iter_file_chunks, list_files, load_documents, stream_documents
+
+
+def _chunk_keys(chunks):
+    return sorted((doc.metadata["file_name"], doc.metadata["start_index"], doc.page_content) for doc in chunks)
+
+
+def test_parallel_loading_matches_sequential_loading(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, dict(topic_files(6, sentences=12), **{"sub/extra.txt": "Nested file about harbors."}))
+    sequential = load_documents(folder, workers=1)
+    parallel = load_documents(folder, workers=2)
+    assert _chunk_keys(parallel) == _chunk_keys(sequential)
+    assert {doc.metadata["file_name"] for doc in sequential} == {f"doc{i:03d}.txt" for i in range(6)} | {"extra.txt"}
+    assert all(doc.metadata["page"] == "N/A" for doc in sequential)
+
+
+def test_streaming_yields_chunks_file_by_file(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(3))
+    stream = stream_documents(folder)
+    assert isinstance(stream, types.GeneratorType)
+    assert next(stream).metadata["file_name"] == "doc000.txt"
+
+
+def test_unsupported_and_broken_files_are_skipped(workdir, capsys):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, {"notes.txt": "Readable notes.", "image.png": "not text", "report.docx": "not a zip file"})
+    assert [os.path.basename(path) for path in list_files(folder)] == ["notes.txt", "report.docx"]
+
+    for workers in (1, 2):
+        loaded = [os.path.basename(path) for path, _ in iter_file_chunks(list_files(folder), workers)]
+        assert loaded == ["notes.txt"]
+        assert "Error loading report.docx" in capsys.readouterr().out
+
+
+def test_clean_text_normalizes_whitespace_bullets_and_hidden_characters():
+    assert clean_text("  Hello\u200b \n\n world  ") == "Hello world"
+    assert clean_text("\u2022 item \u2013 other") == "- item - other"
+    # Decomposed accents are composed (NFC).
+    assert clean_text("cafe\u0301") == "caf\u00e9"
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import metrics
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer
+
+
+@pytest.fixture
+def enabled_metrics(workdir):
+    metrics.reset()
+    metrics.enable(profile_dir=os.path.join(workdir, "profiles"))
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def _names(kind):
+    return {item["name"] for item in metrics.snapshot()[kind]}
+
+
+def test_disabled_metrics_record_nothing():
+    assert not metrics.is_enabled()
+    with metrics.timer("unused_seconds"):
+        metrics.count("unused_total")
+    assert metrics.snapshot() == {"timers": [], "counters": []}
+
+
+def test_timers_counters_and_prometheus_text(enabled_metrics):
+    metrics.observe("step_seconds", 0.003, stage="a")
+    metrics.observe("step_seconds", 0.2, stage="a")
+    metrics.count("items_total", 5, kind="x")
+
+    @metrics.timed("work_seconds", profiled=True)
+    def work():
+        return sum(range(1000))
+
+    assert work() == 499500
+    timers = {item["name"]: item for item in metrics.snapshot()["timers"]}
+    assert timers["step_seconds"]["count"] == 2 and timers["step_seconds"]["max_s"] == 0.2
+    assert timers["work_seconds"]["count"] == 1
+
+    text = metrics.prometheus_text()
+    assert '# TYPE qa_step_seconds histogram' in text
+    assert 'qa_step_seconds_bucket{stage="a",le="0.005"} 1' in text
+    assert 'qa_step_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'qa_items_total{kind="x"} 5' in text
+    assert [os.path.basename(path) for path in metrics.dump_profiles()] == ["work_seconds.prof"]
+
+
+def test_pipeline_stages_are_instrumented(enabled_metrics, engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(4))
+    indexer = EmbeddingIndexer(engine=engine, search_mode="hybrid")
+    indexer.load_or_build(folder)
+    indexer.search("topic1", 2)
+
+    assert {"loader_parse_seconds", "loader_split_seconds", "embed_documents_seconds",
+            "faiss_search_seconds", "bm25_search_seconds", "search_seconds"} <= _names("timers")
+    assert {"loader_files_total", "embedded_chunks_total", "faiss_queries_total"} <= _names("counters")
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from ollama_client import OllamaBackend
+from ollama_stub import StubHandler, stub_answer, stub_tokens
+
+PROMPT = "Context:\nThe office opens at nine. It closes at five.\n\nQuestion: When does it open?"
+
+
+class SlowHandler(StubHandler):
+    delay = 1.0
+    token_delay = 0.0
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_backend(stub_url):
+    backends = []
+
+    def make(**options):
+        backends.append(OllamaBackend(base_url=stub_url, **options))
+        return backends[-1]
+
+    yield make
+    for backend in backends:
+        backend.close()
+
+
+def test_generate_and_stream_answers(make_backend):
+    backend = make_backend()
+    assert backend.generate(PROMPT) == stub_answer(PROMPT) == "The office opens at nine."
+    assert list(backend.stream(PROMPT)) == stub_tokens(PROMPT)
+    assert asyncio.run(backend.agenerate(PROMPT)) == "The office opens at nine."
+
+
+def test_requests_run_concurrently_up_to_max_in_flight(make_backend):
+    backend = make_backend(max_in_flight=4)
+    start = time.perf_counter()
+    futures = [backend.submit(PROMPT) for _ in range(4)]
+    assert [future.result() for future in futures] == ["The office opens at nine."] * 4
+    assert time.perf_counter() - start < 2.5  # 4 x 1s answers in parallel.
+
+
+def test_waiting_for_a_free_slot_counts_against_the_timeout(make_backend):
+    backend = make_backend(max_in_flight=1)
+    busy = backend.submit(PROMPT)
+    time.sleep(0.1)
+
+    # Both give up after 0.2s instead of waiting for the busy slot (~0.9s).
+    for call in (backend.generate, lambda prompt, timeout: list(backend.stream(prompt, timeout))):
+        start = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            call(PROMPT, timeout=0.2)
+        assert time.perf_counter() - start < 0.6
+    assert busy.result() == "The office opens at nine."
+
+
+def test_per_request_timeout_can_exceed_the_default(make_backend):
+    # The answer takes 1s: too slow for the default, fine with a longer timeout.
+    backend = make_backend(timeout=0.2)
+    with pytest.raises(Exception):
+        backend.generate(PROMPT)
+    assert backend.generate(PROMPT, timeout=3) == "The office opens at nine."
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import HashEncoder, HashEngine, topic_files
+from embedding_engine import EmbeddingEngine
+from onnx_backend import compare_backends, load_onnx_model
+
+TEXTS = list(topic_files(20).values())
+QUERIES = [f"topic{i} subject{i}" for i in range(0, 20, 3)]
+
+
+class NoisyEncoder(HashEncoder):
+    """
+    HashEncoder with random noise added, to stand in for a lossy backend.
+    """
+
+    def __init__(self, noise):
+        super().__init__()
+        self.noise = noise
+        self.rng = np.random.default_rng(0)
+
+    def encode(self, texts, **kwargs):
+        vectors = super().encode(texts, **kwargs) + self.rng.normal(scale=self.noise, size=(len(texts), self.dim))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _noisy_engine(noise):
+    engine = HashEngine()
+    engine._model = NoisyEncoder(noise)
+    return engine
+
+
+def test_compare_backends_passes_close_vectors_and_fails_distorted_ones():
+    # k=1: beyond the matching document, the other topics tie and their order is noise.
+    close = compare_backends(HashEngine(), _noisy_engine(0.001), TEXTS, QUERIES, k=1)
+    assert close["passed"] and close["chunk_cosine_mean"] > 0.99 and close["recall_at_k"] == 1.0
+    distorted = compare_backends(HashEngine(), _noisy_engine(0.5), TEXTS, QUERIES, k=1)
+    assert not distorted["passed"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """
+    A small randomly initialized BERT saved as a sentence-transformers model
+    (mean pooling, normalized), with a WordPiece vocabulary trained on TEXTS.
+    """
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    pytest.importorskip("sentence_transformers")
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from tokenizers import Tokenizer, normalizers, pre_tokenizers, processors, trainers
+    from tokenizers.models import WordPiece
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    path = tmp_path_factory.mktemp("tiny")
+    tokenizer = Tokenizer(WordPiece(unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    special = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    tokenizer.train_from_iterator(TEXTS + QUERIES, trainers.WordPieceTrainer(vocab_size=500, special_tokens=special))
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[(t, tokenizer.token_to_id(t)) for t in ("[CLS]", "[SEP]")],
+    )
+    BertTokenizerFast(tokenizer_object=tokenizer, unk_token="[UNK]", pad_token="[PAD]", cls_token="[CLS]",
+                      sep_token="[SEP]", mask_token="[MASK]").save_pretrained(path / "bert")
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=tokenizer.get_vocab_size(), hidden_size=64, num_hidden_layers=2,
+                        num_attention_heads=4, intermediate_size=128)
+    BertModel(config).save_pretrained(path / "bert")
+
+    transformer = models.Transformer(str(path / "bert"), max_seq_length=128)
+    SentenceTransformer(modules=[
+        transformer, models.Pooling(transformer.get_word_embedding_dimension(), "mean"), models.Normalize(),
+    ]).save(str(path / "st"))
+    return str(path / "st")
+
+
+def test_onnx_export_matches_pytorch(tiny_model, workdir):
+    torch_engine = EmbeddingEngine(tiny_model)
+    float_engine = EmbeddingEngine(tiny_model, backend="onnx", quantize=False)
+    int8_engine = EmbeddingEngine(tiny_model, backend="onnx")
+    assert int8_engine.cache_key == tiny_model + "+onnx-int8" and float_engine.cache_key == tiny_model + "+onnx"
+
+    exact = compare_backends(torch_engine, float_engine, TEXTS, QUERIES)
+    assert exact["chunk_cosine_min"] > 0.9999
+    quantized = compare_backends(torch_engine, int8_engine, TEXTS, QUERIES)
+    assert quantized["chunk_cosine_mean"] > 0.98
+
+    # The exported model runs without torch or transformers.
+    script = (
+        "import sys\n"
+        "from onnx_backend import load_onnx_model\n"
+        f"print(load_onnx_model({tiny_model!r}).encode(['hello world']).shape,\n"
+        "      [m for m in ('torch', 'transformers', 'sentence_transformers') if m in sys.modules])\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            cwd=str(workdir), env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))).stdout
+    assert output.strip().splitlines()[-1] == "(1, 64) []"
+    assert load_onnx_model(tiny_model).get_sentence_embedding_dimension() == 64
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pytest
+
+import embedder
+import loader
+import pdf_extract
+from embedder import EmbeddingIndexer
+from pdf_extract import PageCache, extract_pdf
+
+# A PDF shipped with the sample data.
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "..", "data", "charbel", "CV", "Charbel Lebbous CV.pdf")
+
+pytestmark = pytest.mark.skipif(pdf_extract.pdfium is None, reason="pypdfium2 is not installed")
+
+
+@pytest.fixture
+def pdf_folder(workdir):
+    folder = os.path.join(workdir, "docs")
+    os.makedirs(folder)
+    shutil.copy(SAMPLE_PDF, os.path.join(folder, "cv.pdf"))
+    return folder
+
+
+def test_cached_pages_are_reused_without_opening_the_pdf(pdf_folder, monkeypatch):
+    path = os.path.join(pdf_folder, "cv.pdf")
+    cache = PageCache()
+    file_hash = loader.hash_file(path)
+    pages = extract_pdf(path, cache=cache, file_hash=file_hash)
+    assert [page for page, _ in pages] == list(range(len(pages)))
+    assert "CHARBEL LEBBOUS" in " ".join(text for _, text in pages)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the PDF was opened again")
+
+    monkeypatch.setattr(pdf_extract.pdfium, "PdfDocument", fail)
+    assert extract_pdf(path, cache=cache, file_hash=file_hash) == pages
+    # Without the file hash the cache cannot be checked, so it is not used.
+    with pytest.raises(AssertionError):
+        extract_pdf(path, cache=cache)
+
+
+def test_ingest_hashes_each_pdf_once(pdf_folder, engine, monkeypatch):
+    calls = []
+
+    def counting_hash(path):
+        calls.append(os.path.basename(path))
+        return loader_hash(path)
+
+    loader_hash = loader.hash_file
+    monkeypatch.setattr(loader, "hash_file", counting_hash)
+    monkeypatch.setattr(embedder, "hash_file", counting_hash)
+
+    indexer = EmbeddingIndexer(engine=engine)
+    indexer.load_or_build(pdf_folder)
+    assert calls == ["cv.pdf"]
+    assert {doc.metadata["file_name"] for doc in indexer.search("Charbel Lebbous AI Software Developper", 3)} == {"cv.pdf"}
+    assert os.listdir(PageCache().cache_dir)
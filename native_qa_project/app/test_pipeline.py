@@ -2,10 +2,8 @@
 import os
 
 # ✅ Custom modules for:
-# - Loading documents
-# - Building vector index
+# - Loading documents & building vector index
 # - Running LLM QA chain
-from loader import load_documents
 from embedder import EmbeddingIndexer
 from qa import answer_question
 
@@ -91,16 +89,13 @@ test_cases = [
 ]
 
 def test_pipeline(folder_path):
-    # ✅ Load & split all documents
-    docs = load_documents(folder_path)
-    if not docs:
+    # ✅ Load the saved embedding index (re-indexing only changed files)
+    indexer = EmbeddingIndexer(search_mode="hybrid")
+    indexer.load_or_build(folder_path)
+    if indexer.chunk_count == 0:
         print("❌ No documents loaded.")
         return
 
-    # ✅ Create an embedding index for semantic search
-    indexer = EmbeddingIndexer()
-    indexer.build_index(docs)
-
     # ✅ Initialize tracking metrics
     passed_cases = 0
     total_keywords = 0
@@ -0,0 +1,39 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+import qa
+from ollama_stub import stub_tokens
+
+DOCS = [
+    Document(page_content="The warranty lasts two years. Batteries are excluded.", metadata={"file_name": "terms.txt"}),
+    Document(page_content="Returns are accepted within 30 days.", metadata={"file_name": "returns.txt"}),
+]
+
+
+def test_stream_yields_tokens_and_records_latency(fake_llm):
+    fake_llm.delay, fake_llm.token_delay = 0.05, 0.01
+    stream = qa.answer_question_stream("How long is the warranty?", DOCS)
+    assert [doc.metadata["file_name"] for doc in stream.context] == ["terms.txt", "returns.txt"]
+
+    tokens = list(stream)
+    assert tokens == stub_tokens(stream.prompt) and len(tokens) > 1
+    assert stream.text == "The warranty lasts two years."
+    assert 0.05 <= stream.first_token_s < stream.total_s
+    assert qa.latency_log[-1]["question"] == "How long is the warranty?"
+    assert qa.latency_log[-1]["tokens"] == len(tokens)
+
+
+def test_async_stream_gives_the_same_answer_as_generate(fake_llm):
+    async def collect():
+        stream = qa.answer_question_stream("How long is the warranty?", DOCS)
+        return [token async for token in stream], stream
+
+    tokens, stream = asyncio.run(collect())
+    assert "".join(tokens) == stream.text == qa.answer_question("How long is the warranty?", DOCS)
+    assert stream.total_s is not None
+
+
+def test_prompt_contains_the_joined_context():
+    prompt = qa.build_prompt("When can I return it?", "Returns are accepted within 30 days.")
+    assert "Context:\nReturns are accepted within 30 days.\n\nQuestion: When can I return it?" in prompt
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import pytest
+
+import registry
+from conftest import HashEngine, topic_files, write_files
+from embedder import EmbeddingIndexer
+from registry import IndexRegistry
+
+
+@pytest.fixture
+def index_registry(monkeypatch):
+    monkeypatch.setattr(registry, "EmbeddingEngine", HashEngine)
+    return IndexRegistry(model_name="test/hash", max_indexes=2)
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """
+    Folders passed to EmbeddingIndexer.load_or_build, in call order.
+    """
+    calls = []
+    load_or_build = EmbeddingIndexer.load_or_build
+
+    def counting(self, folder_path, *args, **kwargs):
+        calls.append(os.path.basename(folder_path))
+        return load_or_build(self, folder_path, *args, **kwargs)
+
+    monkeypatch.setattr(EmbeddingIndexer, "load_or_build", counting)
+    return calls
+
+
+def _folder(workdir, name, n_files=3):
+    folder = os.path.join(workdir, name)
+    write_files(folder, topic_files(n_files))
+    return folder
+
+
+def test_concurrent_gets_build_the_index_once(index_registry, builds, workdir):
+    folder = _folder(workdir, "a")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index_registry.get(folder))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds == ["a"]
+    assert len({id(indexer) for indexer, _ in results}) == 1
+    assert sum(stats is not None for _, stats in results) == 1
+
+
+def test_refresh_swaps_in_an_updated_index(index_registry, workdir):
+    folder = _folder(workdir, "a")
+    old, _ = index_registry.get(folder)
+    write_files(folder, {"new.txt": "A new file about volcanoes."})
+    new, stats = index_registry.get(folder, refresh=True)
+    assert stats["added"] == ["new.txt"]
+    assert new is not old and index_registry.get(folder)[0] is new
+    assert old.chunk_count < new.chunk_count
+
+
+def test_evicted_indexes_drop_their_build_lock(index_registry, builds, workdir):
+    for name in ("a", "b", "c"):
+        index_registry.get(_folder(workdir, name))
+    assert [os.path.basename(folder) for folder in index_registry.loaded()] == ["b", "c"]
+    assert set(index_registry._build_locks) == set(index_registry._entries)
+
+    # "a" reloads (from disk) after its eviction.
+    index_registry.get(os.path.join(workdir, "a"))
+    assert builds == ["a", "b", "c", "a"]
+    assert set(index_registry._build_locks) == set(index_registry._entries)
+
+
+def test_failed_build_drops_its_build_lock(index_registry, monkeypatch, workdir):
+    def fail(self, folder_path, *args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(EmbeddingIndexer, "load_or_build", fail)
+    with pytest.raises(OSError):
+        index_registry.get(_folder(workdir, "a"))
+    assert not index_registry._build_locks
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from conftest import topic_files, write_files
+from embedder import EmbeddingIndexer
+from server import HTTPError, QAService
+
+
+@pytest.fixture
+def indexer(engine, workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(8))
+    indexer = EmbeddingIndexer(engine=engine)
+    indexer.load_or_build(folder)
+    return indexer
+
+
+async def _request(port, method, path, body=None):
+    """
+    Sends one HTTP/1.0 request and returns (status, JSON payload).
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.0\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def _serve(service, client):
+    """
+    Runs `client(port)` against the service on a free local port.
+    """
+    async def run():
+        service.batcher.start()
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        try:
+            return await client(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await service.batcher.stop()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("body", [
+    {"question": "  "},
+    {"question": "topic3", "k": 0},
+    {"question": "topic3", "k": "3"},
+    {"question": "topic3", "k": True},
+    {"question": "topic3", "k": 2.0},
+    ["topic3"],
+])
+def test_invalid_questions_are_rejected(body):
+    with pytest.raises(HTTPError) as error:
+        QAService._question(json.dumps(body).encode("utf-8"))
+    assert error.value.status == 400
+
+
+def test_concurrent_searches_share_one_batch(indexer):
+    service = QAService(lambda: indexer, "docs", batcher_options={"window": 0.05})
+
+    async def client(port):
+        return await asyncio.gather(*(
+            _request(port, "POST", "/search", {"question": f"topic{i} subject{i}", "k": 2}) for i in range(6)
+        ))
+
+    responses = _serve(service, client)
+    for i, (status, payload) in enumerate(responses):
+        assert status == 200
+        assert len(payload["results"]) == 2
+        assert payload["results"][0]["file_name"] == f"doc{i:03d}.txt"
+    assert service.batcher.queries == 6 and service.batcher.batches < 6
+
+
+def test_answer_health_and_errors(indexer, fake_llm):
+    service = QAService(lambda: indexer, "docs")
+
+    async def client(port):
+        return [
+            await _request(port, "POST", "/answer", {"question": "What about subject5?"}),
+            await _request(port, "GET", "/health"),
+            await _request(port, "GET", "/answer"),
+            await _request(port, "POST", "/search", {"question": "topic1", "k": False}),
+        ]
+
+    (status, answer), (_, health), (method_status, _), (bool_status, error) = _serve(service, client)
+    assert status == 200 and answer["answer"] and answer["sources"]
+    assert health["chunks"] == indexer.chunk_count
+    assert method_status == 405
+    assert bool_status == 400 and '"k"' in error["error"]
+
+
+def test_full_search_queue_answers_503(indexer):
+    service = QAService(lambda: indexer, "docs", batcher_options={"max_pending": 0})
+
+    async def client(port):
+        return await _request(port, "POST", "/search", {"question": "topic1"})
+
+    status, payload = _serve(service, client)
+    assert status == 503 and "retry" in payload["error"]
+
+
+def test_health_loads_the_index_off_the_event_loop(indexer):
+    def slow_indexer():
+        # Like IndexRegistry.get reloading an index it dropped as idle.
+        time.sleep(0.5)
+        return indexer
+
+    service = QAService(slow_indexer, "docs")
+
+    async def client(port):
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - last)
+                last = time.perf_counter()
+
+        task = asyncio.create_task(ticker())
+        status, health = await _request(port, "GET", "/health")
+        task.cancel()
+        return status, health, max(gaps)
+
+    status, health, max_gap = _serve(service, client)
+    assert status == 200 and health["chunks"] == indexer.chunk_count
+    assert max_gap < 0.3
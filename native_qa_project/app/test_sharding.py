@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import HashEncoder, HashEngine, topic_files, write_files
+from embedder import EmbeddingIndexer
+from embedding_cache import EmbeddingCache, text_hash
+from loader import load_file
+from sharding import ShardedIndexer, _ShardWorker, shard_of
+
+
+@pytest.fixture
+def folder(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(30))
+    return folder
+
+
+@pytest.fixture
+def sharded():
+    indexer = ShardedIndexer(3, model_name="test/hash", engine_class=HashEngine, search_mode="hybrid")
+    yield indexer
+    indexer.close()
+
+
+def test_multi_shard_ingest_keeps_each_cache_consistent(folder, sharded):
+    stats = sharded.load_or_build(folder)
+    assert len(stats["added"]) == 30
+    assert all(info["chunks"] for info in sharded.shard_info.values())
+
+    # Each shard wrote its own cache, and every cached vector is the one of its text.
+    encoder = HashEncoder()
+    for shard in range(3):
+        cache_dir = os.path.join(".embedding_cache", f"shard{shard}")
+        assert os.path.exists(cache_dir)
+        cache = EmbeddingCache("test/hash", cache_dir)
+        texts = [
+            chunk.page_content
+            for name in sorted(os.listdir(folder)) if shard_of(name, 3) == shard
+            for chunk in load_file(os.path.join(folder, name))
+        ]
+        assert len(cache) == len(set(texts))
+        cached = cache.get_many([text_hash(text) for text in texts])
+        expected = encoder.encode(texts)
+        for text, vector in zip(texts, expected):
+            np.testing.assert_allclose(cached[text_hash(text)], vector, atol=1e-2)
+    assert not os.path.exists(os.path.join(".embedding_cache", "test_hash.json"))
+
+
+def test_sharded_search_matches_single_index(folder, sharded, engine):
+    sharded.load_or_build(folder)
+    single = EmbeddingIndexer(engine=engine, cache_dir=None)
+    single.load_or_build(folder)
+    sharded.search_mode = single.search_mode = "dense"
+
+    queries = [f"topic{i} subject{i}" for i in range(0, 30, 3)]
+    expected = [[doc.page_content for doc in docs] for docs in single.search_batch(queries, k=3)]
+    found = [[doc.page_content for doc in docs] for docs in sharded.search_batch(queries, k=3)]
+    assert found == expected
+    for i, docs in zip(range(0, 30, 3), sharded.search_batch(queries, k=1)):
+        assert docs[0].metadata["file_name"] == f"doc{i:03d}.txt"
+
+
+def test_rebuild_shard_only_updates_that_shard(folder, sharded):
+    sharded.load_or_build(folder)
+    before = {shard: dict(info) for shard, info in sharded.shard_info.items()}
+    version = sharded.index_version
+
+    write_files(folder, {"new.txt": "A new note about lighthouses and lighthouse keepers."})
+    shard = shard_of("new.txt", 3)
+    stats = sharded.rebuild_shard(shard)
+    assert stats["added"] == ["new.txt"]
+    assert sharded.index_version != version
+    for other in set(before) - {shard}:
+        assert sharded.shard_info[other]["index_version"] == before[other]["index_version"]
+    assert sharded.search("lighthouse keepers", k=1)[0].metadata["file_name"] == "new.txt"
+
+
+def test_shard_worker_never_opens_the_shared_cache(workdir):
+    worker = _ShardWorker(None, 1, 3, HashEngine, {}, {})
+    cache = worker.indexer.embeddings.cache
+    assert os.path.dirname(cache.index_path) == os.path.join(".embedding_cache", "shard1")
+    assert os.listdir(".embedding_cache") == ["shard1"]
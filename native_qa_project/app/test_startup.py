@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+from benchmark import HEAVY_MODULES, IMPORT_MODULES, measure_import_times
+from embedding_engine import EmbeddingEngine
+
+
+def test_entry_points_do_not_import_heavy_modules():
+    report = measure_import_times(IMPORT_MODULES + ["server"], budget=float("inf"), repeat=1)
+    assert report["passed"], report["modules"]
+    assert all(not result["heavy"] for result in report["modules"].values())
+
+
+def test_creating_engines_and_indexers_does_not_load_the_model(workdir):
+    engine = EmbeddingEngine()
+    assert not engine.loaded and engine.cache_key == "intfloat/e5-base-v2"
+
+    # In a fresh process: building the objects imports nothing heavy.
+    script = (
+        "import sys\n"
+        "from embedder import EmbeddingIndexer\n"
+        "from registry import IndexRegistry\n"
+        "IndexRegistry().engine; EmbeddingIndexer(search_mode='hybrid')\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            cwd=str(workdir), env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))).stdout
+    assert output.strip().splitlines()[-1] == "[]"
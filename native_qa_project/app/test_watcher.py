@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+import registry
+from conftest import HashEngine, topic_files, write_files
+from registry import IndexRegistry
+from watcher import FolderWatcher
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def folder(workdir):
+    folder = os.path.join(workdir, "docs")
+    write_files(folder, topic_files(2))
+    return folder
+
+
+def test_a_burst_of_changes_triggers_one_update(folder):
+    calls = []
+    watcher = FolderWatcher(folder, lambda: calls.append(time.monotonic()), interval=0.05, debounce=0.3,
+                            use_events=False).start()
+    try:
+        write_files(folder, {"image.png": "not indexed"})
+        time.sleep(0.2)
+        assert calls == []
+
+        for i in range(3):
+            write_files(folder, {f"new{i}.txt": f"New file {i}."})
+            time.sleep(0.05)
+        os.remove(os.path.join(folder, "doc000.txt"))
+        assert _wait_for(lambda: calls)
+        time.sleep(0.5)
+        assert len(calls) == 1 and watcher.updates == 1
+    finally:
+        watcher.stop()
+    assert not watcher.running
+
+
+def test_failed_update_is_retried(folder, capsys):
+    attempts = []
+
+    def on_change():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("index locked")
+
+    watcher = FolderWatcher(folder, on_change, interval=0.05, debounce=0.05, use_events=False).start()
+    try:
+        write_files(folder, {"new.txt": "New file."})
+        assert _wait_for(lambda: watcher.updates == 1)
+    finally:
+        watcher.stop()
+    assert len(attempts) == 2 and watcher.last_error is None
+    assert "index locked" in capsys.readouterr().out
+
+
+def test_registry_watch_keeps_the_index_up_to_date(folder, monkeypatch):
+    monkeypatch.setattr(registry, "EmbeddingEngine", HashEngine)
+    index_registry = IndexRegistry(model_name="test/hash")
+    indexer, _ = index_registry.get(folder)
+    index_registry.watch(folder, interval=0.05, debounce=0.05)
+    try:
+        assert index_registry.is_watched(folder)
+        write_files(folder, {"volcano.txt": "Notes about volcanoes and lava."})
+        assert _wait_for(lambda: index_registry.get(folder)[0] is not indexer)
+        files = [doc.metadata["file_name"] for doc in index_registry.get(folder)[0].search("volcanoes lava", 1)]
+        assert files == ["volcano.txt"]
+    finally:
+        index_registry.unwatch(folder)
+    assert not index_registry.is_watched(folder)
@@ -0,0 +1,138 @@
+# Import standard libraries for the background polling thread.
+import os
+import threading
+import time
+
+# Same file filter as the loader, so only indexable files trigger updates.
+from loader import list_files
+
+# Optional: watchdog (inotify on Linux, FSEvents on macOS) wakes the watcher
+# as soon as a file changes instead of waiting for the next poll.
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+def folder_snapshot(folder_path):
+    """
+    Returns {path: (mtime_ns, size)} for every supported file in the folder.
+    Cheap: only stats files, never reads them.
+    """
+    snapshot = {}
+    for path in list_files(folder_path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Deleted between listing and stat.
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class FolderWatcher:
+    """
+    Watches a document folder and calls `on_change()` in a background thread
+    once files were added, changed or deleted.
+
+    - Polls the folder every `interval` seconds (works everywhere); if the
+      optional `watchdog` package is installed, file events wake it up early.
+    - Debounces: waits until the folder has been quiet for `debounce` seconds,
+      so copying many files (or a file being written) triggers one update.
+    - `on_change` runs in the watcher thread; callers keep serving queries.
+    """
+
+    def __init__(self, folder_path, on_change, interval=2.0, debounce=1.0, use_events=True):
+        """
+        :param folder_path: Folder to watch (subfolders included).
+        :param on_change: Function called with no arguments after a batch of changes.
+        :param interval: Seconds between polls.
+        :param debounce: Quiet period (seconds) required before `on_change` runs.
+        :param use_events: Use watchdog file events when it is installed.
+        """
+        self.folder_path = folder_path
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.use_events = use_events and Observer is not None
+
+        self.updates = 0
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Starts watching. The current folder content is taken as already indexed.
+        """
+        if self.running:
+            return self
+        self._stop.clear()
+        self._snapshot = folder_snapshot(self.folder_path)
+        self._thread = threading.Thread(
+            target=self._run, name=f"watch-{os.path.basename(os.path.abspath(self.folder_path))}", daemon=True
+        )
+        self._thread.start()
+
+        if self.use_events:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = lambda event: self._wake.set()
+            self._observer = Observer()
+            self._observer.schedule(handler, self.folder_path, recursive=True)
+            self._observer.start()
+        return self
+
+    def stop(self):
+        """
+        Stops watching (an update already running is allowed to finish).
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _wait(self, seconds):
+        """
+        Sleeps until the timeout, a file event or `stop`. Returns False once stopped.
+        """
+        self._wake.wait(seconds)
+        self._wake.clear()
+        return not self._stop.is_set()
+
+    def _run(self):
+        while self._wait(self.interval):
+            current = folder_snapshot(self.folder_path)
+            if current == self._snapshot:
+                continue
+
+            # Debounce: keep checking until nothing changed for `debounce` seconds.
+            quiet_since = time.monotonic()
+            while time.monotonic() - quiet_since < self.debounce:
+                if not self._wait(min(self.debounce, self.interval) / 2):
+                    return
+                latest = folder_snapshot(self.folder_path)
+                if latest != current:
+                    current, quiet_since = latest, time.monotonic()
+
+            try:
+                self.on_change()
+                self.updates += 1
+                self.last_error = None
+            except Exception as e:
+                # Keep watching; the next change (or poll) retries.
+                self.last_error = str(e)
+                print(f"❌ Error updating index for {self.folder_path}: {e}")
+                continue
+            self._snapshot = current